@@ -2,6 +2,10 @@ from flask import request, jsonify
 from werkzeug.security import generate_password_hash
 import uuid, mysql.connector
 from utils.db import get_db_connection
+from utils.search_index import client_search_index
+from utils.client_counters import apply_counter_change, lock_client_dimensions
+from utils.dashboard_stats import invalidate_dashboard
+from utils.scheduling import MAX_SLOT_ADVISORS, free_slots, load_busy_intervals, parse_slot_query, serialize_slots
 from utils.email_sender import send_welcome_email_with_password
 from auth.decorators import admin_required
 from .routes import admin_bp
@@ -90,13 +94,21 @@ def assign_client_to_advisor(client_id):
     
     cursor = conn.cursor()
     try:
+        before = lock_client_dimensions(conn, client_id)
+
         # First, remove any existing assignment for this client to ensure uniqueness
         cursor.execute("DELETE FROM advisor_client_map WHERE client_user_id = %s", (client_id,))
 
         # Create the new assignment
         sql = "INSERT INTO advisor_client_map (advisor_user_id, client_user_id) VALUES (%s, %s)"
         cursor.execute(sql, (advisor_id, client_id))
+        if before:
+            apply_counter_change(cursor, before, dict(before, advisor_user_id=advisor_id))
         conn.commit()
+        if before and before['advisor_user_id'] is not None:
+            invalidate_dashboard(before['advisor_user_id'])
+        invalidate_dashboard(advisor_id)
+        client_search_index.upsert_client(client_id, advisor_user_id=advisor_id)
 
         return jsonify({"message": f"Client {client_id} successfully assigned to advisor {advisor_id}"}), 200
 
@@ -105,4 +117,52 @@ def assign_client_to_advisor(client_id):
         return jsonify({"message": f"An error occurred: {e}"}), 500
     finally:
         cursor.close()
-        conn.close()
\ No newline at end of file
+        conn.close()
+
+
+@admin_bp.route('/advisors/free-slots', methods=['GET'])
+@admin_required
+def get_advisors_free_slots():
+    """
+    Free slots for several advisors at once, plus the slots when all of them
+    are free. Query parameters: advisor_ids (comma-separated, required) and
+    the same range/duration/working-hours parameters as the advisor endpoint.
+    """
+    try:
+        advisor_ids = sorted({int(i) for i in request.args.get('advisor_ids', '').split(',') if i.strip()})
+    except ValueError:
+        return jsonify({"message": "advisor_ids must be comma-separated integers"}), 400
+    try:
+        query = parse_slot_query(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    if not advisor_ids or len(advisor_ids) > MAX_SLOT_ADVISORS:
+        return jsonify({"message": f"Between 1 and {MAX_SLOT_ADVISORS} advisor_ids are required"}), 400
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"SELECT id FROM users WHERE role = 'advisor' AND id IN ({', '.join(['%s'] * len(advisor_ids))})",
+            advisor_ids
+        )
+        found = {row[0] for row in cursor.fetchall()}
+        missing = [i for i in advisor_ids if i not in found]
+        if missing:
+            return jsonify({"message": f"Unknown advisor id(s): {missing}"}), 404
+
+        busy = load_busy_intervals(cursor, advisor_ids, query['range_start'], query['range_end'])
+        return jsonify({
+            "advisors": {
+                str(advisor_id): serialize_slots(free_slots(intervals, query['windows'], query['duration']))
+                for advisor_id, intervals in busy.items()
+            },
+            "common": serialize_slots(free_slots(
+                [interval for intervals in busy.values() for interval in intervals], query['windows'], query['duration']
+            ))
+        }), 200
+    except Exception as e:
+        return jsonify({"message": f"An error occurred: {e}"}), 500
+    finally:
+        cursor.close()
+        conn.close()
@@ -0,0 +1,36 @@
+from datetime import date
+from flask import jsonify, request
+from utils.db import get_db_connection, replica_reads
+from utils.analytics_rollup import load_analytics
+from auth.decorators import admin_required
+from .routes import admin_bp
+
+
+@admin_bp.route('/analytics', methods=['GET'])
+@admin_required
+@replica_reads
+def get_firm_analytics():
+    """
+    Firm-wide analytics (clients per advisor, onboarding funnel, appointments
+    per week, assets by tier) from the nightly rollup tables.
+    Optional query parameter: date (YYYY-MM-DD) to read an older snapshot.
+    """
+    snapshot_date = None
+    if request.args.get('date'):
+        try:
+            snapshot_date = date.fromisoformat(request.args['date'])
+        except ValueError:
+            return jsonify({"message": "date must be in YYYY-MM-DD format"}), 400
+
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        analytics = load_analytics(cursor, snapshot_date)
+        if analytics is None:
+            return jsonify({"message": "No analytics snapshot available yet"}), 404
+        return jsonify(analytics), 200
+    except Exception as e:
+        return jsonify({"message": f"An error occurred: {e}"}), 500
+    finally:
+        cursor.close()
+        conn.close()
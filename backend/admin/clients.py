@@ -1,5 +1,6 @@
-from flask import jsonify
+from flask import jsonify, request
 from utils.db import get_db_connection
+from utils.search_index import client_search_index
 from auth.decorators import admin_required
 from .routes import admin_bp
 
@@ -36,3 +37,23 @@ def get_all_clients():
         cursor.close()
         conn.close()
 
+
+@admin_bp.route('/clients/search', methods=['GET'])
+@admin_required
+def search_all_clients():
+    """
+    Searches all clients by name, email, city or occupation.
+    Query parameters: q (required), limit (default 20).
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"message": "Query parameter 'q' is required"}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+    except ValueError:
+        return jsonify({"message": "limit must be an integer"}), 400
+
+    try:
+        return jsonify(client_search_index.search(query, limit=limit)), 200
+    except Exception as e:
+        return jsonify({"message": f"An error occurred: {e}"}), 500
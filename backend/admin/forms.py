@@ -1,11 +1,12 @@
 from flask import request, jsonify
-from utils.db import get_db_connection
+from utils.db import get_db_connection, replica_reads
 from auth.decorators import admin_required
 from .routes import admin_bp
 import json
 
 @admin_bp.route('/forms/<form_name>', methods=['GET'])
 @admin_required
+@replica_reads
 def get_form_fields(form_name):
     """
     Fetches all fields and their options for a form, organizing them into a
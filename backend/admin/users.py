@@ -1,6 +1,9 @@
 from flask import request, jsonify
 from werkzeug.security import generate_password_hash
 from utils.db import get_db_connection
+from utils.search_index import client_search_index
+from utils.client_counters import apply_counter_change, lock_client_dimensions
+from utils.dashboard_stats import invalidate_dashboard
 from auth.decorators import admin_required
 from .routes import admin_bp
 
@@ -44,6 +47,8 @@ def create_user():
         conn.commit()
         
         user_id = cursor.lastrowid
+        if role == 'client':
+            client_search_index.upsert_client(user_id, first_name=first_name, last_name=last_name, email=email)
         
         return jsonify({
             "message": "User created successfully",
@@ -117,10 +122,16 @@ def delete_user(user_id):
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
+        before = lock_client_dimensions(conn, user_id)
+        apply_counter_change(cursor, before, None)
+        cursor.execute("DELETE FROM advisor_client_counters WHERE advisor_user_id = %s", (user_id,))
         cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
         conn.commit()
         if cursor.rowcount == 0:
             return jsonify({"message": "User not found"}), 404
+        if before and before['advisor_user_id'] is not None:
+            invalidate_dashboard(before['advisor_user_id'])
+        client_search_index.remove_client(user_id)
         return jsonify({"message": "User deleted successfully"}), 200
     except Exception as e:
         conn.rollback()
@@ -1,11 +1,46 @@
 from flask import jsonify, request
 from utils.email_sender import send_appointment_email
 from utils.db import get_db_connection
+from utils.client_profile import bump_profile_version
+from utils.appointment_dates import record_appointment, refresh_client_appointment_dates
+from utils.dashboard_stats import invalidate_dashboard
+from utils.scheduling import (
+    MAX_APPOINTMENT_DURATION, find_conflicts, find_overlaps, free_slots, load_busy_intervals, lock_advisor_calendar,
+    parse_iso_datetime, parse_slot_query, serialize_slots
+)
+from utils.recurrence import (
+    FREQUENCIES, as_db_datetime, expand_series, get_series, is_occurrence, load_occurrences, series_end, utc_now
+)
 from auth.decorators import advisor_required
+from datetime import date, datetime, timedelta, timezone
 from .routes import advisor_bp
-from datetime import datetime, timedelta
 
 
+CALENDAR_SERIES_HORIZON = timedelta(days=90)
+SERIES_CONFLICT_HORIZON = timedelta(days=366)
+_FREQUENCY_UNITS = {'daily': 'day', 'weekly': 'week', 'monthly': 'month'}
+
+
+def _validate_interval(start_time, end_time):
+    # Mixing a naive and an offset-aware bound would raise TypeError
+    start_time, end_time = as_db_datetime(start_time), as_db_datetime(end_time)
+    if end_time <= start_time:
+        return "end_time must be after start_time"
+    if end_time - start_time > MAX_APPOINTMENT_DURATION:
+        return "Appointments cannot be longer than 24 hours"
+    return None
+
+
+def _serialize_appointment(appointment):
+    serialized = {
+        **appointment,
+        "start_time": appointment['start_time'].isoformat(),
+        "end_time": appointment['end_time'].isoformat()
+    }
+    if appointment.get('occurrence_start'):
+        serialized['occurrence_start'] = appointment['occurrence_start'].isoformat()
+    return serialized
+
 
 @advisor_bp.route('/appointments', methods=['POST'])
 @advisor_required
@@ -26,29 +61,36 @@ def schedule_appointment(current_user):
     end_time_str = data.get('end_time')
     notes = data.get('notes')
 
-    # --- THIS IS THE FIX ---
-    # Python's fromisoformat() before version 3.11 doesn't support the 'Z' suffix for UTC.
-    # We replace 'Z' with '+00:00' to ensure compatibility.
-    if start_time_str and start_time_str.endswith('Z'):
-        start_time_str = start_time_str[:-1] + '+00:00'
-    if end_time_str and end_time_str.endswith('Z'):
-        end_time_str = end_time_str[:-1] + '+00:00'
-        
     try:
-        start_time = datetime.fromisoformat(start_time_str)
-        end_time = datetime.fromisoformat(end_time_str)
+        # Stored as naive UTC; the connector would drop an offset instead of converting it
+        start_time = as_db_datetime(parse_iso_datetime(start_time_str))
+        end_time = as_db_datetime(parse_iso_datetime(end_time_str))
     except ValueError:
         return jsonify({"message": "Invalid datetime format. Please use ISO 8601 format."}), 400
+    error = _validate_interval(start_time, end_time)
+    if error:
+        return jsonify({"message": error}), 400
 
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     try:
         conn.start_transaction()
 
+        # Lock the advisor's calendar so the check and the insert are atomic
+        lock_advisor_calendar(cursor, advisor_id)
+        conflicts = find_conflicts(cursor, advisor_id, start_time, end_time)
+        if conflicts:
+            conn.rollback()
+            return jsonify({
+                "message": "The advisor already has an appointment in this time slot.",
+                "conflicts": [_serialize_appointment(a) for a in conflicts]
+            }), 409
+
         cursor.execute(
             "INSERT INTO appointments (advisor_user_id, client_user_id, title, start_time, end_time, notes) VALUES (%s, %s, %s, %s, %s, %s)",
             (advisor_id, client_id, title, start_time, end_time, notes)
         )
+        record_appointment(cursor, client_id, start_time)
 
         cursor.execute("SELECT first_name, last_name FROM users WHERE id = %s", (advisor_id,))
         advisor = cursor.fetchone()
@@ -79,7 +121,9 @@ def schedule_appointment(current_user):
             appointment_details=appointment_details
         )
 
+        bump_profile_version(cursor, client_id)
         conn.commit()
+        invalidate_dashboard(advisor_id)
         
         return jsonify({"message": "Appointment scheduled, and client has been notified."}), 201
 
@@ -96,7 +140,8 @@ def schedule_appointment(current_user):
 @advisor_required
 def get_advisor_appointments(current_user):
     """
-    Fetches all upcoming appointments for the logged-in advisor to check for conflicts.
+    Fetches all upcoming appointments for the logged-in advisor to check for conflicts,
+    including occurrences of recurring series over the next 90 days.
     """
     advisor_id = current_user['user_id']
     conn = get_db_connection()
@@ -105,10 +150,17 @@ def get_advisor_appointments(current_user):
     
     cursor = conn.cursor(dictionary=True)
     try:
-        # We only need to check against future appointments
-        sql = "SELECT start_time, end_time FROM appointments WHERE advisor_user_id = %s AND start_time >= NOW()"
-        cursor.execute(sql, (advisor_id,))
+        # We only need to check against future appointments. Stored times
+        # are UTC, so "now" is too rather than the database server's clock.
+        now = utc_now()
+        sql = "SELECT start_time, end_time FROM appointments WHERE advisor_user_id = %s AND start_time >= %s"
+        cursor.execute(sql, (advisor_id, now))
         appointments = cursor.fetchall()
+
+        # Recurring occurrences are expanded for a bounded horizon only
+        for occurrence in load_occurrences(cursor, now, now + CALENDAR_SERIES_HORIZON, advisor_ids=[advisor_id]):
+            if occurrence['start_time'] >= now:
+                appointments.append({"start_time": occurrence['start_time'], "end_time": occurrence['end_time']})
         
         # Convert datetime objects to ISO strings
         for appt in appointments:
@@ -122,3 +174,259 @@ def get_advisor_appointments(current_user):
     finally:
         cursor.close()
         conn.close()
+
+
+@advisor_bp.route('/appointments/conflicts', methods=['GET'])
+@advisor_required
+def check_appointment_conflicts(current_user):
+    """
+    Returns only the advisor's appointments that overlap a proposed slot.
+    Query parameters: start_time, end_time (ISO 8601).
+    """
+    try:
+        start_time = as_db_datetime(parse_iso_datetime(request.args.get('start_time')))
+        end_time = as_db_datetime(parse_iso_datetime(request.args.get('end_time')))
+    except ValueError:
+        return jsonify({"message": "start_time and end_time are required in ISO 8601 format."}), 400
+    error = _validate_interval(start_time, end_time)
+    if error:
+        return jsonify({"message": error}), 400
+
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        conflicts = find_conflicts(cursor, current_user['user_id'], start_time, end_time)
+        return jsonify({
+            "has_conflict": bool(conflicts),
+            "conflicts": [_serialize_appointment(a) for a in conflicts]
+        }), 200
+    except Exception as e:
+        return jsonify({"message": f"An error occurred: {e}"}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+
+@advisor_bp.route('/appointments/free-slots', methods=['GET'])
+@advisor_required
+def get_free_slots(current_user):
+    """
+    Returns the gaps in the advisor's own calendar long enough for a meeting.
+    Query parameters: start_date, end_date, duration (minutes), work_start,
+    work_end, weekdays (see utils.scheduling.parse_slot_query).
+    """
+    try:
+        query = parse_slot_query(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    advisor_id = current_user['user_id']
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        busy = load_busy_intervals(cursor, [advisor_id], query['range_start'], query['range_end'])
+        slots = free_slots(busy[advisor_id], query['windows'], query['duration'])
+        return jsonify({"slots": serialize_slots(slots)}), 200
+    except Exception as e:
+        return jsonify({"message": f"An error occurred: {e}"}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+
+@advisor_bp.route('/appointment-series', methods=['POST'])
+@advisor_required
+def create_appointment_series(current_user):
+    """
+    Schedules a recurring appointment. Expects client_user_id, title,
+    start_time and end_time (the first occurrence) and frequency (daily,
+    weekly or monthly); optional interval (default 1), notes, and until
+    (YYYY-MM-DD) or count to end the series. Stores one row and notifies the
+    client once, however long the series is.
+    """
+    advisor_id = current_user['user_id']
+    data = request.get_json() or {}
+
+    required_fields = ['client_user_id', 'title', 'start_time', 'end_time', 'frequency']
+    if not all(field in data for field in required_fields):
+        return jsonify({"message": "Missing required appointment series fields"}), 400
+    if data['frequency'] not in FREQUENCIES:
+        return jsonify({"message": f"frequency must be one of {', '.join(FREQUENCIES)}"}), 400
+    if data.get('until') and data.get('count'):
+        return jsonify({"message": "Provide either until or count, not both"}), 400
+
+    try:
+        start_time = as_db_datetime(parse_iso_datetime(data['start_time']))
+        end_time = as_db_datetime(parse_iso_datetime(data['end_time']))
+        interval = int(data.get('interval', 1))
+        count = int(data['count']) if data.get('count') else None
+        until = date.fromisoformat(data['until']) if data.get('until') else None
+    except ValueError:
+        return jsonify({"message": "Invalid start_time, end_time, interval, count or until."}), 400
+    error = _validate_interval(start_time, end_time)
+    if error:
+        return jsonify({"message": error}), 400
+    if interval < 1 or (count is not None and count < 1):
+        return jsonify({"message": "interval and count must be positive"}), 400
+
+    client_id = data['client_user_id']
+    series = {
+        "id": None, "advisor_user_id": advisor_id, "client_user_id": client_id,
+        "title": data['title'], "notes": data.get('notes'),
+        "start_time": start_time,
+        "duration_minutes": int((end_time - start_time).total_seconds() // 60),
+        "frequency": data['frequency'], "interval_count": interval,
+        "until_date": until, "occurrence_count": count
+    }
+    ends_at = series_end(series)
+
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        conn.start_transaction()
+        if not conn.prepared_fetchone(
+            "SELECT 1 FROM advisor_client_map WHERE advisor_user_id = %s AND client_user_id = %s",
+            (advisor_id, client_id)
+        ):
+            conn.rollback()
+            return jsonify({"message": "Client not found or not assigned to this advisor"}), 404
+        lock_advisor_calendar(cursor, advisor_id)
+
+        # Check the occurrences of the coming year (or the whole series if shorter)
+        check_end = min(ends_at or datetime.max, series['start_time'] + SERIES_CONFLICT_HORIZON)
+        candidates = [
+            (o['start_time'], o['end_time']) for o in expand_series(series, series['start_time'], check_end)
+        ]
+        busy = load_busy_intervals(cursor, [advisor_id], series['start_time'], check_end)[advisor_id]
+        overlaps = find_overlaps(candidates, busy)
+        if overlaps:
+            conn.rollback()
+            return jsonify({
+                "message": f"{len(overlaps)} occurrence(s) of this series clash with existing appointments.",
+                "conflicts": [{"start_time": s.isoformat(), "end_time": e.isoformat()} for s, e in overlaps[:20]]
+            }), 409
+
+        cursor.execute(
+            """
+            INSERT INTO appointment_series
+                (advisor_user_id, client_user_id, title, notes, start_time, duration_minutes,
+                 frequency, interval_count, until_date, occurrence_count, ends_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """,
+            (advisor_id, client_id, series['title'], series['notes'], series['start_time'],
+             series['duration_minutes'], series['frequency'], interval, until, count, ends_at)
+        )
+        series_id = cursor.lastrowid
+        refresh_client_appointment_dates(cursor, client_id)
+
+        cursor.execute("SELECT first_name, last_name FROM users WHERE id = %s", (advisor_id,))
+        advisor = cursor.fetchone()
+        advisor_name = f"{advisor['first_name']} {advisor['last_name']}"
+        every = f"every {interval} {_FREQUENCY_UNITS[series['frequency']]}s" if interval > 1 \
+            else f"every {_FREQUENCY_UNITS[series['frequency']]}"
+        cursor.execute(
+            "INSERT INTO notifications (recipient_user_id, message, link_url) VALUES (%s, %s, %s)",
+            (client_id, f"{advisor_name} has scheduled a recurring appointment '{series['title']}' for you ({every}).", "/my-plan")
+        )
+
+        cursor.execute("SELECT email, first_name, last_name FROM users WHERE id = %s", (client_id,))
+        client = cursor.fetchone()
+        send_appointment_email(
+            client_email=client['email'],
+            client_name=f"{client['first_name']} {client['last_name']}",
+            advisor_name=advisor_name,
+            appointment_details={
+                "title": f"{series['title']} (repeats {every})",
+                "start_time": series['start_time'].replace(tzinfo=timezone.utc),
+                "end_time": (series['start_time'] + timedelta(minutes=series['duration_minutes'])).replace(tzinfo=timezone.utc),
+                "notes": series['notes']
+            }
+        )
+
+        bump_profile_version(cursor, client_id)
+        conn.commit()
+        invalidate_dashboard(advisor_id)
+
+        return jsonify({"message": "Recurring appointment scheduled, and client has been notified.", "series_id": series_id}), 201
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"message": f"An unexpected error occurred: {e}"}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+
+@advisor_bp.route('/appointment-series/<int:series_id>/exceptions', methods=['POST'])
+@advisor_required
+def add_series_exception(current_user, series_id):
+    """
+    Cancels or moves a single occurrence of a recurring appointment.
+    Expects occurrence_start (the occurrence's original start) and action
+    ('cancel' or 'move'); moving also needs start_time and end_time.
+    """
+    advisor_id = current_user['user_id']
+    data = request.get_json() or {}
+    action = data.get('action')
+    if action not in ('cancel', 'move'):
+        return jsonify({"message": "action must be 'cancel' or 'move'"}), 400
+
+    try:
+        original_start = as_db_datetime(parse_iso_datetime(data.get('occurrence_start')))
+        if action == 'move':
+            new_start = as_db_datetime(parse_iso_datetime(data.get('start_time')))
+            new_end = as_db_datetime(parse_iso_datetime(data.get('end_time')))
+    except ValueError:
+        return jsonify({"message": "Invalid datetime format. Please use ISO 8601 format."}), 400
+    if action == 'move':
+        error = _validate_interval(new_start, new_end)
+        if error:
+            return jsonify({"message": error}), 400
+
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        conn.start_transaction()
+        lock_advisor_calendar(cursor, advisor_id)
+
+        series = get_series(cursor, series_id, advisor_id)
+        if not series:
+            conn.rollback()
+            return jsonify({"message": "Appointment series not found"}), 404
+        if not is_occurrence(series, original_start):
+            conn.rollback()
+            return jsonify({"message": "occurrence_start is not an occurrence of this series"}), 400
+
+        if action == 'move':
+            conflicts = [
+                c for c in find_conflicts(cursor, advisor_id, new_start, new_end)
+                if not (c.get('series_id') == series_id and c.get('occurrence_start') == original_start)
+            ]
+            if conflicts:
+                conn.rollback()
+                return jsonify({
+                    "message": "The advisor already has an appointment in this time slot.",
+                    "conflicts": [_serialize_appointment(a) for a in conflicts]
+                }), 409
+            values = ('moved', new_start, new_end)
+        else:
+            values = ('cancelled', None, None)
+
+        cursor.execute(
+            """
+            INSERT INTO appointment_series_exceptions (series_id, original_start, status, new_start, new_end)
+            VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE status = VALUES(status), new_start = VALUES(new_start), new_end = VALUES(new_end)
+            """,
+            (series_id, original_start) + values
+        )
+        refresh_client_appointment_dates(cursor, series['client_user_id'])
+        bump_profile_version(cursor, series['client_user_id'])
+        conn.commit()
+        invalidate_dashboard(advisor_id)
+        return jsonify({"message": f"Occurrence {values[0]}."}), 200
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"message": f"An unexpected error occurred: {e}"}), 500
+    finally:
+        cursor.close()
+        conn.close()
@@ -0,0 +1,196 @@
+"""
+Multi-year tax and cash-flow projection behind /tools/cash-flow-projection.
+
+Income sources (monthly amounts, as in financials_income) grow at their own
+or a common rate; liabilities (as in financials_liabilities) are paid off as
+level annuities; deductions and expenses rise with inflation. Every
+quantity is a (rows x years) array, so a 40-year projection is a handful of
+NumPy operations rather than a loop over years.
+
+Bracket thresholds are indexed each year. Scaling every threshold by f
+scales the tax on f * x by exactly f, so year t's tax is
+f_t * tax_base(taxable_t / f_t) on the base year's table and all years are
+priced in one compute_federal_tax_batch call.
+"""
+import math
+from datetime import date
+
+import numpy as np
+
+from advisor.tax_calculator import SUPPORTED_TAX_YEARS, compute_federal_tax_batch
+
+MAX_PROJECTION_YEARS = 40
+START_YEAR_RANGE = (1900, 2200)
+
+DEFAULT_ASSUMPTIONS = {
+    "years": 30,
+    "filing_status": "married_jointly",
+    "income_growth": 0.03,
+    "inflation": 0.025,
+    "bracket_indexing": None,       # defaults to inflation
+    "deductions": 0.0,              # first-year deductions, indexed with inflation
+    "credits": 0.0,
+    "annual_expenses": 0.0,         # first-year living expenses, indexed with inflation
+    "liability_interest_rate": 0.06,
+    "liability_payoff_years": 10,
+}
+
+
+def load_client_cashflows(conn, client_id):
+    """The client's saved income sources and liabilities."""
+    income = conn.prepared_fetchall(
+        "SELECT source, owner, monthly_amount FROM financials_income WHERE client_user_id = %s", (client_id,)
+    )
+    liabilities = conn.prepared_fetchall(
+        "SELECT liability_type, description, balance FROM financials_liabilities WHERE client_user_id = %s",
+        (client_id,)
+    )
+    return {
+        "income_sources": [
+            {"source": row['source'], "owner": row['owner'], "monthly_amount": float(row['monthly_amount'] or 0)}
+            for row in income
+        ],
+        "liabilities": [
+            {"liability_type": row['liability_type'], "description": row['description'],
+             "balance": float(row['balance'] or 0)}
+            for row in liabilities
+        ],
+    }
+
+
+# Optional numeric fields of each income source and liability
+ROW_NUMBERS = {
+    "income_sources": ("monthly_amount", "annual_growth", "ends_after_years"),
+    "liabilities": ("balance", "interest_rate", "payoff_years"),
+}
+
+
+def _finite(name, value):
+    """float(value), rejecting the NaN and Infinity that the JSON parser lets through."""
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"{name} must be a finite number")
+    return number
+
+
+def projection_inputs(overrides, saved=None, today=None):
+    """
+    Resolves the projection's inputs: values in `overrides` win, then the
+    client's saved income sources and liabilities, then DEFAULT_ASSUMPTIONS.
+    Raises ValueError for values the projection can't use.
+    """
+    inputs = dict(DEFAULT_ASSUMPTIONS, start_year=(today or date.today()).year, income_sources=[], liabilities=[])
+    inputs.update(saved or {})
+    inputs.update({key: value for key, value in overrides.items() if key in inputs and value is not None})
+
+    for key in ("years", "start_year", "liability_payoff_years"):
+        inputs[key] = int(_finite(key, inputs[key]))
+    if not 1 <= inputs["years"] <= MAX_PROJECTION_YEARS:
+        raise ValueError(f"years must be between 1 and {MAX_PROJECTION_YEARS}")
+    if not START_YEAR_RANGE[0] <= inputs["start_year"] <= START_YEAR_RANGE[1]:
+        raise ValueError(f"start_year must be between {START_YEAR_RANGE[0]} and {START_YEAR_RANGE[1]}")
+    if inputs["bracket_indexing"] is None:
+        inputs["bracket_indexing"] = inputs["inflation"]
+    for key in ("income_growth", "inflation", "bracket_indexing", "deductions", "credits",
+                "annual_expenses", "liability_interest_rate"):
+        inputs[key] = _finite(key, inputs[key])
+    if min(inputs["inflation"], inputs["bracket_indexing"], inputs["income_growth"]) <= -1:
+        raise ValueError("Growth, inflation and indexing rates must be above -1")
+    if min(inputs["deductions"], inputs["credits"], inputs["annual_expenses"]) < 0:
+        raise ValueError("Deductions, credits and expenses cannot be negative")
+    for key in ("income_sources", "liabilities"):
+        if not isinstance(inputs[key], list) or not all(isinstance(item, dict) for item in inputs[key]):
+            raise ValueError(f"{key} must be a list of objects")
+        for item in inputs[key]:
+            for field in ROW_NUMBERS[key]:
+                if item.get(field) is not None:
+                    _finite(f"{key}.{field}", item[field])
+    return inputs
+
+
+def _income_matrix(inputs, t):
+    """(sources x years) annual income. A source may set annual_growth and ends_after_years."""
+    sources = inputs["income_sources"]
+    if not sources:
+        return np.zeros((0, len(t)))
+    monthly = np.array([float(s.get('monthly_amount') or 0) for s in sources])
+    growth = np.array([float(s['annual_growth']) if s.get('annual_growth') is not None else inputs["income_growth"]
+                       for s in sources])
+    ends = np.array([int(s['ends_after_years']) if s.get('ends_after_years') is not None else len(t)
+                     for s in sources])
+    return monthly[:, None] * 12 * (1 + growth[:, None]) ** t * (t < ends[:, None])
+
+
+def _liability_matrices(inputs, t):
+    """(liabilities x years) payments and end-of-year balances for level-payment payoff."""
+    liabilities = inputs["liabilities"]
+    if not liabilities:
+        empty = np.zeros((0, len(t)))
+        return empty, empty
+    balance = np.array([float(l.get('balance') or 0) for l in liabilities])[:, None]
+    rate = np.array([float(l['interest_rate']) if l.get('interest_rate') is not None
+                     else inputs["liability_interest_rate"] for l in liabilities])[:, None]
+    term = np.array([max(int(l['payoff_years']) if l.get('payoff_years') is not None
+                         else int(inputs["liability_payoff_years"]), 1) for l in liabilities])[:, None]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        payment = np.where(rate > 0, balance * rate / (1 - (1 + rate) ** -term), balance / term)
+        growth = (1 + rate) ** (t + 1)
+        remaining = np.where(rate > 0, balance * growth - payment * (growth - 1) / rate, balance - payment * (t + 1))
+    active = t < term
+    return payment * active, np.maximum(remaining, 0) * active
+
+
+def run_projection(inputs):
+    """Projects every year at once; returns per-year arrays and totals."""
+    years = inputs["years"]
+    t = np.arange(years)
+    calendar_years = inputs["start_year"] + t
+
+    # Bracket tables of the latest supported year at or before the start, indexed forward from there
+    table_year = max([y for y in SUPPORTED_TAX_YEARS if y <= inputs["start_year"]] or [SUPPORTED_TAX_YEARS[0]])
+    index = (1 + inputs["bracket_indexing"]) ** (calendar_years - table_year)
+    prices = (1 + inputs["inflation"]) ** t
+
+    income_by_source = _income_matrix(inputs, t)
+    gross = income_by_source.sum(axis=0)
+    deductions = inputs["deductions"] * prices
+    taxable = np.maximum(np.round(gross - deductions, 2), 0.0)
+    base_tax, marginal = compute_federal_tax_batch(taxable / index, inputs["filing_status"], table_year)
+    tax = np.maximum(np.round(base_tax * index, 2) - inputs["credits"], 0.0)
+
+    payments, remaining = _liability_matrices(inputs, t)
+    debt_payments = payments.sum(axis=0)
+    expenses = inputs["annual_expenses"] * prices
+    net = gross - tax - debt_payments - expenses
+    if not (np.isfinite(net).all() and np.isfinite(remaining).all()):
+        raise ValueError("The projection overflows; use smaller amounts or rates")
+
+    def cents(values):
+        return np.round(values, 2).tolist()
+
+    return {
+        "tax_table_year": table_year,
+        "years": {
+            "year": calendar_years.tolist(),
+            "gross_income": cents(gross),
+            "deductions": cents(deductions),
+            "taxable_income": cents(taxable),
+            "federal_tax": cents(tax),
+            "effective_tax_rate_percent": cents(np.divide(tax * 100, gross, out=np.zeros(years), where=gross > 0)),
+            "marginal_tax_rate_percent": cents(marginal * 100),
+            "debt_payments": cents(debt_payments),
+            "liabilities_remaining": cents(remaining.sum(axis=0)),
+            "living_expenses": cents(expenses),
+            "net_cash_flow": cents(net),
+            "cumulative_net_cash_flow": cents(np.cumsum(net)),
+            "net_cash_flow_todays_dollars": cents(net / prices),
+        },
+        "totals": {
+            "gross_income": round(float(gross.sum()), 2),
+            "federal_tax": round(float(tax.sum()), 2),
+            "debt_payments": round(float(debt_payments.sum()), 2),
+            "living_expenses": round(float(expenses.sum()), 2),
+            "net_cash_flow": round(float(net.sum()), 2),
+        },
+    }
@@ -1,43 +1,172 @@
 from flask import jsonify, request
-from utils.db import get_db_connection
+from utils.db import get_db_connection, replica_reads
 from auth.decorators import advisor_required, advisor_document_required
 from werkzeug.security import generate_password_hash
+import base64
+import json
 import uuid
+from datetime import datetime
 import mysql.connector
 from utils.email_sender import send_welcome_email_with_password
+from utils.client_profile import bump_profile_version, cached_profile_response, load_client_profile, profile_view_key
+from utils.search_index import client_search_index
+from utils.dashboard_stats import invalidate_dashboard
+from utils.client_counters import apply_counter_change, lock_client_dimensions
+from utils.recurrence import utc_now
+from utils.timezones import display_day_start
+from utils.appointment_dates import client_appointment_dates
 from .routes import advisor_bp
 
 
+# Sort keys for the client list, with the client id as the final tie-breaker
+# so keyset pagination is stable. Each list is a NOT NULL column tuple on
+# advisor_client_map behind an index that starts with advisor_user_id
+# (migrations/009_client_list_sort_keys.sql), so a page is a range read of
+# the advisor's index entries from the cursor onwards.
+CLIENT_LIST_SORTS = {
+    'name': ["acm.client_sort_last_name", "acm.client_sort_first_name", "acm.client_user_id"],
+    'next_appointment': ["acm.client_next_appointment_sort", "acm.client_user_id"],
+    'id': ["acm.client_user_id"],
+}
+MAX_PAGE_SIZE = 200
+
+
+def _encode_cursor(values):
+    raw = json.dumps([str(v) if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(token, expected_length):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(values, list) or len(values) != expected_length:
+        return None
+    # Sort keys are names, timestamps and ids; anything else would reach the query
+    if not all(isinstance(v, (str, int)) and not isinstance(v, bool) for v in values):
+        return None
+    return values
+
+
+def _keyset_condition(expressions, values, descending):
+    """
+    Builds "(k1, k2, ...) > (v1, v2, ...)" expanded into nested OR/AND terms,
+    which MySQL can use as a range condition.
+    """
+    op = '<' if descending else '>'
+    expression, value = expressions[0], values[0]
+    if len(expressions) == 1:
+        return f"{expression} {op} %s", [value]
+    rest_sql, rest_params = _keyset_condition(expressions[1:], values[1:], descending)
+    return f"({expression} {op} %s OR ({expression} = %s AND {rest_sql}))", [value, value] + rest_params
+
+
 @advisor_bp.route('/clients', methods=['GET'])
 @advisor_required
 def get_my_clients(current_user):
     """
-    Fetches a list of clients, now including advisor name and next appointment date.
+    Fetches a list of clients, now including advisor name and next/last appointment dates.
+    The dates are read from client_profiles, see utils/appointment_dates.py, and
+    recomputed for the page's clients whose stored next appointment has passed.
+
+    Optional query parameters:
+      tier, onboarding_status, is_active  -- filters
+      sort   -- name, next_appointment or id; prefix with '-' for descending (default: name)
+      limit  -- page size; when given (or with cursor) the response is
+                {"clients": [...], "next_cursor": ...} instead of a plain list
+      cursor -- next_cursor from the previous page
+
+    The sort keys are indexed columns (see CLIENT_LIST_SORTS), so a page is
+    a range read from the cursor rather than a sort of every client.
     """
     advisor_id = current_user['user_id']
+
+    sort = request.args.get('sort', 'name')
+    descending = sort.startswith('-')
+    sort_keys = CLIENT_LIST_SORTS.get(sort.lstrip('-'))
+    if not sort_keys:
+        return jsonify({"message": f"Invalid sort. Use one of: {', '.join(CLIENT_LIST_SORTS)}"}), 400
+
+    paginate = 'limit' in request.args or 'cursor' in request.args
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"message": "limit must be an integer"}), 400
+
+    where = ["acm.advisor_user_id = %s"]
+    params = [advisor_id]
+    for field in ('tier', 'onboarding_status'):
+        if request.args.get(field):
+            where.append(f"cp.{field} = %s")
+            params.append(request.args[field])
+    if 'is_active' in request.args:
+        where.append("c.is_active = %s")
+        params.append(request.args['is_active'].lower() in ['true', '1', 'yes'])
+
+    if request.args.get('cursor'):
+        after = _decode_cursor(request.args['cursor'], len(sort_keys))
+        if after is None:
+            return jsonify({"message": "Invalid cursor"}), 400
+        condition, condition_params = _keyset_condition(sort_keys, after, descending)
+        where.append(condition)
+        params.extend(condition_params)
+
+    direction = 'DESC' if descending else 'ASC'
+    order_by = ', '.join(f"{expr} {direction}" for expr in sort_keys)
+    sort_columns = [f"sort_key_{i}" for i in range(len(sort_keys))]
+    sort_select = ', '.join(f"{expr} as {column}" for expr, column in zip(sort_keys, sort_columns))
+
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     try:
-        sql = """
+        sql = f"""
             SELECT 
                 c.id, c.email, c.first_name, c.last_name, c.is_active,
                 cp.onboarding_status, cp.tier,
                 CONCAT(a.first_name, ' ', a.last_name) as advisor_name,
-                (SELECT MIN(start_time) FROM appointments app 
-                 WHERE app.client_user_id = c.id AND app.start_time >= CURDATE()) as next_appointment
-            FROM users c
+                cp.next_appointment_at as next_appointment,
+                cp.last_appointment_at as last_appointment,
+                {sort_select}
+            FROM advisor_client_map acm
+            JOIN users c ON c.id = acm.client_user_id
             JOIN client_profiles cp ON c.id = cp.client_user_id
-            JOIN advisor_client_map acm ON c.id = acm.client_user_id
             JOIN users a ON acm.advisor_user_id = a.id
-            WHERE acm.advisor_user_id = %s
+            WHERE {' AND '.join(where)}
+            ORDER BY {order_by}
         """
-        cursor.execute(sql, (advisor_id,))
+        if paginate:
+            sql += " LIMIT %s"
+            params.append(limit + 1)
+        cursor.execute(sql, tuple(params))
         clients = cursor.fetchall()
-        
+
+        next_cursor = None
+        if paginate and len(clients) > limit:
+            clients = clients[:limit]
+            last = clients[-1]
+            next_cursor = _encode_cursor([last[column] for column in sort_columns])
+
+        # A next appointment that has passed since the daily sweep is looked
+        # up again for the clients on this page only (their sort position
+        # still waits for the sweep).
+        today = display_day_start()
+        stale = [client for client in clients if client['next_appointment'] and client['next_appointment'] < today]
+        if stale:
+            dates = client_appointment_dates(cursor, [client['id'] for client in stale], today)
+            for client in stale:
+                client['next_appointment'], client['last_appointment'] = dates[client['id']]
+
         for client in clients:
+            for column in sort_columns:
+                client.pop(column)
             if client['next_appointment']:
                 client['next_appointment'] = client['next_appointment'].strftime('%d-%b-%Y')
+            if client['last_appointment']:
+                client['last_appointment'] = client['last_appointment'].strftime('%d-%b-%Y')
         
+        if paginate:
+            return jsonify({"clients": clients, "next_cursor": next_cursor}), 200
         return jsonify(clients), 200
     except Exception as e:
         return jsonify({"message": f"An error occurred: {e}"}), 500
@@ -46,8 +175,31 @@ def get_my_clients(current_user):
         conn.close()
 
 
+@advisor_bp.route('/clients/search', methods=['GET'])
+@advisor_required
+def search_my_clients(current_user):
+    """
+    Searches the advisor's own clients by name, email, city or occupation.
+    Query parameters: q (required), limit (default 20).
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"message": "Query parameter 'q' is required"}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+    except ValueError:
+        return jsonify({"message": "limit must be an integer"}), 400
+
+    try:
+        results = client_search_index.search(query, advisor_id=current_user['user_id'], limit=limit)
+        return jsonify(results), 200
+    except Exception as e:
+        return jsonify({"message": f"An error occurred: {e}"}), 500
+
+
 @advisor_bp.route('/clients/<int:client_id>', methods=['GET'])
 @advisor_required
+@replica_reads
 def get_client_details(current_user, client_id):
     """
     Fetches all profile details for a single client assigned to the advisor.
@@ -61,80 +213,43 @@ def get_client_details(current_user, client_id):
     cursor = conn.cursor(dictionary=True)
     try:
         # 1. Verify this client belongs to the advisor
-        cursor.execute(
+        if not conn.prepared_fetchone(
             "SELECT 1 FROM advisor_client_map WHERE advisor_user_id = %s AND client_user_id = %s",
             (advisor_id, client_id)
-        )
-        if not cursor.fetchone():
+        ):
             return jsonify({"message": "Client not found or not assigned to this advisor"}), 404
 
-        # 2. Fetch all related data in separate queries
-        
-        # --- Personal & Profile Info ---
-        cursor.execute(
-            """
-            SELECT u.first_name, u.last_name, u.email, 
-                   u.mobile_country, u.mobile_code, u.mobile_number, 
-                   cp.* FROM users u 
-            LEFT JOIN client_profiles cp ON u.id = cp.client_user_id 
-            WHERE u.id = %s
-            """, 
-            (client_id,)
-        )
-        personal_info = cursor.fetchone()
+        # 2. Serve from the profile cache, rebuilding when the version or the
+        #    day (which moves the window of recurring occurrences) changed
+        today = utc_now().date()
 
-        # --- Other Info Sections ---
-        cursor.execute("SELECT * FROM spouses WHERE client_user_id = %s", (client_id,))
-        spouse_info = cursor.fetchone()
+        def build_client_summary():
+            profile = load_client_profile(cursor, client_id, include_appointments=True, today=today)
+            appointments = profile["appointments"]
 
-        cursor.execute("SELECT * FROM family_members WHERE client_user_id = %s", (client_id,))
-        family_info = cursor.fetchall()
-        
-        cursor.execute("SELECT * FROM financials_income WHERE client_user_id = %s", (client_id,))
-        income = cursor.fetchall()
-        
-        cursor.execute("SELECT * FROM financials_assets WHERE client_user_id = %s", (client_id,))
-        assets = cursor.fetchall()
-
-        cursor.execute("SELECT * FROM financials_liabilities WHERE client_user_id = %s", (client_id,))
-        liabilities = cursor.fetchall()
-
-        cursor.execute("SELECT id, document_name, file_path, uploaded_at FROM documents WHERE client_user_id = %s", (client_id,))
-        documents = cursor.fetchall()
-
-        cursor.execute("""
-            SELECT ff.field_label as question, cqa.answer 
-            FROM client_questionnaire_answers cqa
-            JOIN form_fields ff ON cqa.form_field_id = ff.id
-            WHERE cqa.client_user_id = %s
-        """, (client_id,))
-        investor_profile = cursor.fetchall()
-
-        # --- FIX: Added query to fetch appointments ---
-        cursor.execute("SELECT id, title, start_time, end_time, status FROM appointments WHERE client_user_id = %s ORDER BY start_time DESC", (client_id,))
-        appointments = cursor.fetchall()
-
-        # Convert datetime objects to ISO strings for JSON compatibility
-        for appt in appointments:
-            if appt.get('start_time'): appt['start_time'] = appt['start_time'].isoformat()
-            if appt.get('end_time'): appt['end_time'] = appt['end_time'].isoformat()
-
-        # 3. Assemble the final JSON response
-        client_summary = {
-            "personal_info": personal_info,
-            "spouse_info": spouse_info,
-            "family_info": family_info,
-            "investor_profile": investor_profile,
-            "financials": {
-                "income": income,
-                "assets": assets,
-                "liabilities": liabilities
-            },
-            "documents": documents,
-            "appointments": appointments # <-- Added appointments to the response
-        }
-        
-        return jsonify(client_summary), 200
+            # Convert datetime objects to ISO strings for JSON compatibility
+            for appt in appointments:
+                if appt.get('start_time'): appt['start_time'] = appt['start_time'].isoformat()
+                if appt.get('end_time'): appt['end_time'] = appt['end_time'].isoformat()
+                if appt.get('occurrence_start'): appt['occurrence_start'] = appt['occurrence_start'].isoformat()
+
+            return {
+                "personal_info": profile["personal_info"],
+                "spouse_info": profile["spouse_info"],
+                "family_info": profile["family_info"],
+                "investor_profile": profile["investor_profile"],
+                "financials": {
+                    "income": profile["income"],
+                    "assets": profile["assets"],
+                    "liabilities": profile["liabilities"]
+                },
+                "documents": profile["documents"],
+                "appointments": appointments
+            }
+
+        return cached_profile_response(
+            conn, client_id, profile_view_key('advisor', True, today), build_client_summary
+        )
 
     except Exception as e:
         return jsonify({"message": f"An error occurred: {e}"}), 500
@@ -189,12 +304,19 @@ def add_new_client(current_user):
             "INSERT INTO advisor_client_map (advisor_user_id, client_user_id) VALUES (%s, %s)",
             (advisor_id, client_user_id)
         )
+        apply_counter_change(
+            cursor, None, {"advisor_user_id": advisor_id, "tier": None, "onboarding_status": 'In-Progress'}
+        )
 
         # --- THIS IS THE NEW STEP ---
         # Step 4: Email the plain-text password to the client
         send_welcome_email_with_password(email, initial_password)
 
         conn.commit()
+        invalidate_dashboard(advisor_id)
+        client_search_index.upsert_client(
+            client_user_id, first_name=first_name, last_name=last_name, email=email, advisor_user_id=advisor_id
+        )
         
         # Fetch the newly created client's data to return to the frontend
         cursor.execute("SELECT id, email, first_name, last_name, is_active FROM users WHERE id = %s", (client_user_id,))
@@ -233,10 +355,14 @@ def update_client_details(current_user, client_id):
     cursor = conn.cursor()
     try:
         # Verify client belongs to advisor
-        cursor.execute("SELECT client_user_id FROM advisor_client_map WHERE advisor_user_id = %s AND client_user_id = %s", (advisor_id, client_id))
-        if not cursor.fetchone():
+        if not conn.prepared_fetchone(
+            "SELECT 1 FROM advisor_client_map WHERE advisor_user_id = %s AND client_user_id = %s",
+            (advisor_id, client_id)
+        ):
             return jsonify({"message": "Client not found or not assigned to this advisor"}), 404
 
+        before = lock_client_dimensions(conn, client_id)
+
         if 'tier' in data:
             cursor.execute("UPDATE client_profiles SET tier = %s WHERE client_user_id = %s", (data['tier'], client_id))
         
@@ -249,7 +375,14 @@ def update_client_details(current_user, client_id):
             cursor.execute("UPDATE client_profiles SET onboarding_status = %s WHERE client_user_id = %s", (data['onboarding_status'], client_id))
         # --- END OF FIX ---
 
+        if before:
+            after = dict(before)
+            after.update({field: data[field] for field in ('tier', 'onboarding_status') if field in data})
+            apply_counter_change(cursor, before, after)
+
+        bump_profile_version(cursor, client_id)
         conn.commit()
+        invalidate_dashboard(advisor_id)
         return jsonify({"message": "Client updated successfully"}), 200
     except Exception as e:
         conn.rollback()
@@ -1,54 +1,29 @@
-from datetime import date, timedelta
 from flask import jsonify
-from utils.db import get_db_connection
+from utils.db import get_db_connection, replica_reads
+from utils.dashboard_stats import dashboard_cache, load_dashboard_stats
+from utils.recurrence import next_occurrence, utc_now
 from auth.decorators import advisor_required
 from .routes import advisor_bp
 
 
 @advisor_bp.route('/dashboard/stats', methods=['GET'])
 @advisor_required
+@replica_reads
 def get_dashboard_stats(current_user):
     """
     Fetches aggregated statistics, now including appointment data for the charts.
+    Served from a short-lived per-advisor cache that writes invalidate.
     """
     advisor_id = current_user['user_id']
+    cached = dashboard_cache.get(advisor_id)
+    if cached is not None:
+        return jsonify(cached)
+
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     try:
-        # Get Client Counts by Tier
-        cursor.execute("SELECT cp.tier, COUNT(cp.client_user_id) AS count FROM client_profiles cp JOIN advisor_client_map acm ON cp.client_user_id = acm.client_user_id WHERE acm.advisor_user_id = %s GROUP BY cp.tier", (advisor_id,))
-        tier_stats = cursor.fetchall()
-
-        # Get Client Counts by Onboarding Status
-        cursor.execute("SELECT cp.onboarding_status, COUNT(cp.client_user_id) AS count FROM client_profiles cp JOIN advisor_client_map acm ON cp.client_user_id = acm.client_user_id WHERE acm.advisor_user_id = %s GROUP BY cp.onboarding_status", (advisor_id,))
-        onboarding_stats = cursor.fetchall()
-        
-        # Get appointment counts for the week
-        today = date.today()
-        week_start = today - timedelta(days=today.weekday())
-        days = [(week_start + timedelta(days=i)) for i in range(7)]
-        day_names = [d.strftime('%a') for d in days]
-        
-        cursor.execute("""
-            SELECT DATE(start_time) as app_date, COUNT(id) as count
-            FROM appointments
-            WHERE advisor_user_id = %s AND start_time BETWEEN %s AND %s + INTERVAL 1 DAY
-            GROUP BY DATE(start_time)
-        """, (advisor_id, week_start, days[-1]))
-        app_counts = {r['app_date'].strftime('%a'): r['count'] for r in cursor.fetchall()}
-        appointment_stats = [{"day": day, "count": app_counts.get(day, 0)} for day in day_names]
-
-        # Get upcoming meetings count for today
-        cursor.execute("SELECT COUNT(id) as count FROM appointments WHERE advisor_user_id = %s AND DATE(start_time) = CURDATE()", (advisor_id,))
-        today_meetings = cursor.fetchone()
-
-        response = {
-            "clients_by_tier": tier_stats,
-            "clients_by_onboarding_status": onboarding_stats,
-            "appointments_weekly": appointment_stats,
-            "meetings_today": today_meetings['count'] if today_meetings else 0
-        }
-        
+        response = load_dashboard_stats(cursor, advisor_id)
+        dashboard_cache.set(advisor_id, response)
         return jsonify(response)
     except Exception as e:
         return jsonify({"message": f"An error occurred: {e}"}), 500
@@ -60,7 +35,8 @@ def get_dashboard_stats(current_user):
 @advisor_required
 def get_next_appointment(current_user):
     """
-    Fetches the details of the very next upcoming appointment for the advisor.
+    Fetches the details of the very next upcoming appointment for the advisor,
+    whether a single appointment or an occurrence of a recurring series.
     """
     advisor_id = current_user['user_id']
     conn = get_db_connection()
@@ -74,12 +50,26 @@ def get_next_appointment(current_user):
                 CONCAT(u.first_name, ' ', u.last_name) as client_name
             FROM appointments a
             JOIN users u ON a.client_user_id = u.id
-            WHERE a.advisor_user_id = %s AND a.start_time >= NOW()
+            WHERE a.advisor_user_id = %s AND a.start_time >= %s
             ORDER BY a.start_time ASC
             LIMIT 1
         """
-        cursor.execute(sql, (advisor_id,))
+        now = utc_now()
+        cursor.execute(sql, (advisor_id, now))
         next_appointment = cursor.fetchone()
+
+        occurrence = next_occurrence(cursor, advisor_id, now)
+        if occurrence and (not next_appointment or occurrence['start_time'] < next_appointment['start_time']):
+            cursor.execute(
+                "SELECT CONCAT(first_name, ' ', last_name) AS client_name FROM users WHERE id = %s",
+                (occurrence['client_user_id'],)
+            )
+            client = cursor.fetchone()
+            next_appointment = {
+                "title": occurrence['title'],
+                "start_time": occurrence['start_time'],
+                "client_name": client['client_name'] if client else None
+            }
         
         # Format the datetime object into a standard string for the frontend
         if next_appointment and next_appointment['start_time']:
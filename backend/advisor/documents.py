@@ -17,11 +17,10 @@ def get_client_document_file(current_user, client_id, document_id):
     cursor = conn.cursor(dictionary=True)
     try:
         # 1. Verify the advisor is assigned to this client
-        cursor.execute(
+        if not conn.prepared_fetchone(
             "SELECT 1 FROM advisor_client_map WHERE advisor_user_id = %s AND client_user_id = %s",
             (advisor_id, client_id)
-        )
-        if not cursor.fetchone():
+        ):
             return jsonify({"message": "Access denied: You are not assigned to this client."}), 403
 
         # 2. Verify the document belongs to the client and get its path
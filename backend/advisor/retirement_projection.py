@@ -0,0 +1,147 @@
+"""
+Monte Carlo retirement projection behind /tools/retirement-projection.
+
+Starting savings, contributions and retirement spending are seeded from a
+client's saved financials (income, assets, liabilities) and date of birth;
+any of them can be overridden. All amounts are in today's dollars: each path
+grows by a log-normal real return per year, then receives the year's
+contribution or pays the year's spending. Paths are simulated together as
+NumPy arrays, one vectorised step per year, and the random draws come from
+a seeded generator so the same inputs and seed always give the same result.
+"""
+import math
+from datetime import date
+
+import numpy as np
+
+PERCENTILES = (5, 25, 50, 75, 95)
+DEFAULT_PATHS = 10_000
+MAX_PATHS = 50_000
+MAX_HORIZON_YEARS = 60
+
+DEFAULT_ASSUMPTIONS = {
+    "current_age": 45,
+    "retirement_age": 65,
+    "end_age": 95,
+    "expected_return": 0.06,    # nominal, arithmetic mean per year
+    "volatility": 0.12,
+    "inflation": 0.025,
+    "savings_rate": 0.10,       # share of income contributed until retirement
+    "replacement_ratio": 0.70,  # retirement spending as a share of income
+    "retirement_income": 0.0,   # pensions etc., reduces withdrawals
+}
+
+
+def load_client_financials(conn, client_id):
+    """Totals from the client's saved financials, in one round trip."""
+    return conn.prepared_fetchone(
+        """
+        SELECT
+            (SELECT COALESCE(SUM(monthly_amount), 0) FROM financials_income WHERE client_user_id = %s) AS monthly_income,
+            (SELECT COALESCE(SUM(balance), 0) FROM financials_assets WHERE client_user_id = %s) AS assets,
+            (SELECT COALESCE(SUM(balance), 0) FROM financials_liabilities WHERE client_user_id = %s) AS liabilities,
+            (SELECT date_of_birth FROM client_profiles WHERE client_user_id = %s) AS date_of_birth
+        """,
+        (client_id, client_id, client_id, client_id)
+    )
+
+
+def _age_on(date_of_birth, today):
+    return today.year - date_of_birth.year - ((today.month, today.day) < (date_of_birth.month, date_of_birth.day))
+
+
+def projection_inputs(overrides, financials=None, today=None):
+    """
+    Resolves the projection's inputs: explicit values in `overrides` win,
+    then figures derived from `financials`, then DEFAULT_ASSUMPTIONS.
+    Raises ValueError for values the simulation can't use.
+    """
+    inputs = dict(DEFAULT_ASSUMPTIONS, current_savings=0.0, annual_income=0.0)
+    if financials:
+        inputs["annual_income"] = float(financials['monthly_income']) * 12
+        inputs["current_savings"] = max(float(financials['assets']) - float(financials['liabilities']), 0.0)
+        if financials['date_of_birth']:
+            inputs["current_age"] = _age_on(financials['date_of_birth'], today or date.today())
+    for key in list(inputs) + ["annual_contribution", "annual_spending"]:
+        if overrides.get(key) is not None:
+            inputs[key] = float(overrides[key])
+
+    inputs.setdefault("annual_contribution", inputs["annual_income"] * inputs["savings_rate"])
+    inputs.setdefault("annual_spending", inputs["annual_income"] * inputs["replacement_ratio"])
+    # The JSON parser accepts NaN and Infinity, which would come back out as invalid JSON
+    for key, value in inputs.items():
+        if not math.isfinite(value):
+            raise ValueError(f"{key} must be a finite number")
+    for key in ("current_age", "retirement_age", "end_age"):
+        inputs[key] = int(inputs[key])
+
+    if not 0 <= inputs["current_age"] < inputs["end_age"]:
+        raise ValueError("end_age must be greater than current_age")
+    if inputs["end_age"] - inputs["current_age"] > MAX_HORIZON_YEARS:
+        raise ValueError(f"The planning horizon can be at most {MAX_HORIZON_YEARS} years")
+    if inputs["expected_return"] <= -1 or inputs["inflation"] <= -1 or inputs["volatility"] < 0:
+        raise ValueError("expected_return and inflation must be above -1 and volatility non-negative")
+    if min(inputs["current_savings"], inputs["annual_contribution"], inputs["annual_spending"]) < 0:
+        raise ValueError("Savings, contributions and spending cannot be negative")
+    return inputs
+
+
+def run_projection(inputs, paths=DEFAULT_PATHS, seed=None):
+    """
+    Simulates `paths` return paths from current_age to end_age. A path
+    fails if its balance runs out in a year where spending is due. Returns
+    the success probability, per-age percentile bands and the seed used
+    (a fresh one is drawn when none is given).
+    """
+    if not 1 <= paths <= MAX_PATHS:
+        raise ValueError(f"paths must be between 1 and {MAX_PATHS}")
+    if seed is None:
+        seed = int(np.random.SeedSequence().entropy % 2 ** 32)
+    rng = np.random.default_rng(seed)
+
+    years = inputs["end_age"] - inputs["current_age"]
+    ages = inputs["current_age"] + np.arange(1, years + 1)
+    retired = ages > inputs["retirement_age"]
+    withdrawal = max(inputs["annual_spending"] - inputs["retirement_income"], 0.0)
+    cashflow = np.where(retired, -withdrawal, inputs["annual_contribution"])
+
+    # Log-normal gross returns with the requested arithmetic mean and volatility, deflated to real terms
+    mean = 1 + inputs["expected_return"]
+    with np.errstate(over='ignore'):
+        sigma = np.sqrt(np.log1p(np.square(inputs["volatility"] / mean)))
+    if not np.isfinite(sigma):
+        raise ValueError("volatility is too large")
+    log_growth = rng.standard_normal((years, paths))
+    log_growth *= sigma
+    log_growth += np.log(mean) - sigma ** 2 / 2 - np.log1p(inputs["inflation"])
+    growth = np.exp(log_growth, out=log_growth)
+
+    balances = np.empty((years + 1, paths))
+    balances[0] = inputs["current_savings"]
+    for year in range(years):
+        step = balances[year + 1]
+        np.multiply(balances[year], growth[year], out=step)
+        step += cashflow[year]
+        np.maximum(step, 0.0, out=step)
+
+    spending_years = cashflow < 0
+    depleted = balances[1:][spending_years] <= 0
+    failed = depleted.any(axis=0)
+    bands = np.percentile(balances, PERCENTILES, axis=1)
+    if not np.isfinite(bands).all():
+        raise ValueError("The projection overflows; use smaller amounts, returns or volatility")
+
+    result = {
+        "seed": seed,
+        "paths": paths,
+        "success_probability_percent": round(float(100 - failed.mean() * 100), 2),
+        "bands": {"age": [inputs["current_age"]] + ages.tolist()},
+        "final_balance": {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, bands[:, -1])},
+        "median_depletion_age": None,
+    }
+    for p, band in zip(PERCENTILES, bands):
+        result["bands"][f"p{p}"] = np.round(band, 2).tolist()
+    if failed.any():
+        first_empty = depleted[:, failed].argmax(axis=0)
+        result["median_depletion_age"] = int(np.median(ages[spending_years][first_empty]))
+    return result
@@ -0,0 +1,142 @@
+"""
+State income tax on top of the federal engine.
+
+Each state in tax_data/states_<year>.json names a tax type; the type is a
+plugin class registered with @register_state_tax_type that turns the
+state's entry into something that can price arrays of incomes. Built-in
+types are "none", "flat" and "progressive" (brackets per filing status,
+priced with the federal TaxTable machinery). All states are loaded once at
+import.
+
+compute_state_tax_batch groups rows by state, so comparing many states
+(relocation scenarios) costs one vectorised pass per state, the same as a
+single-state batch of that size. State taxable income is taken to be the
+federal taxable income; state-specific deductions are not modelled.
+"""
+import glob
+import json
+import os
+
+import numpy as np
+
+from advisor.tax_calculator import (
+    TAX_DATA_DIR, TaxTable, group_rows, normalize_filing_status, table_tax_batch, tax_year_key,
+)
+
+STATE_TAX_TYPES = {}
+
+
+def register_state_tax_type(name):
+    """Class decorator adding a state tax type under `name`."""
+    def register(cls):
+        STATE_TAX_TYPES[name] = cls
+        return cls
+    return register
+
+
+@register_state_tax_type('none')
+class NoIncomeTax:
+    def __init__(self, year, state, spec):
+        pass
+
+    def tax_batch(self, incomes, filing_statuses):
+        return np.zeros_like(incomes), np.zeros_like(incomes)
+
+
+@register_state_tax_type('flat')
+class FlatIncomeTax:
+    def __init__(self, year, state, spec):
+        self.rate = float(spec['rate'])
+
+    def tax_batch(self, incomes, filing_statuses):
+        return incomes * self.rate, np.full_like(incomes, self.rate)
+
+
+@register_state_tax_type('progressive')
+class ProgressiveIncomeTax:
+    """Brackets per filing status; statuses the state doesn't list use its single schedule."""
+    def __init__(self, year, state, spec):
+        self.tables = {
+            status: TaxTable(year, f"{state} {status}", brackets) for status, brackets in spec['brackets'].items()
+        }
+
+    def _table(self, filing_status):
+        return self.tables.get(normalize_filing_status(filing_status)) or self.tables['single']
+
+    def tax_batch(self, incomes, filing_statuses):
+        tax = np.zeros_like(incomes)
+        marginal = np.zeros_like(incomes)
+        for status, mask in group_rows(filing_statuses, len(incomes)):
+            if mask is None:
+                return table_tax_batch(self._table(status), incomes)
+            tax[mask], marginal[mask] = table_tax_batch(self._table(status), incomes[mask])
+        return tax, marginal
+
+
+def _load_states(directory=TAX_DATA_DIR):
+    """{(year, state code): (name, type, plugin instance)} and {(year, lower-cased name): code}."""
+    states, names = {}, {}
+    for path in sorted(glob.glob(os.path.join(directory, 'states_*.json'))):
+        with open(path) as f:
+            data = json.load(f)
+        for code, spec in data['states'].items():
+            if spec['type'] not in STATE_TAX_TYPES:
+                raise ValueError(f"{path}: unknown state tax type '{spec['type']}' for {code}")
+            states[(data['year'], code)] = (spec['name'], spec['type'],
+                                            STATE_TAX_TYPES[spec['type']](data['year'], code, spec))
+            names[(data['year'], spec['name'].lower())] = code
+    return states, names
+
+
+STATE_TAXES, _STATE_NAMES = _load_states()
+
+
+def normalize_state(state, year=2025):
+    """A state code from a code or a full name ('ca', 'California'); None if unknown."""
+    if state is not None and not isinstance(state, str):
+        raise ValueError(f"Invalid state {state!r}; use a two-letter code or a state name")
+    value = (state or '').strip()
+    if (tax_year_key(year), value.upper()) in STATE_TAXES:
+        return value.upper()
+    return _STATE_NAMES.get((tax_year_key(year), value.lower()))
+
+
+def get_state_tax(year, state):
+    """Raises ValueError for a state or year without a table."""
+    code = normalize_state(state, year)
+    if code is None:
+        supported = sorted(c for y, c in STATE_TAXES if y == tax_year_key(year))
+        raise ValueError(f"No state tax table for '{state}' in {year}. Supported states: {', '.join(supported) or 'none'}")
+    return code, STATE_TAXES[(tax_year_key(year), code)]
+
+
+def compute_state_tax(taxable_income, state, filing_status='married_jointly', year=2025):
+    code, (name, tax_type, plugin) = get_state_tax(year, state)
+    tax, marginal = plugin.tax_batch(np.array([max(float(taxable_income), 0.0)]), filing_status)
+    return {
+        "state": code,
+        "state_name": name,
+        "tax_type": tax_type,
+        "tax": round(float(tax[0]), 2),
+        "marginal_rate_percent": round(float(marginal[0]) * 100, 2),
+    }
+
+
+def compute_state_tax_batch(taxable_incomes, states, filing_statuses, year=2025):
+    """
+    Like compute_federal_tax_batch for state tax. `states` and
+    `filing_statuses` are each one value for all rows or a sequence with
+    one per row. Returns (tax, marginal_rate) float arrays.
+    """
+    taxable = np.maximum(np.asarray(taxable_incomes, dtype=float), 0.0)
+    tax = np.zeros_like(taxable)
+    marginal = np.zeros_like(taxable)
+    if not isinstance(filing_statuses, str):
+        filing_statuses = np.asarray(filing_statuses, dtype=object)
+    for state, mask in group_rows(states, len(taxable)):
+        _, (_, _, plugin) = get_state_tax(year, state)
+        if mask is None:
+            return plugin.tax_batch(taxable, filing_statuses)
+        statuses = filing_statuses if isinstance(filing_statuses, str) else filing_statuses[mask]
+        tax[mask], marginal[mask] = plugin.tax_batch(taxable[mask], statuses)
+    return tax, marginal
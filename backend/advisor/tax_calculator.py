@@ -1,48 +1,205 @@
-def calculate_2025_federal_tax(taxable_income, filing_status='married_jointly'):
+"""
+Table-driven federal income tax engine.
+
+Bracket tables live in tax_data/federal_<year>.json, one list of
+[lower bound, rate] pairs per filing status. They are loaded once at import
+and turned into TaxTable objects holding the cumulative tax owed at each
+bracket's lower bound, so tax and marginal rate for any income are one
+bisect plus one multiply. compute_federal_tax_batch does the same for whole
+arrays of incomes with NumPy.
+"""
+import glob
+import json
+import os
+from bisect import bisect_right
+
+import numpy as np
+
+TAX_DATA_DIR = os.path.join(os.path.dirname(__file__), 'tax_data')
+
+FILING_STATUSES = ('single', 'married_jointly', 'married_separately', 'head_of_household')
+FILING_STATUS_ALIASES = {
+    'hoh': 'head_of_household',
+    'mfj': 'married_jointly',
+    'mfs': 'married_separately',
+}
+
+
+class TaxTable:
+    """Brackets for one (year, filing status), with cumulative tax precomputed."""
+    __slots__ = ('year', 'filing_status', 'thresholds', 'rates', 'cumulative', 'arrays')
+
+    def __init__(self, year, filing_status, brackets):
+        self.year = year
+        self.filing_status = filing_status
+        self.thresholds = [float(lower) for lower, _ in brackets]
+        self.rates = [float(rate) for _, rate in brackets]
+        if self.thresholds[0] != 0 or self.thresholds != sorted(set(self.thresholds)):
+            raise ValueError(f"{year} {filing_status}: brackets must start at 0 and increase")
+        self.cumulative = [0.0]
+        for i in range(1, len(self.thresholds)):
+            width = self.thresholds[i] - self.thresholds[i - 1]
+            self.cumulative.append(self.cumulative[-1] + width * self.rates[i - 1])
+        # (thresholds, rates, cumulative) as float arrays for the batch path
+        self.arrays = tuple(np.array(values, dtype=float) for values in (self.thresholds, self.rates, self.cumulative))
+
+    def bracket_index(self, taxable_income):
+        return max(bisect_right(self.thresholds, taxable_income) - 1, 0)
+
+    def tax(self, taxable_income):
+        if taxable_income <= 0:
+            return 0.0
+        i = self.bracket_index(taxable_income)
+        return self.cumulative[i] + (taxable_income - self.thresholds[i]) * self.rates[i]
+
+    def position(self, taxable_income):
+        """Where an income sits in its bracket: how far down to the previous boundary and up to the next."""
+        i = self.bracket_index(max(taxable_income, 0.0))
+        has_next = i + 1 < len(self.thresholds)
+        return {
+            "bracket_starts_at": self.thresholds[i],
+            "deductions_to_lower_bracket": round(taxable_income - self.thresholds[i], 2) if i > 0 else None,
+            "next_bracket_starts_at": self.thresholds[i + 1] if has_next else None,
+            "next_bracket_rate_percent": round(self.rates[i + 1] * 100, 2) if has_next else None,
+            "income_to_next_bracket": round(self.thresholds[i + 1] - taxable_income, 2) if has_next else None,
+        }
+
+    def breakdown(self, taxable_income):
+        """Income and tax falling in each bracket up to the marginal one."""
+        rows = []
+        if taxable_income <= 0:
+            return rows
+        for i in range(self.bracket_index(taxable_income) + 1):
+            upper = self.thresholds[i + 1] if i + 1 < len(self.thresholds) else None
+            amount = min(taxable_income, upper if upper is not None else taxable_income) - self.thresholds[i]
+            rows.append({
+                "rate_percent": round(self.rates[i] * 100, 2),
+                "lower": self.thresholds[i],
+                "upper": upper,
+                "taxable_amount": round(amount, 2),
+                "tax": round(amount * self.rates[i], 2),
+            })
+        return rows
+
+
+def _load_tables(directory=TAX_DATA_DIR):
+    tables = {}
+    for path in sorted(glob.glob(os.path.join(directory, 'federal_*.json'))):
+        with open(path) as f:
+            data = json.load(f)
+        for filing_status, brackets in data['brackets'].items():
+            tables[(data['year'], filing_status)] = TaxTable(data['year'], filing_status, brackets)
+    return tables
+
+
+FEDERAL_TAX_TABLES = _load_tables()
+SUPPORTED_TAX_YEARS = sorted({year for year, _ in FEDERAL_TAX_TABLES})
+
+
+def normalize_filing_status(filing_status):
+    """Canonical filing status for a name or alias; ValueError (not AttributeError) for non-strings."""
+    if filing_status is not None and not isinstance(filing_status, str):
+        raise ValueError(f"Invalid filing status {filing_status!r}. Supported: {', '.join(FILING_STATUSES)}")
+    status = (filing_status or '').strip().lower()
+    return FILING_STATUS_ALIASES.get(status, status)
+
+
+def tax_year_key(year):
+    """`year` as an int; ValueError (not TypeError) for null, non-numeric or fractional years."""
+    try:
+        key = int(float(year)) if isinstance(year, str) else int(year)
+        if isinstance(year, bool) or key != float(year):
+            raise ValueError
+        return key
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"Invalid tax year '{year}'. Supported years: {SUPPORTED_TAX_YEARS}")
+
+
+def get_tax_table(year, filing_status):
+    """Raises ValueError for an unknown year or filing status instead of silently taxing at 0."""
+    table = FEDERAL_TAX_TABLES.get((tax_year_key(year), normalize_filing_status(filing_status)))
+    if table is None:
+        raise ValueError(
+            f"No federal tax table for year {year} and filing status '{filing_status}'. "
+            f"Supported years: {SUPPORTED_TAX_YEARS}; filing statuses: {', '.join(FILING_STATUSES)}"
+        )
+    return table
+
+
+def compute_federal_tax(taxable_income, filing_status='married_jointly', year=2025):
     """
-    Calculates the 2025 federal tax liability based on income and filing status.
-    NOTE: This implementation is simplified for the 'Married Filing Jointly' status
-          based on the provided Figma designs. A full implementation would handle
-          all filing statuses.
-    """
-    tax_owed = 0
-    
-    # 2025 Federal Income Tax Brackets for Married Filing Jointly
-    brackets = {
-        0.10: (0, 23850),
-        0.12: (23850, 96950),
-        0.22: (96950, 206700),
-        0.24: (206700, 394600),
-        0.32: (394600, 501050),
-        0.35: (501050, 751600),
-        0.37: (751600, float('inf'))
+    Returns tax owed, marginal rate, the per-bracket breakdown and the
+    distance to the neighbouring bracket boundaries for a taxable income.
+    """
+    table = get_tax_table(year, filing_status)
+    taxable_income = max(float(taxable_income), 0.0)
+    return {
+        "tax": round(table.tax(taxable_income), 2),
+        "marginal_rate_percent": round(table.rates[table.bracket_index(taxable_income)] * 100, 2),
+        "brackets": table.breakdown(taxable_income),
+        "bracket_position": table.position(taxable_income),
     }
 
-    if filing_status == 'married_jointly':
-        remaining_income = taxable_income
-        
-        # Calculate tax for each bracket progressively
-        if remaining_income > brackets[0.12][0]:
-            tax_owed += (brackets[0.12][0] - brackets[0.10][0]) * 0.10
-        else:
-            tax_owed += remaining_income * 0.10
-            return tax_owed
 
-        if remaining_income > brackets[0.22][0]:
-            tax_owed += (brackets[0.22][0] - brackets[0.12][0]) * 0.12
-        else:
-            tax_owed += (remaining_income - brackets[0.12][0]) * 0.12
-            return tax_owed
+def group_rows(keys, count):
+    """
+    Splits rows by key for the batch paths: [(key, None)] when `keys` is a
+    single string shared by every row, otherwise [(key, boolean row mask)]
+    per distinct key. Keys are coded with a dict lookup per row, which is
+    much faster than comparing NumPy string or object arrays.
+    """
+    if isinstance(keys, str):
+        return [(keys, None)]
+    distinct = {}
+    codes = np.fromiter((distinct.setdefault(key, len(distinct)) for key in keys), dtype=np.intp, count=count)
+    return [(key, codes == i) for key, i in distinct.items()]
+
+
+def table_tax_batch(table, incomes):
+    """Tax and marginal rate arrays for non-negative `incomes` under one TaxTable."""
+    thresholds, rates, cumulative = table.arrays
+    index = np.maximum(np.searchsorted(thresholds, incomes, side='right') - 1, 0)
+    return cumulative[index] + (incomes - thresholds[index]) * rates[index], rates[index]
+
 
-        if remaining_income > brackets[0.24][0]:
-            tax_owed += (brackets[0.24][0] - brackets[0.22][0]) * 0.22
+def compute_federal_tax_batch(taxable_incomes, filing_statuses, year=2025):
+    """
+    Vectorised tax and marginal rate for arrays of taxable incomes.
+    `filing_statuses` is one status for all rows or a sequence with one per
+    row. Rows are grouped by status and each group is priced with a single
+    searchsorted over that table. Returns (tax, marginal_rate) float arrays.
+    """
+    taxable = np.maximum(np.asarray(taxable_incomes, dtype=float), 0.0)
+    tax = np.zeros_like(taxable)
+    marginal = np.zeros_like(taxable)
+    for status, mask in group_rows(filing_statuses, len(taxable)):
+        table = get_tax_table(year, status)
+        if mask is None:
+            tax, marginal = table_tax_batch(table, taxable)
         else:
-            tax_owed += (remaining_income - brackets[0.22][0]) * 0.22
-            return tax_owed
-        
-        # ... and so on for the higher brackets.
-        # This can be written more elegantly with a loop for a full implementation.
-        # For now, this structure clearly shows the logic for the example case.
+            tax[mask], marginal[mask] = table_tax_batch(table, taxable[mask])
+    return tax, marginal
+
+
+def round_cents(values):
+    """
+    np.round(values, 2) that agrees with Python's round(), which the single
+    scenario paths use. Scaling by 100 can land exactly on a half cent
+    (77329.435 * 100 == 7732943.5) where round() sees 77329.43499...; those
+    few elements are rounded one by one.
+    """
+    values = np.asarray(values, dtype=float)
+    scaled = values * 100
+    rounded = np.round(scaled) / 100
+    ties = scaled - np.floor(scaled) == 0.5
+    if ties.any():
+        rounded[ties] = [round(value, 2) for value in values[ties].tolist()]
+    return rounded
 
-    return round(tax_owed, 2)
 
+def calculate_2025_federal_tax(taxable_income, filing_status='married_jointly'):
+    """
+    Calculates the 2025 federal tax liability based on income and filing status.
+    Kept for existing callers; see compute_federal_tax for the full result.
+    """
+    return round(get_tax_table(2025, filing_status).tax(max(float(taxable_income), 0.0)), 2)
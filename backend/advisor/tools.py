@@ -1,16 +1,89 @@
 import json
+import numpy as np
 from flask import jsonify, request
 from auth.decorators import advisor_required
 from .routes import advisor_bp
-from advisor.tax_calculator import calculate_2025_federal_tax
+from advisor.tax_calculator import compute_federal_tax, compute_federal_tax_batch, round_cents
+from advisor.state_tax import compute_state_tax, compute_state_tax_batch, get_state_tax
+from advisor import cashflow_projection, retirement_projection
 from utils.db import get_db_connection
 
+DEFAULT_SENSITIVITY_GRID = {
+    "income_deltas": [-20000, -10000, 0, 10000, 20000],
+    "deduction_deltas": [0, 5000, 10000, 20000],
+}
+MAX_SENSITIVITY_CELLS = 10_000
+MAX_COMPARE_STATES = 60
+
+
+def _sensitivity_grid(spec, gross_income, deductions, credits, filing_status, tax_year, final_tax_owed, state_tax=None):
+    """
+    Tax owed and its change from the base case for every combination of an
+    income delta and a deduction delta, priced in one vectorised call.
+    Rows follow income_deltas, columns deduction_deltas. With a state, the
+    state tax and the combined total are gridded too.
+    """
+    spec = spec if isinstance(spec, dict) else {}
+    income_deltas = np.asarray(spec.get('income_deltas', DEFAULT_SENSITIVITY_GRID['income_deltas']), dtype=float)
+    deduction_deltas = np.asarray(spec.get('deduction_deltas', DEFAULT_SENSITIVITY_GRID['deduction_deltas']), dtype=float)
+    if income_deltas.ndim != 1 or deduction_deltas.ndim != 1:
+        raise ValueError("income_deltas and deduction_deltas must be lists of numbers")
+    if income_deltas.size * deduction_deltas.size > MAX_SENSITIVITY_CELLS:
+        raise ValueError(f"The sensitivity grid can have at most {MAX_SENSITIVITY_CELLS} cells")
+
+    gross = np.maximum(gross_income + income_deltas[:, None], 0.0)
+    taxable = np.maximum(np.round(gross - np.maximum(deductions + deduction_deltas[None, :], 0.0), 2), 0.0)
+    tax, marginal = compute_federal_tax_batch(taxable.ravel(), filing_status, tax_year)
+    owed = np.maximum(np.round(tax, 2) - credits, 0.0).reshape(taxable.shape)
+    grid = {
+        "income_deltas": income_deltas.tolist(),
+        "deduction_deltas": deduction_deltas.tolist(),
+        "final_tax_owed": np.round(owed, 2).tolist(),
+        "tax_delta": np.round(owed - final_tax_owed, 2).tolist(),
+        "marginal_tax_rate_percent": np.round(marginal * 100, 2).reshape(taxable.shape).tolist(),
+    }
+    if state_tax:
+        state_owed, _ = compute_state_tax_batch(taxable.ravel(), state_tax['state'], filing_status, tax_year)
+        total = owed + np.round(state_owed, 2).reshape(taxable.shape)
+        grid["state_tax"] = np.round(state_owed, 2).reshape(taxable.shape).tolist()
+        grid["total_tax_owed"] = np.round(total, 2).tolist()
+        grid["total_tax_delta"] = np.round(total - final_tax_owed - state_tax['tax'], 2).tolist()
+    return grid
+
+
+def _state_comparison(states, taxable_income, filing_status, tax_year, final_tax_owed, gross_income):
+    """Federal plus state tax on the same income in each of `states`, cheapest first; one vectorised call."""
+    if not isinstance(states, list) or len(states) > MAX_COMPARE_STATES:
+        raise ValueError(f"compare_states must be a list of at most {MAX_COMPARE_STATES} states")
+    codes = list(dict.fromkeys(get_state_tax(tax_year, state)[0] for state in states))
+    state_owed, marginal = compute_state_tax_batch(np.full(len(codes), float(taxable_income)), codes, filing_status, tax_year)
+    rows = []
+    for code, owed, rate in zip(codes, np.round(state_owed, 2).tolist(), (marginal * 100).tolist()):
+        total = round(final_tax_owed + owed, 2)
+        rows.append({
+            "state": code,
+            "state_tax": owed,
+            "state_marginal_rate_percent": round(rate, 2),
+            "total_tax_owed": total,
+            "combined_effective_tax_rate_percent": round(total / gross_income * 100, 2) if gross_income > 0 else 0,
+        })
+    return sorted(rows, key=lambda row: (row['total_tax_owed'], row['state']))
+
+
+def _load_client_state(conn, client_id):
+    row = conn.prepared_fetchone("SELECT state FROM client_profiles WHERE client_user_id = %s", (client_id,))
+    return row['state'] if row else None
+
 
 @advisor_bp.route('/tools/income-tax', methods=['POST'])
 @advisor_required
 def income_tax_tool(current_user):
     """
     Receives financial data and returns a detailed tax analysis.
+    With `sensitivity` (true, or {income_deltas, deduction_deltas}) it also
+    returns the what-if grid of tax changes, e.g. for a bigger 401(k).
+    State tax is added for `state`, or for the state on the profile of
+    `client_id`; `compare_states` prices the same income in other states.
     """
     data = request.get_json()
     if not data:
@@ -21,26 +94,48 @@ def income_tax_tool(current_user):
     deductions = float(data.get('deductions', 0)) # Sum of all deductions
     credits = float(data.get('credits', 0))
     filing_status = data.get('filing_status', 'married_jointly')
+    tax_year = data['tax_year'] if data.get('tax_year') is not None else 2025
 
     # 1. Calculate Taxable Income
-    taxable_income = gross_income - deductions
+    taxable_income = round(gross_income - deductions, 2)
     if taxable_income < 0:
         taxable_income = 0
 
     # 2. Calculate Tax Owed Before Credits
-    tax_before_credits = calculate_2025_federal_tax(taxable_income, filing_status)
+    try:
+        federal = compute_federal_tax(taxable_income, filing_status, tax_year)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    tax_before_credits = federal['tax']
 
     # 3. Apply Credits
-    final_tax_owed = tax_before_credits - credits
+    final_tax_owed = round(tax_before_credits - credits, 2)
     if final_tax_owed < 0:
         final_tax_owed = 0
     
     # 4. Calculate Rates
     effective_tax_rate = (final_tax_owed / gross_income) * 100 if gross_income > 0 else 0
-    # A full marginal rate calculation would check which bracket the taxable_income falls into
-    marginal_tax_rate = 22.0 # Hardcoded for the example from Figma
+    marginal_tax_rate = federal['marginal_rate_percent']
+
+    # 5. State tax, for the requested state or the one on the client's profile
+    state = data.get('state')
+    state_from_profile = False
+    if not state and data.get('client_id') is not None:
+        state, error = _load_client_data(current_user, data['client_id'], _load_client_state)
+        if error:
+            return error
+        state_from_profile = True
+    state_tax, state_tax_note = None, None
+    if state:
+        try:
+            state_tax = compute_state_tax(taxable_income, state, filing_status, tax_year)
+        except ValueError as e:
+            if not state_from_profile:
+                return jsonify({"message": str(e)}), 400
+            state_tax_note = str(e)
+    total_tax_owed = round(final_tax_owed + (state_tax['tax'] if state_tax else 0), 2)
 
-    # 5. Assemble and return the response
+    # 6. Assemble and return the response
     response_data = {
         "inputs": data,
         "results": {
@@ -51,12 +146,233 @@ def income_tax_tool(current_user):
             "tax_credits": credits,
             "final_tax_owed": final_tax_owed,
             "effective_tax_rate_percent": round(effective_tax_rate, 2),
-            "marginal_tax_rate_percent": marginal_tax_rate
+            "marginal_tax_rate_percent": marginal_tax_rate,
+            "bracket_breakdown": federal['brackets'],
+            "bracket_position": federal['bracket_position'],
+            "state_tax": state_tax,
+            "total_tax_owed": total_tax_owed,
+            "combined_effective_tax_rate_percent": round(total_tax_owed / gross_income * 100, 2) if gross_income > 0 else 0,
+            "combined_marginal_tax_rate_percent": round(
+                marginal_tax_rate + (state_tax['marginal_rate_percent'] if state_tax else 0), 2
+            )
         }
     }
+    if state_tax_note:
+        response_data["results"]["state_tax_note"] = state_tax_note
+
+    if data.get('sensitivity'):
+        try:
+            response_data["sensitivity"] = _sensitivity_grid(
+                data['sensitivity'], gross_income, deductions, credits, filing_status, tax_year, final_tax_owed, state_tax
+            )
+        except (TypeError, ValueError) as e:
+            return jsonify({"message": f"Invalid sensitivity grid: {e}"}), 400
+
+    if data.get('compare_states'):
+        try:
+            response_data["state_comparison"] = _state_comparison(
+                data['compare_states'], taxable_income, filing_status, tax_year, final_tax_owed, gross_income
+            )
+        except (TypeError, ValueError) as e:
+            return jsonify({"message": f"Invalid state comparison: {e}"}), 400
 
     return jsonify(response_data), 200
 
+
+MAX_BATCH_SCENARIOS = 200_000
+SWEEP_FIELDS = ('gross_income', 'deductions', 'credits')
+
+
+def _batch_inputs(data):
+    """
+    Turns a batch request into equal-length (gross, deductions, credits)
+    arrays plus the filing status(es) and state(s). Either every field is an array / a
+    scalar shared by all rows, or `sweep` = {field, start, stop, step} varies
+    one field over a range with the other fields as scalars.
+    """
+    sweep = data.get('sweep')
+    if sweep:
+        if not isinstance(sweep, dict):
+            raise ValueError("sweep must be an object with field, start, stop and step")
+        field = sweep.get('field', 'gross_income')
+        if field not in SWEEP_FIELDS:
+            raise ValueError(f"sweep.field must be one of: {', '.join(SWEEP_FIELDS)}")
+        start, stop, step = float(sweep['start']), float(sweep['stop']), float(sweep['step'])
+        if step <= 0 or stop < start:
+            raise ValueError("sweep needs step > 0 and stop >= start")
+        if (stop - start) / step + 1 > MAX_BATCH_SCENARIOS:
+            raise ValueError(f"A batch can have at most {MAX_BATCH_SCENARIOS} scenarios")
+        values = {field: np.arange(start, stop + step / 2, step)}
+        count = len(values[field])
+    else:
+        lengths = {len(data[f]) for f in SWEEP_FIELDS + ('filing_status', 'state') if isinstance(data.get(f), list)}
+        if len(lengths) != 1:
+            raise ValueError("Provide gross_income, deductions, credits, filing_status and state as equal-length arrays "
+                             "(or scalars shared by every row), or a sweep specification")
+        count = lengths.pop()
+        if count > MAX_BATCH_SCENARIOS:
+            raise ValueError(f"A batch can have at most {MAX_BATCH_SCENARIOS} scenarios")
+        values = {}
+
+    for field in SWEEP_FIELDS:
+        if field not in values:
+            values[field] = np.broadcast_to(np.asarray(data.get(field, 0), dtype=float), (count,))
+    filing_status = data.get('filing_status', 'married_jointly')
+    state = data.get('state')
+    if sweep and (isinstance(filing_status, list) or isinstance(state, list)):
+        raise ValueError("filing_status and state must be single values in a sweep")
+    return values['gross_income'], values['deductions'], values['credits'], filing_status, state
+
+
+@advisor_bp.route('/tools/income-tax/batch', methods=['POST'])
+@advisor_required
+def income_tax_batch_tool(current_user):
+    """
+    Same analysis as /tools/income-tax for many scenarios at once, computed
+    with NumPy in one pass. Results are returned as parallel arrays (one
+    entry per scenario, in request order) so they can be charted directly;
+    a sweep also returns the swept values for the x-axis. With `state`
+    (one state, or one per row to compare relocation scenarios) state tax
+    and combined totals are available as extra columns.
+    """
+    data = request.get_json()
+    if not data:
+        return jsonify({"message": "Request body is missing"}), 400
+
+    try:
+        gross, deductions, credits, filing_status, state = _batch_inputs(data)
+        tax_year = data['tax_year'] if data.get('tax_year') is not None else 2025
+        taxable = np.maximum(round_cents(gross - deductions), 0.0)
+        tax_before_credits, marginal = compute_federal_tax_batch(taxable, filing_status, tax_year)
+        if state:
+            state_tax, state_marginal = compute_state_tax_batch(taxable, state, filing_status, tax_year)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"message": f"Invalid batch request: {e}"}), 400
+
+    # Rounded to cents before credits are applied, as /tools/income-tax does
+    tax_before_credits = round_cents(tax_before_credits)
+    final_tax_owed = np.maximum(round_cents(tax_before_credits - credits), 0.0)
+    if state:
+        state_tax = round_cents(state_tax)
+    effective = np.divide(final_tax_owed * 100, gross, out=np.zeros_like(final_tax_owed), where=gross > 0)
+    columns = {
+        "taxable_income": lambda: taxable,
+        "tax_before_credits": lambda: tax_before_credits,
+        "final_tax_owed": lambda: final_tax_owed,
+        "effective_tax_rate_percent": lambda: np.round(effective, 2),
+        "marginal_tax_rate_percent": lambda: np.round(marginal * 100, 2),
+    }
+    if state:
+        total = final_tax_owed + state_tax
+        columns.update({
+            "state_tax": lambda: state_tax,
+            "total_tax_owed": lambda: np.round(total, 2),
+            "combined_effective_tax_rate_percent": lambda: np.round(
+                np.divide(total * 100, gross, out=np.zeros_like(total), where=gross > 0), 2
+            ),
+            "combined_marginal_tax_rate_percent": lambda: np.round((marginal + state_marginal) * 100, 2),
+        })
+    # Encoding floats dominates the response time for big batches, so the
+    # inputs are not echoed back and callers can ask for fewer columns.
+    fields = data.get('fields') or list(columns)
+    if not isinstance(fields, list) or not all(isinstance(field, str) for field in fields):
+        return jsonify({"message": f"fields must be a list of column names. Available: {', '.join(columns)}"}), 400
+    unknown = [field for field in fields if field not in columns]
+    if unknown:
+        return jsonify({"message": f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(columns)}"}), 400
+
+    response_data = {
+        "count": int(len(taxable)),
+        "results": {field: columns[field]().tolist() for field in fields}
+    }
+    if data.get('sweep'):
+        field = data['sweep'].get('field', 'gross_income')
+        response_data["sweep"] = {
+            "field": field,
+            "values": {'gross_income': gross, 'deductions': deductions, 'credits': credits}[field].tolist()
+        }
+    return jsonify(response_data), 200
+
+
+def _load_client_data(current_user, client_id, loader):
+    """
+    Runs loader(conn, client_id) for one of the advisor's clients. Returns
+    (data, None), (None, None) without a client_id, or (None, error response).
+    """
+    if client_id is None:
+        return None, None
+    conn = get_db_connection(read_only=True)
+    try:
+        if not conn.prepared_fetchone(
+            "SELECT 1 FROM advisor_client_map WHERE advisor_user_id = %s AND client_user_id = %s",
+            (current_user['user_id'], client_id)
+        ):
+            return None, (jsonify({"message": "You are not authorized to view this client's financials"}), 403)
+        return loader(conn, client_id), None
+    except Exception as e:
+        return None, (jsonify({"message": f"An error occurred: {e}"}), 500)
+    finally:
+        conn.close()
+
+
+@advisor_bp.route('/tools/retirement-projection', methods=['POST'])
+@advisor_required
+def retirement_projection_tool(current_user):
+    """
+    Monte Carlo retirement projection. With a client_id the inputs are
+    seeded from that client's saved financials; any input can be overridden
+    in the body. Pass back the returned seed to reproduce a saved result.
+    """
+    data = request.get_json()
+    if not data:
+        return jsonify({"message": "Request body is missing"}), 400
+
+    client_id = data.get('client_id')
+    financials, error = _load_client_data(current_user, client_id, retirement_projection.load_client_financials)
+    if error:
+        return error
+
+    try:
+        inputs = retirement_projection.projection_inputs(data, financials)
+        seed = data.get('seed')
+        if seed is not None and (not isinstance(seed, int) or seed < 0):
+            raise ValueError("seed must be a non-negative integer")
+        projection = retirement_projection.run_projection(
+            inputs, int(data.get('paths', retirement_projection.DEFAULT_PATHS)), seed
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({"message": f"Invalid projection request: {e}"}), 400
+
+    return jsonify({"inputs": dict(inputs, client_id=client_id), "results": projection}), 200
+
+
+@advisor_bp.route('/tools/cash-flow-projection', methods=['POST'])
+@advisor_required
+def cash_flow_projection_tool(current_user):
+    """
+    Year-by-year taxes and net cash flow for up to 40 years. With a
+    client_id, income sources and liabilities come from the client's saved
+    financials unless given in the body. The response can be saved as-is
+    through POST /clients/<id>/plans.
+    """
+    data = request.get_json()
+    if not data:
+        return jsonify({"message": "Request body is missing"}), 400
+
+    client_id = data.get('client_id')
+    saved, error = _load_client_data(current_user, client_id, cashflow_projection.load_client_cashflows)
+    if error:
+        return error
+
+    try:
+        inputs = cashflow_projection.projection_inputs(data, saved)
+        projection = cashflow_projection.run_projection(inputs)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"message": f"Invalid projection request: {e}"}), 400
+
+    return jsonify({"inputs": dict(inputs, client_id=client_id), "results": projection}), 200
+
+
 @advisor_bp.route('/clients/<int:client_id>/plans', methods=['POST'])
 @advisor_required
 def create_financial_plan(current_user, client_id):
@@ -80,11 +396,10 @@ def create_financial_plan(current_user, client_id):
     cursor = conn.cursor()
     try:
         # Verify the client is assigned to this advisor first
-        cursor.execute(
-            "SELECT client_user_id FROM advisor_client_map WHERE advisor_user_id = %s AND client_user_id = %s",
+        if not conn.prepared_fetchone(
+            "SELECT 1 FROM advisor_client_map WHERE advisor_user_id = %s AND client_user_id = %s",
             (advisor_id, client_id)
-        )
-        if not cursor.fetchone():
+        ):
             return jsonify({"message": "You are not authorized to create a plan for this client"}), 403
 
         # Insert the new financial plan
@@ -2,6 +2,8 @@ from functools import wraps
 from flask import request, jsonify, current_app
 import jwt
 from config import Config
+from utils.db import get_db_connection
+from utils.ics_feed import hash_feed_token
 
 def token_required(f):
     """A decorator to ensure a valid JWT is present."""
@@ -17,6 +19,9 @@ def token_required(f):
 
         try:
             data = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=["HS256"])
+            # Purpose-specific tokens (e.g. '2fa_pending') are not session tokens
+            if 'type' in data:
+                return jsonify({'message': 'Token is invalid!'}), 401
             # Pass the decoded data to the route
             kwargs['current_user'] = data 
         except jwt.ExpiredSignatureError:
@@ -48,6 +53,8 @@ def document_token_required(f):
         try:
             # Using current_app.config to safely access the running app's configuration
             data = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=["HS256"])
+            if 'type' in data:
+                return jsonify({'message': 'Token is invalid!'}), 401
             kwargs['current_user'] = data
         except jwt.ExpiredSignatureError:
             return jsonify({'message': 'Token has expired!'}), 401
@@ -108,4 +115,32 @@ def client_required(f):
             return jsonify({'message': 'Client access required!'}), 403
         
         return f(*args, **kwargs)
-    return decorated
\ No newline at end of file
+    return decorated
+
+def ics_feed_token_required(f):
+    """
+    A decorator for calendar feed URLs: calendar apps can't send headers, so
+    the opaque feed token comes from the query string and is looked up by
+    its hash in calendar_feed_tokens. It grants access to the feed only.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        token = request.args.get('token')
+        if not token:
+            return jsonify({'message': 'Token is missing!'}), 401
+
+        conn = get_db_connection()
+        try:
+            row = conn.prepared_fetchone(
+                "SELECT t.user_id, u.role FROM calendar_feed_tokens t JOIN users u ON u.id = t.user_id "
+                "WHERE t.token_hash = %s",
+                (hash_feed_token(token),)
+            )
+        finally:
+            conn.close()
+        if not row or row['role'] not in ('advisor', 'client'):
+            return jsonify({'message': 'This calendar feed URL is invalid or has been revoked'}), 401
+
+        kwargs['current_user'] = {'user_id': row['user_id'], 'role': row['role']}
+        return f(*args, **kwargs)
+    return decorated
@@ -2,9 +2,11 @@ import jwt
 from werkzeug.security import check_password_hash
 import datetime
 import random
-from flask import Blueprint, request, jsonify
-from utils.db import get_db_connection
+from flask import Blueprint, current_app, request, jsonify, stream_with_context
+from utils.db import get_db_connection, replica_reads
 from utils.email_sender import send_2fa_code_email # Import the email utility
+from utils.ics_feed import feed_version, generate_feed, new_feed_token
+from auth.decorators import ics_feed_token_required, token_required
 from config import Config
 
 auth_bp = Blueprint('auth_bp', __name__)
@@ -21,8 +23,7 @@ def login():
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     try:
-        cursor.execute("SELECT * FROM users WHERE email = %s", (email,))
-        user = cursor.fetchone()
+        user = conn.prepared_fetchone("SELECT * FROM users WHERE email = %s", (email,))
 
         if not user or not check_password_hash(user['password_hash'], password):
             return jsonify({"message": "Invalid credentials"}), 401
@@ -200,3 +201,76 @@ def resend_2fa():
     finally:
         cursor.close()
         conn.close()
+
+
+@auth_bp.route('/calendar-feed-token', methods=['POST'])
+@token_required
+def issue_calendar_feed_token(current_user):
+    """
+    Issues a subscribable .ics feed URL for the logged-in advisor or client.
+    The URL's token only opens the feed; issuing a new one revokes the
+    previous URL.
+    """
+    if current_user.get('role') not in ('advisor', 'client'):
+        return jsonify({"message": "Calendar feeds are available to advisors and clients only"}), 403
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        feed_token, token_hash = new_feed_token()
+        cursor.execute(
+            "INSERT INTO calendar_feed_tokens (user_id, token_hash) VALUES (%s, %s) "
+            "ON DUPLICATE KEY UPDATE token_hash = VALUES(token_hash)",
+            (current_user['user_id'], token_hash)
+        )
+        conn.commit()
+
+        return jsonify({
+            "token": feed_token,
+            "feed_url": f"{request.host_url}api/auth/calendar.ics?token={feed_token}"
+        }), 200
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"message": f"An error occurred: {e}"}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+
+@auth_bp.route('/calendar.ics', methods=['GET'])
+@ics_feed_token_required
+@replica_reads
+def calendar_feed(current_user):
+    """
+    Streams the user's appointments as iCalendar. Answers 304 when the
+    caller's ETag or Last-Modified is still current.
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        try:
+            last_modified, etag = feed_version(cursor, current_user['role'], current_user['user_id'])
+        finally:
+            cursor.close()
+    except Exception as e:
+        return jsonify({"message": f"An error occurred: {e}"}), 500
+    finally:
+        # The body takes its own connection when (and if) it is read
+        conn.close()
+    last_modified = datetime.datetime.fromtimestamp(last_modified, datetime.timezone.utc)
+
+    if request.if_none_match.contains(etag) or (
+        not request.if_none_match and request.if_modified_since and request.if_modified_since >= last_modified
+    ):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(
+            stream_with_context(generate_feed(get_db_connection, current_user['role'], current_user['user_id'])),
+            mimetype='text/calendar'
+        )
+        response.headers['Content-Disposition'] = 'inline; filename="regal-appointments.ics"'
+
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
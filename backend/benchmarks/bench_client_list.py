@@ -0,0 +1,132 @@
+"""
+Compares the advisor client list query with a correlated next-appointment
+subquery against the version that reads client_profiles.next_appointment_at.
+
+An advisor with --clients clients and --appointments appointments per client
+is seeded inside a transaction that is rolled back at the end:
+
+    python -m benchmarks.bench_client_list --clients 5000 --appointments 12
+"""
+import argparse
+import datetime
+import statistics
+import time
+import uuid
+
+from utils.db import get_db_connection
+
+CORRELATED_SQL = """
+    SELECT
+        c.id, c.email, c.first_name, c.last_name, c.is_active,
+        cp.onboarding_status, cp.tier,
+        CONCAT(a.first_name, ' ', a.last_name) as advisor_name,
+        (SELECT MIN(start_time) FROM appointments app
+         WHERE app.client_user_id = c.id AND app.start_time >= CURDATE()) as next_appointment
+    FROM users c
+    JOIN client_profiles cp ON c.id = cp.client_user_id
+    JOIN advisor_client_map acm ON c.id = acm.client_user_id
+    JOIN users a ON acm.advisor_user_id = a.id
+    WHERE acm.advisor_user_id = %s
+"""
+
+MATERIALISED_SQL = """
+    SELECT
+        c.id, c.email, c.first_name, c.last_name, c.is_active,
+        cp.onboarding_status, cp.tier,
+        CONCAT(a.first_name, ' ', a.last_name) as advisor_name,
+        CASE WHEN cp.next_appointment_at >= CURDATE() THEN cp.next_appointment_at END as next_appointment,
+        cp.last_appointment_at as last_appointment
+    FROM users c
+    JOIN client_profiles cp ON c.id = cp.client_user_id
+    JOIN advisor_client_map acm ON c.id = acm.client_user_id
+    JOIN users a ON acm.advisor_user_id = a.id
+    WHERE acm.advisor_user_id = %s
+"""
+
+
+def seed_book(cursor, clients, appointments):
+    tag = uuid.uuid4().hex[:8]
+    cursor.execute(
+        "INSERT INTO users (email, password_hash, role, first_name, last_name) VALUES (%s, 'x', 'advisor', 'Bench', 'Advisor')",
+        (f"bench-advisor-{tag}@example.com",)
+    )
+    advisor_id = cursor.lastrowid
+
+    cursor.executemany(
+        "INSERT INTO users (email, password_hash, role, first_name, last_name) VALUES (%s, 'x', 'client', 'Bench', %s)",
+        [(f"bench-{tag}-{i}@example.com", f"Client {i}") for i in range(clients)]
+    )
+    cursor.execute("SELECT id FROM users WHERE email LIKE %s", (f"bench-{tag}-%",))
+    client_ids = [row[0] for row in cursor.fetchall()]
+
+    cursor.executemany(
+        "INSERT INTO client_profiles (client_user_id, onboarding_status) VALUES (%s, 'In-Progress')",
+        [(cid,) for cid in client_ids]
+    )
+    cursor.executemany(
+        "INSERT INTO advisor_client_map (advisor_user_id, client_user_id) VALUES (%s, %s)",
+        [(advisor_id, cid) for cid in client_ids]
+    )
+
+    # Half of each client's history is in the past, half in the future.
+    base = datetime.datetime.now().replace(minute=0, second=0, microsecond=0)
+    rows = []
+    for cid in client_ids:
+        for n in range(appointments):
+            start = base + datetime.timedelta(days=30 * (n - appointments // 2), hours=cid % 8)
+            rows.append((advisor_id, cid, "Review", start, start + datetime.timedelta(hours=1)))
+    for i in range(0, len(rows), 5000):
+        cursor.executemany(
+            "INSERT INTO appointments (advisor_user_id, client_user_id, title, start_time, end_time) VALUES (%s, %s, %s, %s, %s)",
+            rows[i:i + 5000]
+        )
+
+    placeholders = ','.join(['%s'] * len(client_ids))
+    cursor.execute(f"""
+        UPDATE client_profiles cp
+        SET cp.next_appointment_at = (
+                SELECT MIN(a.start_time) FROM appointments a
+                WHERE a.client_user_id = cp.client_user_id AND a.start_time >= CURDATE()),
+            cp.last_appointment_at = (
+                SELECT MAX(a.start_time) FROM appointments a
+                WHERE a.client_user_id = cp.client_user_id AND a.start_time < CURDATE())
+        WHERE cp.client_user_id IN ({placeholders})
+    """, tuple(client_ids))
+    return advisor_id
+
+
+def measure(cursor, sql, advisor_id, iterations):
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        cursor.execute(sql, (advisor_id,))
+        cursor.fetchall()
+        samples.append(time.perf_counter() - started)
+    ordered = sorted(samples)
+    return ordered[len(ordered) // 2] * 1000, ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, statistics.mean(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=5000)
+    parser.add_argument("--appointments", type=int, default=12, help="appointments per client")
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        conn.start_transaction()
+        advisor_id = seed_book(cursor, args.clients, args.appointments)
+        print(f"advisor {advisor_id}: {args.clients} clients x {args.appointments} appointments, {args.iterations} iterations")
+        for label, sql in (("correlated subquery", CORRELATED_SQL), ("materialised column", MATERIALISED_SQL)):
+            p50, p99, mean = measure(cursor, sql, advisor_id, args.iterations)
+            print(f"  {label:<20} p50={p50:8.2f} ms  p99={p99:8.2f} ms  mean={mean:8.2f} ms")
+    finally:
+        conn.rollback()
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Measures p50/p99 latency of loading a full client profile with the old
+sequential queries versus the single round-trip loader.
+
+A client with the requested number of rows per section is seeded inside a
+transaction that is rolled back at the end, so the database is left as it
+was:
+
+    python -m benchmarks.bench_client_profile --rows 20 --iterations 500
+"""
+import argparse
+import datetime
+import json
+import statistics
+import time
+import uuid
+
+from utils.db import get_db_connection
+from utils.client_profile import _APPOINTMENTS_STATEMENT, _PROFILE_STATEMENTS, load_client_profile
+
+
+def seed_client(cursor, rows):
+    cursor.execute(
+        "INSERT INTO users (email, password_hash, role, first_name, last_name) VALUES (%s, 'x', 'client', 'Bench', 'Client')",
+        (f"bench-{uuid.uuid4().hex[:12]}@example.com",)
+    )
+    client_id = cursor.lastrowid
+    cursor.execute("SELECT id FROM users WHERE role = 'advisor' LIMIT 1")
+    advisor = cursor.fetchone()
+    advisor_id = advisor['id'] if advisor else client_id
+
+    cursor.execute("INSERT INTO client_profiles (client_user_id, onboarding_status) VALUES (%s, 'In-Progress')", (client_id,))
+    cursor.execute("INSERT INTO spouses (client_user_id, first_name, last_name) VALUES (%s, 'Bench', 'Spouse')", (client_id,))
+    cursor.executemany(
+        "INSERT INTO family_members (client_user_id, relationship, full_name, date_of_birth, resident_state) VALUES (%s, 'Child', %s, '2010-01-01', 'CA')",
+        [(client_id, f"Child {i}") for i in range(rows)]
+    )
+    cursor.executemany(
+        "INSERT INTO financials_income (client_user_id, source, owner, monthly_amount) VALUES (%s, %s, 'Client', 1000)",
+        [(client_id, f"Source {i}") for i in range(rows)]
+    )
+    cursor.executemany(
+        "INSERT INTO financials_assets (client_user_id, asset_type, description, owner, balance) VALUES (%s, 'Savings', %s, 'Client', 5000)",
+        [(client_id, json.dumps({"note": f"Asset {i}"})) for i in range(rows)]
+    )
+    cursor.executemany(
+        "INSERT INTO financials_liabilities (client_user_id, liability_type, description, balance) VALUES (%s, 'Loan', %s, 2500)",
+        [(client_id, f"Liability {i}") for i in range(rows)]
+    )
+    cursor.executemany(
+        "INSERT INTO documents (client_user_id, document_name, file_path) VALUES (%s, %s, '/dev/null')",
+        [(client_id, f"Document {i}") for i in range(rows)]
+    )
+    start = datetime.datetime(2030, 1, 1, 10, 0)
+    cursor.executemany(
+        "INSERT INTO appointments (advisor_user_id, client_user_id, title, start_time, end_time) VALUES (%s, %s, %s, %s, %s)",
+        [
+            (advisor_id, client_id, f"Review {i}", start + datetime.timedelta(days=i), start + datetime.timedelta(days=i, hours=1))
+            for i in range(rows)
+        ]
+    )
+    return client_id
+
+
+def load_sequential(cursor, client_id):
+    for _, statement, _ in _PROFILE_STATEMENTS + [_APPOINTMENTS_STATEMENT]:
+        cursor.execute(statement, (client_id,))
+        cursor.fetchall()
+
+
+def measure(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    ordered = sorted(samples)
+    return (
+        ordered[len(ordered) // 2] * 1000,
+        ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+        statistics.mean(samples) * 1000,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10, help="rows per list section")
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        conn.start_transaction()
+        client_id = seed_client(cursor, args.rows)
+
+        results = {
+            "sequential (9 queries)": measure(lambda: load_sequential(cursor, client_id), args.iterations),
+            "single round trip": measure(lambda: load_client_profile(cursor, client_id, include_appointments=True), args.iterations),
+        }
+        print(f"client {client_id}, {args.rows} rows per section, {args.iterations} iterations")
+        for label, (p50, p99, mean) in results.items():
+            print(f"  {label:<24} p50={p50:7.3f} ms  p99={p99:7.3f} ms  mean={mean:7.3f} ms")
+    finally:
+        conn.rollback()
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Compares plain text queries with cached server-side prepared statements for
+the hot lookups (ownership check, login and notifications).
+
+Run from the backend directory against a database with some data in it:
+
+    python -m benchmarks.bench_prepared_statements --iterations 5000
+"""
+import argparse
+import statistics
+import time
+
+from utils.db import get_db_connection
+
+QUERIES = {
+    "ownership": (
+        "SELECT 1 FROM advisor_client_map WHERE advisor_user_id = %s AND client_user_id = %s",
+        "SELECT advisor_user_id, client_user_id FROM advisor_client_map LIMIT 1",
+    ),
+    "login": (
+        "SELECT * FROM users WHERE email = %s",
+        "SELECT email FROM users LIMIT 1",
+    ),
+    "notifications": (
+        "SELECT id, message, link_url, created_at FROM notifications WHERE recipient_user_id = %s AND is_read = FALSE ORDER BY created_at DESC",
+        "SELECT recipient_user_id FROM notifications LIMIT 1",
+    ),
+}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(name, samples):
+    print(
+        f"  {name:<9} p50={percentile(samples, 50) * 1000:7.3f} ms  "
+        f"p99={percentile(samples, 99) * 1000:7.3f} ms  "
+        f"mean={statistics.mean(samples) * 1000:7.3f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        for label, (sql, sample_sql) in QUERIES.items():
+            cursor = conn.cursor()
+            cursor.execute(sample_sql)
+            params = cursor.fetchone()
+            cursor.close()
+            if not params:
+                print(f"{label}: no sample row found, skipped")
+                continue
+
+            text_samples, prepared_samples = [], []
+            for _ in range(args.iterations):
+                started = time.perf_counter()
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute(sql, params)
+                cursor.fetchall()
+                cursor.close()
+                text_samples.append(time.perf_counter() - started)
+
+                started = time.perf_counter()
+                conn.prepared_fetchall(sql, params)
+                prepared_samples.append(time.perf_counter() - started)
+
+            print(f"{label} ({args.iterations} iterations)")
+            report("text", text_samples)
+            report("prepared", prepared_samples)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Checks the federal tax engine against the reference model in
+tax_reference.py, then benchmarks single and batched computation.
+
+The checks draw random incomes (uniform, log-uniform and right around each
+bracket threshold) for every filing status and alias and compare
+compute_federal_tax, calculate_2025_federal_tax, compute_federal_tax_batch,
+compute_state_tax_batch (a random state per row) and the /tools/income-tax
+view (including its sensitivity grid) with the reference, plus a few
+properties that hold for any bracket table (tax never decreases with
+income, the breakdown adds up, effective rate <= marginal rate). Exits
+non-zero on a mismatch or when batch throughput falls below
+--min-batch-rate.
+
+Run from the backend directory; no database is needed:
+
+    python -m benchmarks.bench_tax_engine --checks 20000 --min-batch-rate 1000000
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from decimal import Decimal
+
+import numpy as np
+from flask import Flask
+
+from advisor.tax_calculator import (
+    FILING_STATUS_ALIASES, FILING_STATUSES, calculate_2025_federal_tax, compute_federal_tax,
+    compute_federal_tax_batch, normalize_filing_status,
+)
+from advisor.tools import income_tax_tool
+from advisor.state_tax import compute_state_tax_batch
+from benchmarks.tax_reference import load_brackets, load_state_brackets, reference_marginal_rate, reference_tax
+
+YEAR = 2025
+CENT = Decimal('0.01')
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def sample_cases(rng, brackets, count):
+    """(filing status as a caller would send it, taxable income) pairs."""
+    statuses = list(FILING_STATUSES) + list(FILING_STATUS_ALIASES)
+    cases = []
+    for _ in range(count):
+        status = rng.choice(statuses)
+        table = brackets[normalize_filing_status(status)]
+        kind = rng.random()
+        if kind < 0.4:
+            income = rng.uniform(0, float(table[-1][0]) * 2)
+        elif kind < 0.7:
+            income = 10 ** rng.uniform(0, 7)
+        elif kind < 0.95:
+            income = float(rng.choice(table)[0]) + rng.choice((-1, -0.01, 0, 0.01, 1))
+        else:
+            income = rng.choice((0, -1, -50000))
+        cases.append((status, round(income, 2)))
+    return cases
+
+
+def check(count, seed):
+    """Returns a list of failure descriptions (empty when everything matches)."""
+    rng = random.Random(seed)
+    brackets = load_brackets(YEAR)
+    cases = sample_cases(rng, brackets, count)
+    failures = []
+
+    def expect(ok, message):
+        if not ok:
+            failures.append(message)
+
+    for status, income in cases:
+        table = brackets[normalize_filing_status(status)]
+        expected = reference_tax(table, income).quantize(CENT)
+        result = compute_federal_tax(income, status, YEAR)
+        expect(abs(Decimal(str(result['tax'])) - expected) <= CENT,
+               f"compute_federal_tax({income}, {status}) = {result['tax']}, reference {expected}")
+        expect(Decimal(str(result['marginal_rate_percent'])) == reference_marginal_rate(table, income) * 100,
+               f"marginal rate for ({income}, {status}) = {result['marginal_rate_percent']}")
+        breakdown_total = sum(Decimal(str(row['tax'])) for row in result['brackets'])
+        expect(abs(breakdown_total - expected) <= CENT * len(result['brackets']),
+               f"breakdown for ({income}, {status}) sums to {breakdown_total}, reference {expected}")
+        if income > 0:
+            expect(result['tax'] <= income * result['marginal_rate_percent'] / 100 + 0.01,
+                   f"effective rate above marginal rate for ({income}, {status})")
+        if normalize_filing_status(status) == status:
+            expect(calculate_2025_federal_tax(income, status) == result['tax'],
+                   f"calculate_2025_federal_tax({income}, {status}) differs from compute_federal_tax")
+
+    incomes = np.array([income for _, income in cases])
+    statuses = [status for status, _ in cases]
+    tax, marginal = compute_federal_tax_batch(incomes, statuses, YEAR)
+    for i, (status, income) in enumerate(cases):
+        table = brackets[normalize_filing_status(status)]
+        expect(abs(Decimal(tax[i]) - reference_tax(table, income)) <= CENT,
+               f"batch tax for ({income}, {status}) = {tax[i]}")
+        expect(abs(Decimal(marginal[i]) - reference_marginal_rate(table, income)) < Decimal('1e-9'),
+               f"batch marginal rate for ({income}, {status}) = {marginal[i]}")
+
+    for status in FILING_STATUSES:
+        sweep = np.sort(np.concatenate([incomes, np.linspace(0, 2_000_000, 20001)]))
+        swept_tax, _ = compute_federal_tax_batch(sweep, status, YEAR)
+        expect(bool(np.all(np.diff(swept_tax) >= -1e-9)), f"tax decreases with income somewhere for {status}")
+
+    state_brackets = load_state_brackets(YEAR)
+    states = [rng.choice(sorted(state_brackets)) for _ in cases]
+    state_tax, state_marginal = compute_state_tax_batch(incomes, states, statuses, YEAR)
+    for i, ((status, income), state) in enumerate(zip(cases, states)):
+        schedules = state_brackets[state]
+        table = schedules.get(normalize_filing_status(status), schedules['single'])
+        expect(abs(Decimal(state_tax[i]) - reference_tax(table, income)) <= CENT,
+               f"{state} tax for ({income}, {status}) = {state_tax[i]}")
+        expect(abs(Decimal(state_marginal[i]) - reference_marginal_rate(table, income)) < Decimal('1e-9'),
+               f"{state} marginal rate for ({income}, {status}) = {state_marginal[i]}")
+
+    app = Flask(__name__)
+    view = getattr(income_tax_tool, '__wrapped__', income_tax_tool)
+    for status, income in cases[:min(count, 2000)]:
+        deductions, credits = round(rng.uniform(0, 40000), 2), round(rng.uniform(0, 8000), 2)
+        gross = max(income, 0) + deductions
+        with app.test_request_context(json={
+            "gross_income": gross, "deductions": deductions, "credits": credits,
+            "filing_status": status, "tax_year": YEAR,
+        }):
+            response, status_code = view({"user_id": 0})
+        body = response.get_json()['results']
+        table = brackets[normalize_filing_status(status)]
+        expected = max(reference_tax(table, max(gross - deductions, 0)).quantize(CENT) - Decimal(str(credits)), 0)
+        expect(status_code == 200 and abs(Decimal(str(body['final_tax_owed'])) - expected) <= CENT,
+               f"income_tax_tool({gross}, {deductions}, {credits}, {status}) owed {body['final_tax_owed']}, "
+               f"reference {expected}")
+
+    grid = {"income_deltas": [-25000, -1, 0, 1, 25000], "deduction_deltas": [0, 0.01, 10000, 23500]}
+    for status, income in cases[:min(count, 200)]:
+        with app.test_request_context(json={
+            "gross_income": max(income, 0), "credits": 500, "filing_status": status, "sensitivity": grid,
+        }):
+            response, _ = view({"user_id": 0})
+        sensitivity = response.get_json()['sensitivity']
+        table = brackets[normalize_filing_status(status)]
+        for row, income_delta in zip(sensitivity['final_tax_owed'], grid['income_deltas']):
+            for owed, deduction_delta in zip(row, grid['deduction_deltas']):
+                taxable = max(max(income, 0) + income_delta, 0) - deduction_delta
+                expected = max(reference_tax(table, round(taxable, 2)).quantize(CENT) - 500, 0)
+                expect(abs(Decimal(str(owed)) - expected) <= CENT,
+                       f"sensitivity cell ({income} {income_delta:+}, deductions +{deduction_delta}, {status}) "
+                       f"owed {owed}, reference {expected}")
+    return failures
+
+
+def bench_single(iterations, seed):
+    rng = random.Random(seed)
+    cases = sample_cases(rng, load_brackets(YEAR), iterations)
+    for label, fn in (("compute_federal_tax", compute_federal_tax),
+                      ("calculate_2025_federal_tax", lambda income, status, _: calculate_2025_federal_tax(income, status))):
+        samples = []
+        for status, income in cases:
+            started = time.perf_counter()
+            fn(income, status, YEAR)
+            samples.append(time.perf_counter() - started)
+        print(
+            f"  {label:<27} p50={percentile(samples, 50) * 1e6:7.2f} us  "
+            f"p99={percentile(samples, 99) * 1e6:7.2f} us  mean={statistics.mean(samples) * 1e6:7.2f} us"
+        )
+
+
+def bench_batch(sizes, repeats, seed):
+    """Best-of-`repeats` time per batch size; returns scenarios/second for the largest size."""
+    rng = np.random.default_rng(seed)
+    rate = 0.0
+    for size in sizes:
+        incomes = rng.uniform(0, 1_500_000, size)
+        statuses = rng.choice(FILING_STATUSES, size).tolist()
+        best = min(_timed(compute_federal_tax_batch, incomes, statuses, YEAR) for _ in range(repeats))
+        rate = size / best
+        print(f"  batch of {size:>7}  best={best * 1000:8.2f} ms  {rate:14,.0f} scenarios/s")
+    return rate
+
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--checks", type=int, default=5000, help="random cases compared with the reference")
+    parser.add_argument("--iterations", type=int, default=20000, help="single-call timing samples")
+    parser.add_argument("--batch-sizes", default="1000,10000,100000")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=2025)
+    parser.add_argument("--min-batch-rate", type=float, default=0,
+                        help="fail if the largest batch runs below this many scenarios/s")
+    args = parser.parse_args()
+
+    failures = check(args.checks, args.seed)
+    print(f"reference checks ({args.checks} cases, seed {args.seed}): {len(failures)} failures")
+    for failure in failures[:20]:
+        print(f"  {failure}")
+
+    print(f"single calls ({args.iterations} iterations)")
+    bench_single(args.iterations, args.seed)
+    print(f"batched (best of {args.repeats})")
+    rate = bench_batch([int(size) for size in args.batch_sizes.split(",")], args.repeats, args.seed)
+
+    if rate < args.min_batch_rate:
+        print(f"batch throughput {rate:,.0f}/s is below --min-batch-rate {args.min_batch_rate:,.0f}/s")
+    if failures or rate < args.min_batch_rate:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Checks the query budgets of the hot advisor endpoints against a real
+database. The client list, one client's profile and the dashboard stats are
+requested through the Flask test client for an existing advisor and one of
+their clients, each inside a query_budget() block, with the profile and
+dashboard caches bypassed so the uncached path is counted. Nothing is
+written. Exits non-zero when an endpoint fails or runs more statements
+than its budget:
+
+    python -m benchmarks.check_query_budgets --advisor-id 7
+"""
+import argparse
+import datetime
+import sys
+
+import jwt
+from flask import Flask
+
+from config import Config
+from advisor import clients, dashboard  # noqa: F401 (registers the routes)
+from advisor.routes import advisor_bp
+from utils.client_profile import profile_cache
+from utils.dashboard_stats import invalidate_dashboard
+from utils.db import get_db_connection, init_db, query_budget
+
+# (path, statements allowed). Client list: the page query, plus up to three
+# to recompute dates that have passed since the daily sweep. Profile:
+# ownership check, version, the multi-statement profile load and two for
+# recurring occurrences.
+# Dashboard: the stats query and two for recurring occurrences.
+QUERY_BUDGETS = [
+    ("/api/advisor/clients", 4),
+    ("/api/advisor/clients?sort=next_appointment&limit=50", 4),
+    ("/api/advisor/clients/{client_id}", 5),
+    ("/api/advisor/dashboard/stats", 3),
+]
+
+
+def pick_advisor(advisor_id=None):
+    """(advisor id, one of their client ids) for the given or the busiest advisor."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            """
+            SELECT advisor_user_id, MIN(client_user_id) FROM advisor_client_map
+            WHERE %s IS NULL OR advisor_user_id = %s
+            GROUP BY advisor_user_id ORDER BY COUNT(*) DESC LIMIT 1
+            """,
+            (advisor_id, advisor_id)
+        )
+        return cursor.fetchone()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--advisor-id", type=int, help="advisor to request as (default: the one with most clients)")
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.register_blueprint(advisor_bp, url_prefix='/api/advisor')
+    init_db(app)
+
+    row = pick_advisor(args.advisor_id)
+    if not row:
+        print("No advisor with clients found; nothing to check.")
+        sys.exit(1)
+    advisor_id, client_id = row
+    token = jwt.encode({
+        'user_id': advisor_id, 'role': 'advisor',
+        'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=10)
+    }, Config.JWT_SECRET_KEY, algorithm='HS256')
+    headers = {'Authorization': f'Bearer {token}'}
+
+    # Only the in-process cache (empty in a fresh process) is consulted
+    profile_cache.backend = None
+    failures = 0
+    client = app.test_client()
+    print(f"advisor {advisor_id}, client {client_id}")
+    for path, budget in QUERY_BUDGETS:
+        path = path.format(client_id=client_id)
+        invalidate_dashboard(advisor_id)
+        try:
+            with query_budget(budget) as used:
+                response = client.get(path, headers=headers)
+        except AssertionError as e:
+            failures += 1
+            print(f"  FAIL {path}: {e}")
+            continue
+        if response.status_code != 200:
+            failures += 1
+            print(f"  FAIL {path}: HTTP {response.status_code} {response.get_data(as_text=True)[:200]}")
+            continue
+        print(f"  ok   {path}: {used.count}/{budget} queries")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Slow, obviously-correct federal and state tax model used by
+bench_tax_engine.py to check the real engines. It reads the bracket JSON
+itself and works in Decimal, taxing the slice of income inside each bracket
+at that bracket's rate; nothing is shared with advisor/tax_calculator.py or
+advisor/state_tax.py except the data.
+"""
+import json
+import os
+from decimal import Decimal
+
+TAX_DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'advisor', 'tax_data')
+
+
+def _brackets(rows):
+    bounds = [Decimal(str(lower)) for lower, _ in rows]
+    return [
+        (bounds[i], bounds[i + 1] if i + 1 < len(bounds) else None, Decimal(str(rate)))
+        for i, (_, rate) in enumerate(rows)
+    ]
+
+
+def load_brackets(year):
+    """{filing_status: [(lower, upper or None, rate), ...]} with Decimal values."""
+    with open(os.path.join(TAX_DATA_DIR, f'federal_{year}.json')) as f:
+        data = json.load(f)
+    return {filing_status: _brackets(rows) for filing_status, rows in data['brackets'].items()}
+
+
+def load_state_brackets(year):
+    """
+    {state code: {filing_status: brackets}} for every state, with no-tax and
+    flat states written as one-bracket schedules. Statuses a state does not
+    list are missing; the state's single schedule applies to them.
+    """
+    with open(os.path.join(TAX_DATA_DIR, f'states_{year}.json')) as f:
+        data = json.load(f)
+    states = {}
+    for code, spec in data['states'].items():
+        if spec['type'] == 'progressive':
+            states[code] = {status: _brackets(rows) for status, rows in spec['brackets'].items()}
+        else:
+            states[code] = {'single': _brackets([[0, spec.get('rate', 0)]])}
+    return states
+
+
+def reference_tax(brackets, taxable_income):
+    income = max(Decimal(str(taxable_income)), Decimal(0))
+    tax = Decimal(0)
+    for lower, upper, rate in brackets:
+        if income <= lower:
+            break
+        top = income if upper is None else min(income, upper)
+        tax += (top - lower) * rate
+    return tax
+
+
+def reference_marginal_rate(brackets, taxable_income):
+    """Rate on the next dollar earned."""
+    income = max(Decimal(str(taxable_income)), Decimal(0))
+    return [rate for lower, _, rate in brackets if lower <= income][-1]
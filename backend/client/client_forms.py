@@ -1,6 +1,6 @@
 from flask import jsonify
 from auth.decorators import client_required
-from utils.db import get_db_connection
+from utils.db import get_db_connection, replica_reads
 from .routes import client_bp
 
 def get_form_structure(form_name):
@@ -63,6 +63,7 @@ def get_form_structure(form_name):
 
 @client_bp.route('/forms/assets', methods=['GET'])
 @client_required
+@replica_reads
 def get_assets_form(current_user):
     try:
         structure = get_form_structure('assets')
@@ -72,6 +73,7 @@ def get_assets_form(current_user):
 
 @client_bp.route('/forms/liabilities', methods=['GET'])
 @client_required
+@replica_reads
 def get_liabilities_form(current_user):
     try:
         structure = get_form_structure('liabilities')
@@ -81,6 +83,7 @@ def get_liabilities_form(current_user):
 
 @client_bp.route('/forms/investor-profile', methods=['GET'])
 @client_required
+@replica_reads
 def get_investor_profile_form(current_user):
     try:
         structure = get_form_structure('investor_profile')
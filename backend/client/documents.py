@@ -3,6 +3,7 @@ import os
 from flask import current_app, jsonify, request, send_from_directory
 from auth.decorators import client_required, document_token_required
 from utils.db import get_db_connection
+from utils.client_profile import bump_profile_version
 from .routes import client_bp
 from werkzeug.utils import secure_filename
 
@@ -91,9 +92,9 @@ def upload_document(current_user):
         try:
             sql = "INSERT INTO documents (client_user_id, document_name, file_path) VALUES (%s, %s, %s)"
             cursor.execute(sql, (client_id, document_name, file_path))
-            conn.commit()
-            
             new_document_id = cursor.lastrowid
+            bump_profile_version(cursor, client_id)
+            conn.commit()
             
             return jsonify({
                 "message": "File uploaded successfully",
@@ -149,6 +150,7 @@ def delete_document(current_user, document_id):
         if file_path and os.path.exists(file_path):
             os.remove(file_path)
 
+        bump_profile_version(cursor, client_id)
         conn.commit()
         return jsonify({"message": "Document deleted successfully."}), 200
 
@@ -1,6 +1,7 @@
 from flask import jsonify, request
 from auth.decorators import client_required
 from utils.db import get_db_connection
+from utils.client_profile import bump_profile_version
 from .routes import client_bp
 
 
@@ -67,6 +68,7 @@ def update_family_info(current_user):
             ]
             cursor.executemany(sql, new_members_data)
 
+        bump_profile_version(cursor, client_id)
         conn.commit()
         return jsonify({"message": "Family information updated successfully"}), 200
 
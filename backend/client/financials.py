@@ -1,6 +1,7 @@
 from flask import jsonify, request
 from auth.decorators import client_required
 from utils.db import get_db_connection
+from utils.client_profile import bump_profile_version
 from .routes import client_bp
 import json 
 
@@ -44,6 +45,7 @@ def update_income(current_user):
             sql = "INSERT INTO financials_income (client_user_id, source, owner, monthly_amount) VALUES (%s, %s, %s, %s)"
             values = [(client_id, item.get('source'), item.get('owner'), item.get('monthly_amount')) for item in income_sources]
             cursor.executemany(sql, values)
+        bump_profile_version(cursor, client_id)
         conn.commit()
         return jsonify({"message": "Income updated successfully"}), 200
     except Exception as e:
@@ -106,6 +108,7 @@ def update_assets(current_user):
                 ) for item in assets
             ]
             cursor.executemany(sql, values)
+        bump_profile_version(cursor, client_id)
         conn.commit()
         return jsonify({"message": "Assets updated successfully"}), 200
     except Exception as e:
@@ -154,6 +157,7 @@ def update_liabilities(current_user):
             sql = "INSERT INTO financials_liabilities (client_user_id, liability_type, description, balance) VALUES (%s, %s, %s, %s)"
             values = [(client_id, item.get('liability_type'), item.get('description'), item.get('balance')) for item in liabilities]
             cursor.executemany(sql, values)
+        bump_profile_version(cursor, client_id)
         conn.commit()
         return jsonify({"message": "Liabilities updated successfully"}), 200
     except Exception as e:
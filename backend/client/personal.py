@@ -1,6 +1,10 @@
 from flask import jsonify, request
 from auth.decorators import client_required
 from utils.db import get_db_connection
+from utils.client_profile import PROFILE_COLUMNS, bump_profile_version
+from utils.search_index import client_search_index
+from utils.dashboard_stats import invalidate_dashboard
+from utils.client_counters import apply_counter_change, lock_client_dimensions
 from .routes import client_bp
 
 
@@ -15,10 +19,10 @@ def get_personal_profile(current_user):
     cursor = conn.cursor(dictionary=True)
     try:
         # Join users and client_profiles to get all data in one go
-        sql = """
+        sql = f"""
             SELECT 
                 u.mobile_country, u.mobile_code, u.mobile_number,
-                cp.*
+                {PROFILE_COLUMNS}
             FROM users u
             LEFT JOIN client_profiles cp ON u.id = cp.client_user_id
             WHERE u.id = %s
@@ -75,6 +79,7 @@ def update_personal_info(current_user):
             cursor.execute(user_sql, tuple(user_values))
 
         # --- Step 2: Upsert the client_profiles table ---
+        counted_advisor = None
         cursor.execute("SELECT id FROM client_profiles WHERE client_user_id = %s", (client_id,))
         profile_exists = cursor.fetchone()
 
@@ -102,11 +107,28 @@ def update_personal_info(current_user):
                     values.append(data[field])
 
             if len(columns) > 1:
+                # Lock the client's advisor assignment so a concurrent reassignment
+                # can't count the new profile under the wrong advisor
+                cursor.execute(
+                    "SELECT advisor_user_id FROM advisor_client_map WHERE client_user_id = %s FOR UPDATE", (client_id,)
+                )
+                cursor.fetchall()
                 placeholders = ', '.join(['%s'] * len(columns))
                 profile_sql = f"INSERT INTO client_profiles ({', '.join(columns)}) VALUES ({placeholders})"
                 cursor.execute(profile_sql, tuple(values))
+                # The new profile now counts towards its advisor's tier/status counters
+                counted = lock_client_dimensions(conn, client_id)
+                apply_counter_change(cursor, None, counted)
+                if counted and counted['advisor_user_id'] is not None:
+                    counted_advisor = counted['advisor_user_id']
 
+        bump_profile_version(cursor, client_id)
         conn.commit()
+        if counted_advisor is not None:
+            invalidate_dashboard(counted_advisor)
+        indexed = {field: data[field] for field in ('city', 'occupation') if field in data}
+        if indexed:
+            client_search_index.upsert_client(client_id, **indexed)
         return jsonify({"message": "Personal information updated successfully"}), 200
 
     except Exception as e:
@@ -1,6 +1,7 @@
 from flask import jsonify, request
 from auth.decorators import client_required
 from utils.db import get_db_connection
+from utils.client_profile import bump_profile_version
 from .routes import client_bp
 
 
@@ -70,6 +71,7 @@ def update_questionnaire_answers(current_user):
         """
         cursor.executemany(sql, upsert_data)
 
+        bump_profile_version(cursor, client_id)
         conn.commit()
         return jsonify({"message": "Investor profile updated successfully"}), 200
 
@@ -1,6 +1,7 @@
 from flask import jsonify, request
 from auth.decorators import client_required
 from utils.db import get_db_connection
+from utils.client_profile import bump_profile_version
 from .routes import client_bp
 
 
@@ -82,6 +83,7 @@ def update_spouse_info(current_user):
                 sql = f"INSERT INTO spouses ({', '.join(columns)}) VALUES ({placeholders})"
                 cursor.execute(sql, tuple(values))
 
+        bump_profile_version(cursor, client_id)
         conn.commit()
         return jsonify({"message": "Spouse information updated successfully"}), 200
 
@@ -1,11 +1,15 @@
 from flask import jsonify
 from auth.decorators import client_required
-from utils.db import get_db_connection
+from utils.db import get_db_connection, replica_reads
+from utils.client_profile import bump_profile_version, cached_profile_response, load_client_profile
+from utils.dashboard_stats import invalidate_dashboard
+from utils.client_counters import apply_counter_change, lock_client_dimensions
 from .routes import client_bp
 
 
 @client_bp.route('/profile', methods=['GET'])
 @client_required
+@replica_reads
 def get_own_profile(current_user):
     """
     Fetches all profile details for the currently logged-in client to build the summary page.
@@ -18,62 +22,25 @@ def get_own_profile(current_user):
         
     cursor = conn.cursor(dictionary=True)
     try:
-        # --- Personal & Profile Info ---
-        cursor.execute(
-            """
-            SELECT 
-                u.first_name, u.last_name, u.email, 
-                u.mobile_country, u.mobile_code, u.mobile_number, 
-                cp.* FROM users u 
-            LEFT JOIN client_profiles cp ON u.id = cp.client_user_id 
-            WHERE u.id = %s
-            """, 
-            (client_id,)
-        )
-        personal_info = cursor.fetchone()
-
-        # --- Other Info Sections ---
-        cursor.execute("SELECT * FROM spouses WHERE client_user_id = %s", (client_id,))
-        spouse_info = cursor.fetchone()
-
-        cursor.execute("SELECT * FROM family_members WHERE client_user_id = %s", (client_id,))
-        family_info = cursor.fetchall()
-        
-        cursor.execute("SELECT * FROM financials_income WHERE client_user_id = %s", (client_id,))
-        income = cursor.fetchall()
-        
-        cursor.execute("""
-            SELECT ff.field_label as question, cqa.answer 
-            FROM client_questionnaire_answers cqa
-            JOIN form_fields ff ON cqa.form_field_id = ff.id
-            WHERE cqa.client_user_id = %s
-        """, (client_id,))
-        investor_profile = cursor.fetchall()
-
-        cursor.execute("SELECT id, document_name FROM documents WHERE client_user_id = %s", (client_id,))
-        documents = cursor.fetchall()
-
-        # --- FIX: Added queries to fetch assets and liabilities ---
-        cursor.execute("SELECT * FROM financials_assets WHERE client_user_id = %s", (client_id,))
-        assets = cursor.fetchall()
-
-        cursor.execute("SELECT * FROM financials_liabilities WHERE client_user_id = %s", (client_id,))
-        liabilities = cursor.fetchall()
-
-
-        # Assemble the final JSON response
-        client_summary = {
-            "personal_info": personal_info,
-            "spouse_info": spouse_info,
-            "family_info": family_info,
-            "investor_profile": investor_profile,
-            "income": income,
-            "documents": documents,
-            "assets": assets, # <-- Added assets to the response
-            "liabilities": liabilities # <-- Added liabilities to the response
-        }
-        
-        return jsonify(client_summary), 200
+        def build_client_summary():
+            profile = load_client_profile(cursor, client_id)
+            documents = [
+                {"id": doc["id"], "document_name": doc["document_name"]}
+                for doc in profile["documents"]
+            ]
+
+            return {
+                "personal_info": profile["personal_info"],
+                "spouse_info": profile["spouse_info"],
+                "family_info": profile["family_info"],
+                "investor_profile": profile["investor_profile"],
+                "income": profile["income"],
+                "documents": documents,
+                "assets": profile["assets"],
+                "liabilities": profile["liabilities"]
+            }
+
+        return cached_profile_response(conn, client_id, 'client', build_client_summary)
 
     except Exception as e:
         return jsonify({"message": f"An error occurred: {e}"}), 500
@@ -99,10 +66,13 @@ def submit_fact_finder(current_user):
     try:
         conn.start_transaction()
 
+        before = lock_client_dimensions(conn, client_id)
         cursor.execute(
             "UPDATE client_profiles SET onboarding_status = 'Pending' WHERE client_user_id = %s",
             (client_id,)
         )
+        if before:
+            apply_counter_change(cursor, before, dict(before, onboarding_status='Pending'))
 
         cursor.execute("SELECT advisor_user_id FROM advisor_client_map WHERE client_user_id = %s", (client_id,))
         advisor_map = cursor.fetchone()
@@ -121,7 +91,10 @@ def submit_fact_finder(current_user):
                 (advisor_id, message, link_url)
             )
 
+        bump_profile_version(cursor, client_id)
         conn.commit()
+        if advisor_map:
+            invalidate_dashboard(advisor_map['advisor_user_id'])
         return jsonify({"message": "Fact Finder submitted successfully! Your advisor has been notified."}), 200
 
     except Exception as e:
@@ -11,6 +11,31 @@ class Config:
         'password': os.environ.get('DB_PASSWORD'),
         'database': os.environ.get('DB_NAME')
     }
+    # Optional read replica; leave DB_REPLICA_HOST unset to send everything to the primary.
+    DB_REPLICA_CONFIG = {
+        'host': os.environ.get('DB_REPLICA_HOST'),
+        'port': int(os.environ.get('DB_REPLICA_PORT', 3306)),
+        'user': os.environ.get('DB_REPLICA_USER', os.environ.get('DB_USER')),
+        'password': os.environ.get('DB_REPLICA_PASSWORD', os.environ.get('DB_PASSWORD')),
+        'database': os.environ.get('DB_NAME')
+    } if os.environ.get('DB_REPLICA_HOST') else None
+    DB_REPLICA_MAX_LAG = float(os.environ.get('DB_REPLICA_MAX_LAG', 5))
+    DB_REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get('DB_REPLICA_LAG_CHECK_INTERVAL', 5))
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 32))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 5))
+    DB_RETRY_AFTER = int(os.environ.get('DB_RETRY_AFTER', 2))
+    DB_POOL_WARMUP = int(os.environ.get('DB_POOL_WARMUP', 0))
+    DB_STATEMENT_CACHE_SIZE = int(os.environ.get('DB_STATEMENT_CACHE_SIZE', 64))
+    DB_SLOW_QUERY_MS = float(os.environ.get('DB_SLOW_QUERY_MS', 200))
+    DB_VALIDATE_AFTER = float(os.environ.get('DB_VALIDATE_AFTER', 30))
+    PROFILE_CACHE_SIZE = int(os.environ.get('PROFILE_CACHE_SIZE', 512))
+    PROFILE_CACHE_DIR = os.environ.get('PROFILE_CACHE_DIR')
+    SEARCH_INDEX_TTL = float(os.environ.get('SEARCH_INDEX_TTL', 300))
+    DASHBOARD_CACHE_TTL = float(os.environ.get('DASHBOARD_CACHE_TTL', 60))
+    REMINDER_LEAD_MINUTES = int(os.environ.get('REMINDER_LEAD_MINUTES', 1440))
+    REMINDER_WINDOW_MINUTES = int(os.environ.get('REMINDER_WINDOW_MINUTES', 60))
+    REMINDER_REFRESH_SECONDS = int(os.environ.get('REMINDER_REFRESH_SECONDS', 60))
+    REMINDER_BATCH_SIZE = int(os.environ.get('REMINDER_BATCH_SIZE', 200))
     MAIL_SERVER = os.environ.get('MAIL_SERVER')
     MAIL_PORT = int(os.environ.get('MAIL_PORT', 587))
     MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', 'True').lower() in ['true', 'on', '1']
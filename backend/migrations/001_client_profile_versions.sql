@@ -0,0 +1,7 @@
+-- Per-client profile version, bumped by every endpoint that changes data shown
+-- on the client summary or the advisor client detail page.
+CREATE TABLE IF NOT EXISTS client_profile_versions (
+    client_user_id INT NOT NULL PRIMARY KEY,
+    version BIGINT UNSIGNED NOT NULL DEFAULT 1,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
@@ -0,0 +1,19 @@
+-- Denormalised next/last appointment per client so the advisor client list
+-- does not need a correlated subquery per row. Maintained by
+-- schedule_appointment and the `flask refresh-appointment-dates` sweep.
+ALTER TABLE client_profiles
+    ADD COLUMN next_appointment_at DATETIME NULL,
+    ADD COLUMN last_appointment_at DATETIME NULL,
+    ADD INDEX idx_client_profiles_next_appointment (next_appointment_at);
+
+CREATE INDEX idx_appointments_client_start ON appointments (client_user_id, start_time);
+
+UPDATE client_profiles cp
+SET cp.next_appointment_at = (
+        SELECT MIN(a.start_time) FROM appointments a
+        WHERE a.client_user_id = cp.client_user_id AND a.start_time >= CURDATE()
+    ),
+    cp.last_appointment_at = (
+        SELECT MAX(a.start_time) FROM appointments a
+        WHERE a.client_user_id = cp.client_user_id AND a.start_time < CURDATE()
+    );
@@ -0,0 +1,23 @@
+-- Per-advisor client counts by tier and onboarding status, maintained by the
+-- writes that change either column or the advisor assignment, so dashboard
+-- stats do not scan the advisor's book. NULL values are stored as ''.
+-- `flask reconcile-client-counters` recomputes them and reports drift.
+CREATE TABLE advisor_client_counters (
+    advisor_user_id INT NOT NULL,
+    dimension VARCHAR(32) NOT NULL,
+    value VARCHAR(64) NOT NULL,
+    count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (advisor_user_id, dimension, value)
+);
+
+INSERT INTO advisor_client_counters (advisor_user_id, dimension, value, count)
+SELECT acm.advisor_user_id, 'tier', COALESCE(cp.tier, ''), COUNT(*)
+FROM advisor_client_map acm
+JOIN client_profiles cp ON cp.client_user_id = acm.client_user_id
+GROUP BY acm.advisor_user_id, COALESCE(cp.tier, '');
+
+INSERT INTO advisor_client_counters (advisor_user_id, dimension, value, count)
+SELECT acm.advisor_user_id, 'onboarding_status', COALESCE(cp.onboarding_status, ''), COUNT(*)
+FROM advisor_client_map acm
+JOIN client_profiles cp ON cp.client_user_id = acm.client_user_id
+GROUP BY acm.advisor_user_id, COALESCE(cp.onboarding_status, '');
@@ -0,0 +1,31 @@
+-- Daily pre-aggregated snapshots for the admin analytics endpoint, filled by
+-- `flask run-analytics-rollup` so admin dashboards never group live tables.
+-- advisor_user_id 0 stands for clients without an advisor; NULL tier and
+-- onboarding status are stored as ''.
+CREATE TABLE analytics_rollup_runs (
+    snapshot_date DATE PRIMARY KEY,
+    started_at DATETIME NOT NULL,
+    completed_at DATETIME NULL,
+    clients_scanned INT NOT NULL DEFAULT 0,
+    appointments_scanned INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE analytics_daily_clients (
+    snapshot_date DATE NOT NULL,
+    advisor_user_id INT NOT NULL,
+    tier VARCHAR(64) NOT NULL,
+    onboarding_status VARCHAR(64) NOT NULL,
+    client_count INT NOT NULL,
+    assets_total DECIMAL(18, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (snapshot_date, advisor_user_id, tier, onboarding_status)
+);
+
+CREATE TABLE analytics_weekly_appointments (
+    snapshot_date DATE NOT NULL,
+    week_start DATE NOT NULL,
+    advisor_user_id INT NOT NULL,
+    appointment_count INT NOT NULL,
+    PRIMARY KEY (snapshot_date, week_start, advisor_user_id)
+);
+
+CREATE INDEX idx_appointments_start_time ON appointments (start_time);
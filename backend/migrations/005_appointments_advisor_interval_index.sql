@@ -0,0 +1,4 @@
+-- Backs the overlap query used by schedule_appointment and
+-- GET /advisor/appointments/conflicts: an advisor's appointments ordered by
+-- start, with end_time in the index so the overlap test is index-only.
+CREATE INDEX idx_appointments_advisor_interval ON appointments (advisor_user_id, start_time, end_time);
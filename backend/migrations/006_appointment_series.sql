@@ -0,0 +1,33 @@
+-- Recurring appointments: one row per series, expanded lazily by
+-- utils/recurrence.py. ends_at is the end of the last occurrence (NULL for
+-- open-ended series) so window queries can skip finished series.
+CREATE TABLE appointment_series (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    advisor_user_id INT NOT NULL,
+    client_user_id INT NOT NULL,
+    title VARCHAR(255) NOT NULL,
+    notes TEXT NULL,
+    start_time DATETIME NOT NULL,
+    duration_minutes INT NOT NULL,
+    frequency VARCHAR(16) NOT NULL,
+    interval_count INT NOT NULL DEFAULT 1,
+    until_date DATE NULL,
+    occurrence_count INT NULL,
+    ends_at DATETIME NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_appointment_series_advisor (advisor_user_id, start_time),
+    INDEX idx_appointment_series_client (client_user_id),
+    FOREIGN KEY (advisor_user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (client_user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- Cancelled or moved occurrences, keyed by the occurrence's original start.
+CREATE TABLE appointment_series_exceptions (
+    series_id INT NOT NULL,
+    original_start DATETIME NOT NULL,
+    status VARCHAR(16) NOT NULL,
+    new_start DATETIME NULL,
+    new_end DATETIME NULL,
+    PRIMARY KEY (series_id, original_start),
+    FOREIGN KEY (series_id) REFERENCES appointment_series(id) ON DELETE CASCADE
+);
@@ -0,0 +1,20 @@
+-- Change tracking for the .ics calendar feeds: the newest updated_at (plus
+-- row counts, to catch deletions) becomes the feed's ETag/Last-Modified.
+ALTER TABLE appointments
+    ADD COLUMN updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    ADD INDEX idx_appointments_advisor_updated (advisor_user_id, updated_at);
+ALTER TABLE appointment_series
+    ADD COLUMN updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP;
+ALTER TABLE appointment_series_exceptions
+    ADD COLUMN updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP;
+
+-- One row per user who has issued a feed URL. The URL carries an opaque
+-- random token; only its SHA-256 hash is stored, and issuing a new URL
+-- replaces the hash, which revokes the previous one.
+CREATE TABLE calendar_feed_tokens (
+    user_id INT NOT NULL PRIMARY KEY,
+    token_hash CHAR(64) NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_calendar_feed_token_hash (token_hash),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
@@ -0,0 +1,11 @@
+-- Reminders sent by the reminder scheduler (utils/reminders.py), one row
+-- per reminder so appointments booked or moved inside the reminder lead
+-- time still get theirs. reminder_key identifies the appointment (or
+-- series occurrence) and its start time, so a rescheduled appointment is
+-- reminded again. Rows are pruned a week after their send time.
+CREATE TABLE appointment_reminders_sent (
+    reminder_key VARCHAR(191) NOT NULL PRIMARY KEY,
+    remind_at DATETIME NOT NULL,
+    sent_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_reminders_sent_remind_at (remind_at)
+);
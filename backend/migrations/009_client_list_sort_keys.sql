@@ -0,0 +1,46 @@
+-- Sort keys for the advisor client list (advisor/clients.py CLIENT_LIST_SORTS),
+-- copied onto advisor_client_map so every sort has an index that starts with
+-- the advisor. A page is then a range read of one advisor's index entries
+-- from the cursor onwards; indexes on users or client_profiles alone would
+-- still need all of the advisor's clients joined and sorted.
+ALTER TABLE advisor_client_map
+    ADD COLUMN client_sort_last_name VARCHAR(255) NOT NULL DEFAULT '',
+    ADD COLUMN client_sort_first_name VARCHAR(255) NOT NULL DEFAULT '',
+    -- Clients without an upcoming appointment sort last.
+    ADD COLUMN client_next_appointment_sort DATETIME NOT NULL DEFAULT '9999-12-31 23:59:59',
+    ADD INDEX idx_acm_advisor_client (advisor_user_id, client_user_id),
+    ADD INDEX idx_acm_advisor_sort_name (advisor_user_id, client_sort_last_name, client_sort_first_name, client_user_id),
+    ADD INDEX idx_acm_advisor_next_appointment (advisor_user_id, client_next_appointment_sort, client_user_id);
+
+UPDATE advisor_client_map acm
+JOIN users u ON u.id = acm.client_user_id
+LEFT JOIN client_profiles cp ON cp.client_user_id = acm.client_user_id
+SET acm.client_sort_last_name = COALESCE(u.last_name, ''),
+    acm.client_sort_first_name = COALESCE(u.first_name, ''),
+    acm.client_next_appointment_sort = COALESCE(cp.next_appointment_at, '9999-12-31 23:59:59');
+
+-- The copies follow their sources through triggers, so no write path has
+-- to remember them.
+CREATE TRIGGER trg_acm_sort_keys_insert BEFORE INSERT ON advisor_client_map FOR EACH ROW
+    SET NEW.client_sort_last_name = COALESCE((SELECT last_name FROM users WHERE id = NEW.client_user_id), ''),
+        NEW.client_sort_first_name = COALESCE((SELECT first_name FROM users WHERE id = NEW.client_user_id), ''),
+        NEW.client_next_appointment_sort = COALESCE(
+            (SELECT next_appointment_at FROM client_profiles WHERE client_user_id = NEW.client_user_id),
+            '9999-12-31 23:59:59');
+
+CREATE TRIGGER trg_users_client_sort_name AFTER UPDATE ON users FOR EACH ROW
+    UPDATE advisor_client_map
+    SET client_sort_last_name = COALESCE(NEW.last_name, ''), client_sort_first_name = COALESCE(NEW.first_name, '')
+    WHERE client_user_id = NEW.id
+      AND NOT (OLD.last_name <=> NEW.last_name AND OLD.first_name <=> NEW.first_name);
+
+CREATE TRIGGER trg_client_profiles_next_sort_insert AFTER INSERT ON client_profiles FOR EACH ROW
+    UPDATE advisor_client_map
+    SET client_next_appointment_sort = COALESCE(NEW.next_appointment_at, '9999-12-31 23:59:59')
+    WHERE client_user_id = NEW.client_user_id;
+
+CREATE TRIGGER trg_client_profiles_next_sort_update AFTER UPDATE ON client_profiles FOR EACH ROW
+    UPDATE advisor_client_map
+    SET client_next_appointment_sort = COALESCE(NEW.next_appointment_at, '9999-12-31 23:59:59')
+    WHERE client_user_id = NEW.client_user_id
+      AND NOT (OLD.next_appointment_at <=> NEW.next_appointment_at);
@@ -1,9 +1,21 @@
-from flask import Flask
+import time
+
+import click
+from flask import Flask, jsonify
+from flask_mail import Mail
 
 from auth.routes import auth_bp
+from auth.decorators import admin_required
 
 from flask_cors import CORS
 from config import Config # Import the full Config object
+from utils.db import init_db, get_pool_stats, get_db_connection
+from utils.appointment_dates import refresh_appointment_dates
+from utils.client_profile import profile_cache
+from utils.dashboard_stats import dashboard_cache
+from utils.client_counters import reconcile_client_counters
+from utils.analytics_rollup import run_daily_rollup
+from utils.reminders import ReminderScheduler
 
 
 # Initialize Flask app
@@ -11,6 +23,8 @@ app = Flask(__name__)
 app.config.from_object(Config) # Load config from the object
 
 CORS(app, resources={r"/api/*": {"origins": "http://localhost:3000"}})
+Mail(app)
+init_db(app)
 
 
 # Register blueprints
@@ -21,5 +35,79 @@ app.register_blueprint(auth_bp, url_prefix='/api/auth')
 def index():
     return "Regal Wealth Advisors API is running."
 
+@app.route('/api/health/db')
+@admin_required
+def db_health():
+    return jsonify(get_pool_stats())
+
+@app.route('/api/health/cache')
+@admin_required
+def cache_health():
+    return jsonify({"profiles": profile_cache.stats(), "dashboard": dashboard_cache.stats()})
+
+@app.cli.command('refresh-appointment-dates')
+def refresh_appointment_dates_command():
+    """Moves next/last appointment dates forward (including recurring series) for clients whose next appointment has passed. Run daily."""
+    conn = get_db_connection()
+    try:
+        refreshed = refresh_appointment_dates(conn)
+        print(f"Refreshed appointment dates for {refreshed} client(s).")
+    finally:
+        conn.close()
+
+@app.cli.command('reconcile-client-counters')
+@click.option('--fix', is_flag=True, help='Overwrite drifted counters with the recomputed values.')
+def reconcile_client_counters_command(fix):
+    """Recomputes the per-advisor tier/onboarding counters and reports any drift."""
+    conn = get_db_connection()
+    try:
+        drift = reconcile_client_counters(conn, fix=fix)
+    finally:
+        conn.close()
+    for d in drift:
+        print(f"advisor {d['advisor_user_id']} {d['dimension']}={d['value']}: stored {d['actual']}, expected {d['expected']}")
+    if not drift:
+        print("Client counters are consistent.")
+    elif fix:
+        print(f"Fixed {len(drift)} counter(s).")
+    else:
+        print(f"{len(drift)} counter(s) drifted; rerun with --fix to correct them.")
+
+@app.cli.command('run-analytics-rollup')
+@click.option('--date', 'snapshot_date', type=click.DateTime(formats=['%Y-%m-%d']), help='Snapshot date (default today).')
+@click.option('--chunk-size', default=1000, show_default=True, help='Rows read per query.')
+def run_analytics_rollup_command(snapshot_date, chunk_size):
+    """Rebuilds the daily admin analytics snapshot. Run nightly."""
+    conn = get_db_connection()
+    try:
+        clients, appointments = run_daily_rollup(
+            conn, snapshot_date.date() if snapshot_date else None, chunk_size=chunk_size
+        )
+        print(f"Analytics rollup scanned {clients} client(s) and {appointments} appointment(s).")
+    finally:
+        conn.close()
+
+@app.cli.command('send-reminders')
+@click.option('--loop', is_flag=True, help='Keep running and send reminders as they fall due.')
+@click.option('--max-sleep', default=30, show_default=True, help='Longest pause between checks in --loop mode (seconds).')
+def send_reminders_command(loop, max_sleep):
+    """Sends due appointment reminders. Run every minute from cron, or once with --loop."""
+    scheduler = ReminderScheduler(get_db_connection)
+    while True:
+        if not loop:
+            sent = scheduler.run_once()
+        else:
+            try:
+                sent = scheduler.run_once()
+            except Exception as e:
+                print(f"Reminder run failed: {e}")
+                time.sleep(max_sleep)
+                continue
+        if sent:
+            print(f"Sent {sent} appointment reminder(s).")
+        if not loop:
+            break
+        time.sleep(scheduler.seconds_until_next(max_sleep))
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
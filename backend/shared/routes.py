@@ -1,12 +1,13 @@
 # shared/routes.py
 from flask import Blueprint, jsonify
-from utils.db import get_db_connection
+from utils.db import get_db_connection, replica_reads
 from auth.decorators import token_required
 
 shared_bp = Blueprint('shared_bp', __name__)
 
 @shared_bp.route('/notifications', methods=['GET'])
 @token_required
+@replica_reads
 def get_notifications(current_user):
     """Fetches both read and unread notifications for the logged-in user."""
     user_id = current_user['user_id']
@@ -14,18 +15,16 @@ def get_notifications(current_user):
     cursor = conn.cursor(dictionary=True)
     try:
         # Fetch unread notifications
-        cursor.execute(
+        unread_notifications = conn.prepared_fetchall(
             "SELECT id, message, link_url, created_at FROM notifications WHERE recipient_user_id = %s AND is_read = FALSE ORDER BY created_at DESC",
             (user_id,)
         )
-        unread_notifications = cursor.fetchall()
 
         # Fetch read notifications (e.g., the 10 most recent)
-        cursor.execute(
+        read_notifications = conn.prepared_fetchall(
             "SELECT id, message, link_url, created_at FROM notifications WHERE recipient_user_id = %s AND is_read = TRUE ORDER BY created_at DESC LIMIT 10",
             (user_id,)
         )
-        read_notifications = cursor.fetchall()
         
         return jsonify({
             "unread": unread_notifications,
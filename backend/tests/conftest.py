@@ -0,0 +1,11 @@
+"""
+Unit tests for the pure helpers (tax engine, recurrence, scheduling, client
+list cursors). No database is needed; run from the backend directory:
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+os.environ.setdefault('JWT_SECRET_KEY', 'test-secret-key-that-is-long-enough-for-hs256')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,37 @@
+import base64
+import json
+from datetime import datetime
+
+import pytest
+
+from advisor.clients import _decode_cursor, _encode_cursor
+
+
+@pytest.mark.parametrize("values", [
+    ["Smith", "Ann", 42],
+    [datetime(2025, 3, 10, 4, 30), 7],
+    [9999],
+    ["", "", 1],
+])
+def test_cursor_round_trip(values):
+    expected = [str(v) if isinstance(v, datetime) else v for v in values]
+    assert _decode_cursor(_encode_cursor(values), len(values)) == expected
+
+
+def raw_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+@pytest.mark.parametrize("token", [
+    "not base64!",
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+    raw_cursor({"a": 1}),
+    raw_cursor(["Smith", "Ann"]),
+    raw_cursor([{}, "Ann", 1]),
+    raw_cursor([["Smith"], "Ann", 1]),
+    raw_cursor(["Smith", None, 1]),
+    raw_cursor(["Smith", True, 1]),
+    raw_cursor(["Smith", "Ann", 1.5]),
+])
+def test_invalid_cursors_are_rejected(token):
+    assert _decode_cursor(token, 3) is None
@@ -0,0 +1,47 @@
+import math
+
+import pytest
+
+from advisor import cashflow_projection, retirement_projection
+
+
+@pytest.mark.parametrize("overrides", [
+    {"current_savings": "nan"},
+    {"current_savings": math.inf},
+    {"end_age": math.nan},
+    {"annual_spending": "-inf"},
+])
+def test_retirement_inputs_reject_non_finite_numbers(overrides):
+    with pytest.raises(ValueError):
+        retirement_projection.projection_inputs(overrides)
+
+
+def test_retirement_projection_rejects_overflow():
+    inputs = retirement_projection.projection_inputs({"volatility": 1e300})
+    with pytest.raises(ValueError):
+        retirement_projection.run_projection(inputs, paths=10, seed=1)
+
+
+@pytest.mark.parametrize("overrides", [
+    {"start_year": 1e20},
+    {"start_year": 1899},
+    {"years": math.inf},
+    {"inflation": "nan"},
+    {"income_sources": [{"monthly_amount": math.inf}]},
+    {"liabilities": [{"balance": 1000, "payoff_years": math.nan}]},
+])
+def test_cashflow_inputs_reject_non_finite_numbers_and_far_years(overrides):
+    with pytest.raises(ValueError):
+        cashflow_projection.projection_inputs(overrides)
+
+
+def test_cashflow_projection_rejects_overflow():
+    inputs = cashflow_projection.projection_inputs({"income_sources": [{"monthly_amount": 1000, "annual_growth": 1e200}]})
+    with pytest.raises(ValueError):
+        cashflow_projection.run_projection(inputs)
+
+
+def test_cashflow_projection_accepts_ordinary_inputs():
+    inputs = cashflow_projection.projection_inputs({"start_year": 2030, "years": 5, "income_sources": [{"monthly_amount": 5000}]})
+    result = cashflow_projection.run_projection(inputs)
+    assert result["years"]["year"] == [2030, 2031, 2032, 2033, 2034]
@@ -0,0 +1,88 @@
+import itertools
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from utils.recurrence import expand_series, occurrence_start, series_appointment_dates
+
+
+def make_series(frequency, interval=1, start=datetime(2025, 1, 31, 9, 0), count=None, until=None, duration=60):
+    return {
+        'id': 1, 'advisor_user_id': 2, 'client_user_id': 3, 'title': 'Review', 'notes': None,
+        'start_time': start, 'duration_minutes': duration, 'frequency': frequency,
+        'interval_count': interval, 'until_date': until, 'occurrence_count': count,
+    }
+
+
+def all_starts(series, horizon=datetime(2035, 1, 1)):
+    """Every occurrence start allowed by the rule up to `horizon`, enumerated one by one."""
+    starts = []
+    for k in itertools.count():
+        start = occurrence_start(series, k)
+        if start >= horizon:
+            break
+        if series['occurrence_count'] is not None and k >= series['occurrence_count']:
+            break
+        if series['until_date'] is not None and start.date() > series['until_date']:
+            break
+        starts.append(start)
+    return starts
+
+
+SERIES = [
+    make_series('daily'),
+    make_series('daily', interval=3, count=40),
+    make_series('weekly', interval=2, until=date(2026, 6, 30)),
+    make_series('monthly'),
+    make_series('monthly', interval=5, count=12),
+    make_series('weekly', duration=24 * 60 * 3),
+]
+WINDOWS = [
+    (datetime(2024, 12, 1), datetime(2025, 1, 1)),
+    (datetime(2025, 1, 31, 9, 30), datetime(2025, 3, 1)),
+    (datetime(2025, 6, 15, 12), datetime(2025, 6, 20)),
+    (datetime(2026, 2, 1), datetime(2026, 9, 1)),
+]
+
+
+@pytest.mark.parametrize("series", SERIES)
+@pytest.mark.parametrize("window", WINDOWS)
+def test_expand_series_matches_enumeration(series, window):
+    window_start, window_end = window
+    duration = timedelta(minutes=series['duration_minutes'])
+    expected = [s for s in all_starts(series) if s < window_end and s + duration > window_start]
+    assert [o['start_time'] for o in expand_series(series, window_start, window_end)] == expected
+
+
+def test_expand_series_applies_exceptions():
+    series = make_series('weekly', start=datetime(2025, 3, 3, 9, 0))
+    cancelled, moved = datetime(2025, 3, 10, 9, 0), datetime(2025, 3, 17, 9, 0)
+    exceptions = {
+        cancelled: {'status': 'cancelled'},
+        moved: {'status': 'moved', 'new_start': datetime(2025, 3, 18, 14, 0), 'new_end': datetime(2025, 3, 18, 15, 0)},
+    }
+    occurrences = list(expand_series(series, datetime(2025, 3, 1), datetime(2025, 3, 25), exceptions))
+    assert sorted(o['start_time'] for o in occurrences) == [
+        datetime(2025, 3, 3, 9, 0), datetime(2025, 3, 18, 14, 0), datetime(2025, 3, 24, 9, 0),
+    ]
+    assert [o['occurrence_start'] for o in occurrences if o['start_time'].day == 18] == [moved]
+
+
+@pytest.mark.parametrize("series", SERIES)
+@pytest.mark.parametrize("today", [datetime(2024, 1, 1), datetime(2025, 1, 31, 9, 0), datetime(2025, 7, 4), datetime(2031, 1, 1)])
+def test_series_appointment_dates_match_enumeration(series, today):
+    starts = all_starts(series)
+    expected_next = next((s for s in starts if s >= today), None)
+    expected_last = max((s for s in starts if s < today), default=None)
+    assert series_appointment_dates(series, today) == (expected_next, expected_last)
+
+
+def test_series_appointment_dates_with_exceptions():
+    series = make_series('daily', start=datetime(2025, 5, 1, 9, 0), count=10)
+    today = datetime(2025, 5, 5)
+    exceptions = {
+        datetime(2025, 5, 4, 9, 0): {'status': 'cancelled'},
+        datetime(2025, 5, 5, 9, 0): {'status': 'moved', 'new_start': datetime(2025, 5, 7, 18, 0),
+                                     'new_end': datetime(2025, 5, 7, 19, 0)},
+    }
+    assert series_appointment_dates(series, today, exceptions) == (datetime(2025, 5, 6, 9, 0), datetime(2025, 5, 3, 9, 0))
@@ -0,0 +1,58 @@
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from utils.scheduling import free_slots, merge_intervals, parse_slot_query, working_windows
+from utils.timezones import get_timezone
+
+
+def at(hour, minute=0, day=3):
+    return datetime(2025, 3, day, hour, minute)
+
+
+def test_merge_intervals_joins_overlapping_and_touching():
+    intervals = [(at(13), at(14)), (at(9), at(10)), (at(9, 30), at(11)), (at(11), at(12)), (at(15), at(16))]
+    assert merge_intervals(intervals) == [(at(9), at(12)), (at(13), at(14)), (at(15), at(16))]
+
+
+def test_merge_intervals_keeps_contained_interval_inside():
+    assert merge_intervals([(at(9), at(17)), (at(10), at(11))]) == [(at(9), at(17))]
+    assert merge_intervals([]) == []
+
+
+def test_free_slots_finds_gaps_of_at_least_duration():
+    windows = [(at(9), at(17)), (at(9, day=4), at(17, day=4))]
+    busy = [(at(8), at(9, 30)), (at(10), at(11)), (at(10, 30), at(12)), (at(16, 40), at(18)), (at(12, day=4), at(13, day=4))]
+    assert free_slots(busy, windows, timedelta(minutes=30)) == [
+        (at(9, 30), at(10)), (at(12), at(16, 40)),
+        (at(9, day=4), at(12, day=4)), (at(13, day=4), at(17, day=4)),
+    ]
+    assert free_slots(busy, windows, timedelta(hours=4)) == [(at(12), at(16, 40)), (at(13, day=4), at(17, day=4))]
+
+
+def test_free_slots_with_no_busy_time_returns_whole_windows():
+    windows = [(at(9), at(17))]
+    assert free_slots([], windows, timedelta(hours=8)) == windows
+    assert free_slots([(at(8), at(18))], windows, timedelta(minutes=1)) == []
+
+
+def test_working_windows_are_local_hours_in_utc():
+    windows = list(working_windows(date(2025, 3, 7), date(2025, 3, 10), time(9), time(17), {0, 1, 2, 3, 4}))
+    # Asia/Kolkata is UTC+5:30; the weekend is skipped
+    assert windows == [(at(3, 30, day=7), at(11, 30, day=7)), (at(3, 30, day=10), at(11, 30, day=10))]
+
+
+def test_working_windows_follow_dst():
+    new_york = get_timezone('America/New_York')
+    windows = list(working_windows(date(2025, 3, 7), date(2025, 3, 10), time(9), time(17), {0, 4}, new_york))
+    assert windows == [(at(14, day=7), at(22, day=7)), (at(13, day=10), at(21, day=10))]
+
+
+def test_parse_slot_query_rejects_bad_input():
+    with pytest.raises(ValueError):
+        parse_slot_query({'start_date': '2025-03-10', 'end_date': '2025-03-09'})
+    with pytest.raises(ValueError):
+        parse_slot_query({'start_date': '2025-03-10', 'end_date': '2025-03-11', 'tz': 'Nowhere/Special'})
+    query = parse_slot_query({'start_date': '2025-03-10', 'end_date': '2025-03-10', 'work_start': '10:00'})
+    assert (query['range_start'], query['range_end']) == (at(18, 30, day=9), at(18, 30, day=10))
+    assert query['windows'] == [(at(4, 30, day=10), at(11, 30, day=10))]
@@ -0,0 +1,99 @@
+import random
+
+import numpy as np
+import pytest
+from flask import Flask
+
+from advisor.state_tax import STATE_TAXES, compute_state_tax, compute_state_tax_batch
+from advisor.tax_calculator import (
+    FILING_STATUS_ALIASES, FILING_STATUSES, compute_federal_tax, compute_federal_tax_batch, get_tax_table, round_cents,
+    tax_year_key,
+)
+from advisor.tools import income_tax_batch_tool, income_tax_tool
+
+
+def sample_incomes(table, rng, count=300):
+    """Random incomes plus each bracket threshold and its neighbours."""
+    incomes = [0.0, -100.0] + [rng.uniform(0, float(table.thresholds[-1]) * 2) for _ in range(count)]
+    for threshold in table.thresholds:
+        incomes += [float(threshold) - 0.01, float(threshold), float(threshold) + 0.01]
+    return incomes
+
+
+@pytest.mark.parametrize("status", list(FILING_STATUSES) + list(FILING_STATUS_ALIASES))
+def test_federal_batch_matches_scalar(status):
+    incomes = sample_incomes(get_tax_table(2025, status), random.Random(status))
+    tax, marginal = compute_federal_tax_batch(incomes, status, 2025)
+    for i, income in enumerate(incomes):
+        single = compute_federal_tax(income, status, 2025)
+        assert round(tax[i], 2) == pytest.approx(single['tax'], abs=0.01)
+        assert round(marginal[i] * 100, 2) == single['marginal_rate_percent']
+
+
+def test_federal_batch_with_mixed_statuses():
+    rng = random.Random(1)
+    statuses = [rng.choice(FILING_STATUSES) for _ in range(500)]
+    incomes = [rng.uniform(0, 1_000_000) for _ in statuses]
+    tax, _ = compute_federal_tax_batch(np.array(incomes), statuses, 2025)
+    expected = [compute_federal_tax(income, status, 2025)['tax'] for income, status in zip(incomes, statuses)]
+    assert np.allclose(np.round(tax, 2), expected, atol=0.01)
+
+
+def test_state_batch_matches_scalar():
+    rng = random.Random(2)
+    states = sorted(code for year, code in STATE_TAXES if year == 2025)
+    rows = [(rng.choice(states), rng.choice(FILING_STATUSES), rng.uniform(0, 2_000_000)) for _ in range(1000)]
+    tax, marginal = compute_state_tax_batch([r[2] for r in rows], [r[0] for r in rows], [r[1] for r in rows], 2025)
+    for i, (state, status, income) in enumerate(rows):
+        single = compute_state_tax(income, state, status, 2025)
+        assert round(tax[i], 2) == pytest.approx(single['tax'], abs=0.01)
+        assert round(marginal[i] * 100, 2) == single['marginal_rate_percent']
+
+
+def test_state_table_covers_every_state_and_dc():
+    assert len({code for year, code in STATE_TAXES if year == 2025}) == 51
+
+
+def call_view(view, body):
+    app = Flask(__name__)
+    with app.test_request_context(json=body):
+        response, status = getattr(view, '__wrapped__', view)({"user_id": 0})
+    return response.get_json(), status
+
+
+def test_batch_route_matches_single_route():
+    rng = random.Random(3)
+    rows = [(round(rng.uniform(0, 400_000), 2), round(rng.uniform(0, 40_000), 2), round(rng.uniform(0, 9_000), 2),
+             rng.choice(FILING_STATUSES)) for _ in range(200)]
+    batch, status = call_view(income_tax_batch_tool, {
+        "gross_income": [r[0] for r in rows], "deductions": [r[1] for r in rows],
+        "credits": [r[2] for r in rows], "filing_status": [r[3] for r in rows], "state": "CA",
+    })
+    assert status == 200
+    for i, (gross, deductions, credits, filing_status) in enumerate(rows):
+        single, status = call_view(income_tax_tool, {
+            "gross_income": gross, "deductions": deductions, "credits": credits,
+            "filing_status": filing_status, "state": "CA",
+        })
+        assert status == 200
+        for field in ("tax_before_credits", "final_tax_owed", "state_tax", "total_tax_owed"):
+            expected = single['results'][field]
+            expected = expected['tax'] if isinstance(expected, dict) else expected
+            assert batch['results'][field][i] == expected, field
+
+
+@pytest.mark.parametrize("year", [2025, "2025", 2025.0])
+def test_tax_year_key_accepts_whole_years(year):
+    assert tax_year_key(year) == 2025
+
+
+@pytest.mark.parametrize("year", [2025.5, "2025.5", True, None, "next", float('nan'), float('inf')])
+def test_tax_year_key_rejects_other_years(year):
+    with pytest.raises(ValueError):
+        tax_year_key(year)
+
+
+def test_round_cents_agrees_with_round():
+    rng = random.Random(4)
+    values = [rng.randrange(0, 10 ** 9) / 1000 for _ in range(20000)] + [77329.435, 21332.934999999998, 2.675, 0.005]
+    assert round_cents(values).tolist() == [round(value, 2) for value in values]
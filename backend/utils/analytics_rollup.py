@@ -0,0 +1,204 @@
+"""
+Daily rollup behind the admin analytics endpoint. run_daily_rollup() walks
+client_profiles (with each chunk's financials_assets totals) and the recent
+appointments in keyset-ordered chunks, aggregates in memory and writes one
+snapshot per day into the analytics_* tables. load_analytics() reads a
+snapshot back; it only ever touches the small rollup tables.
+"""
+from collections import Counter
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+# Funnel order for known onboarding statuses; anything else follows.
+ONBOARDING_STAGES = ('In-Progress', 'Pending', 'Completed')
+
+UNASSIGNED_ADVISOR = 0
+
+
+def _week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def _scan_clients(cursor, chunk_size):
+    """Yields (advisor_id, tier, onboarding_status, assets_total) per client, one chunk at a time."""
+    last_id = 0
+    while True:
+        cursor.execute(
+            """
+            SELECT cp.client_user_id, cp.tier, cp.onboarding_status, acm.advisor_user_id
+            FROM client_profiles cp
+            LEFT JOIN advisor_client_map acm ON acm.client_user_id = cp.client_user_id
+            WHERE cp.client_user_id > %s
+            ORDER BY cp.client_user_id
+            LIMIT %s
+            """,
+            (last_id, chunk_size)
+        )
+        clients = cursor.fetchall()
+        if not clients:
+            return
+
+        ids = [row[0] for row in clients]
+        cursor.execute(
+            f"SELECT client_user_id, SUM(balance) FROM financials_assets "
+            f"WHERE client_user_id IN ({', '.join(['%s'] * len(ids))}) GROUP BY client_user_id",
+            ids
+        )
+        assets = dict(cursor.fetchall())
+
+        for client_id, tier, status, advisor_id in clients:
+            yield advisor_id or UNASSIGNED_ADVISOR, tier or '', status or '', assets.get(client_id) or Decimal(0)
+        last_id = ids[-1]
+
+
+def _scan_appointments(cursor, window_start, window_end, chunk_size):
+    """Yields (advisor_id, start_time) for appointments in [window_start, window_end)."""
+    last = (window_start, 0)
+    while True:
+        cursor.execute(
+            """
+            SELECT id, advisor_user_id, start_time FROM appointments
+            WHERE start_time < %s AND (start_time > %s OR (start_time = %s AND id > %s))
+            ORDER BY start_time, id
+            LIMIT %s
+            """,
+            (window_end, last[0], last[0], last[1], chunk_size)
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            return
+        for _, advisor_id, start_time in rows:
+            yield advisor_id, start_time
+        last = (rows[-1][2], rows[-1][0])
+
+
+def run_daily_rollup(conn, snapshot_date=None, weeks=12, chunk_size=1000):
+    """
+    Builds the snapshot for snapshot_date (default today), replacing any
+    earlier snapshot for the same day. Appointments are bucketed by week for
+    the `weeks` weeks up to and including the snapshot's week. Scans commit
+    nothing; the snapshot is written in one transaction at the end. Returns
+    (clients_scanned, appointments_scanned).
+    """
+    snapshot_date = snapshot_date or date.today()
+    started_at = datetime.now()
+    cursor = conn.cursor()
+    try:
+        clients = Counter()
+        assets = Counter()
+        clients_scanned = 0
+        for advisor_id, tier, status, total in _scan_clients(cursor, chunk_size):
+            clients[(advisor_id, tier, status)] += 1
+            assets[(advisor_id, tier, status)] += total
+            clients_scanned += 1
+
+        window_start = _week_start(snapshot_date) - timedelta(weeks=weeks - 1)
+        window_end = _week_start(snapshot_date) + timedelta(weeks=1)
+        appointments = Counter()
+        appointments_scanned = 0
+        for advisor_id, start_time in _scan_appointments(cursor, window_start, window_end, chunk_size):
+            appointments[(_week_start(start_time.date()), advisor_id)] += 1
+            appointments_scanned += 1
+        conn.rollback()
+
+        conn.start_transaction()
+        for table in ('analytics_daily_clients', 'analytics_weekly_appointments', 'analytics_rollup_runs'):
+            cursor.execute(f"DELETE FROM {table} WHERE snapshot_date = %s", (snapshot_date,))
+        if clients:
+            cursor.executemany(
+                "INSERT INTO analytics_daily_clients "
+                "(snapshot_date, advisor_user_id, tier, onboarding_status, client_count, assets_total) "
+                "VALUES (%s, %s, %s, %s, %s, %s)",
+                [(snapshot_date, *key, count, assets[key]) for key, count in clients.items()]
+            )
+        if appointments:
+            cursor.executemany(
+                "INSERT INTO analytics_weekly_appointments (snapshot_date, week_start, advisor_user_id, appointment_count) "
+                "VALUES (%s, %s, %s, %s)",
+                [(snapshot_date, *key, count) for key, count in appointments.items()]
+            )
+        cursor.execute(
+            "INSERT INTO analytics_rollup_runs "
+            "(snapshot_date, started_at, completed_at, clients_scanned, appointments_scanned) "
+            "VALUES (%s, %s, NOW(), %s, %s)",
+            (snapshot_date, started_at, clients_scanned, appointments_scanned)
+        )
+        conn.commit()
+        return clients_scanned, appointments_scanned
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def _funnel_position(status):
+    return ONBOARDING_STAGES.index(status) if status in ONBOARDING_STAGES else len(ONBOARDING_STAGES)
+
+
+def load_analytics(cursor, snapshot_date=None):
+    """
+    Reads one snapshot (default: the latest completed one) into the admin
+    analytics payload. `cursor` must be a dictionary cursor. Returns None if
+    no snapshot exists yet.
+    """
+    if snapshot_date:
+        cursor.execute(
+            "SELECT snapshot_date, completed_at FROM analytics_rollup_runs "
+            "WHERE snapshot_date = %s AND completed_at IS NOT NULL",
+            (snapshot_date,)
+        )
+    else:
+        cursor.execute(
+            "SELECT snapshot_date, completed_at FROM analytics_rollup_runs "
+            "WHERE completed_at IS NOT NULL ORDER BY snapshot_date DESC LIMIT 1"
+        )
+    run = cursor.fetchone()
+    if not run:
+        return None
+
+    cursor.execute(
+        """
+        SELECT r.advisor_user_id, CONCAT(a.first_name, ' ', a.last_name) AS advisor_name,
+               r.tier, r.onboarding_status, r.client_count, r.assets_total
+        FROM analytics_daily_clients r
+        LEFT JOIN users a ON a.id = r.advisor_user_id
+        WHERE r.snapshot_date = %s
+        """,
+        (run['snapshot_date'],)
+    )
+    per_advisor, advisor_names, funnel, tier_clients, tier_assets = Counter(), {}, Counter(), Counter(), Counter()
+    for row in cursor.fetchall():
+        advisor_id = row['advisor_user_id'] or None
+        per_advisor[advisor_id] += row['client_count']
+        advisor_names[advisor_id] = row['advisor_name'] if advisor_id else 'Not Assigned'
+        funnel[row['onboarding_status'] or None] += row['client_count']
+        tier_clients[row['tier'] or None] += row['client_count']
+        tier_assets[row['tier'] or None] += row['assets_total']
+
+    cursor.execute(
+        "SELECT week_start, SUM(appointment_count) AS appointments FROM analytics_weekly_appointments "
+        "WHERE snapshot_date = %s GROUP BY week_start ORDER BY week_start",
+        (run['snapshot_date'],)
+    )
+    weekly = cursor.fetchall()
+
+    return {
+        "snapshot_date": run['snapshot_date'].isoformat(),
+        "generated_at": run['completed_at'].isoformat(),
+        "clients_per_advisor": [
+            {"advisor_user_id": advisor_id, "advisor_name": advisor_names[advisor_id], "clients": count}
+            for advisor_id, count in per_advisor.most_common()
+        ],
+        "onboarding_funnel": [
+            {"onboarding_status": status, "clients": funnel[status]}
+            for status in sorted(funnel, key=lambda s: (_funnel_position(s), s or ''))
+        ],
+        "appointments_per_week": [
+            {"week_start": row['week_start'].isoformat(), "appointments": int(row['appointments'])} for row in weekly
+        ],
+        "assets_by_tier": [
+            {"tier": tier, "clients": tier_clients[tier], "assets_total": float(tier_assets[tier])}
+            for tier in sorted(tier_clients, key=lambda t: t or '')
+        ]
+    }
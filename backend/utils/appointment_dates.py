@@ -0,0 +1,114 @@
+"""
+Keeps client_profiles.next_appointment_at / last_appointment_at in step with
+the appointments table and recurring series. "Next" means the earliest
+appointment or occurrence from today onwards, matching what the client list
+has always shown; "today" starts at midnight in the display timezone.
+"""
+from utils.recurrence import load_client_series, series_appointment_dates
+from utils.timezones import display_day_start
+
+
+def record_appointment(cursor, client_id, start_time):
+    """Folds a newly inserted appointment into the client's next/last dates."""
+    today = display_day_start()
+    cursor.execute(
+        """
+        UPDATE client_profiles SET
+            next_appointment_at = CASE
+                WHEN %s >= %s AND (next_appointment_at IS NULL OR next_appointment_at < %s OR %s < next_appointment_at)
+                THEN %s ELSE next_appointment_at END,
+            last_appointment_at = CASE
+                WHEN %s < %s AND (last_appointment_at IS NULL OR %s > last_appointment_at)
+                THEN %s ELSE last_appointment_at END
+        WHERE client_user_id = %s
+        """,
+        (start_time, today, today, start_time, start_time, start_time, today, start_time, start_time, client_id)
+    )
+
+
+def client_appointment_dates(cursor, client_ids, today):
+    """{client_id: (next, last)} over one-off appointments and series occurrences."""
+    dates = {client_id: (None, None) for client_id in client_ids}
+    if not dates:
+        return dates
+    cursor.execute(
+        f"""
+        SELECT client_user_id,
+               MIN(CASE WHEN start_time >= %s THEN start_time END) AS next_start,
+               MAX(CASE WHEN start_time < %s THEN start_time END) AS last_start
+        FROM appointments
+        WHERE client_user_id IN ({', '.join(['%s'] * len(dates))})
+        GROUP BY client_user_id
+        """,
+        (today, today) + tuple(dates)
+    )
+    for row in cursor.fetchall():
+        if not isinstance(row, dict):
+            row = dict(zip(('client_user_id', 'next_start', 'last_start'), row))
+        dates[row['client_user_id']] = (row['next_start'], row['last_start'])
+
+    for series, exceptions in load_client_series(cursor, list(dates)):
+        next_start, last_start = dates[series['client_user_id']]
+        series_next, series_last = series_appointment_dates(series, today, exceptions)
+        dates[series['client_user_id']] = (
+            min(d for d in (next_start, series_next) if d) if next_start or series_next else None,
+            max(d for d in (last_start, series_last) if d) if last_start or series_last else None,
+        )
+    return dates
+
+
+def _store_dates(cursor, dates):
+    cursor.executemany(
+        "UPDATE client_profiles SET next_appointment_at = %s, last_appointment_at = %s WHERE client_user_id = %s",
+        [(next_start, last_start, client_id) for client_id, (next_start, last_start) in dates.items()]
+    )
+
+
+def refresh_client_appointment_dates(cursor, client_id):
+    """
+    Recomputes one client's next/last dates from scratch. Call it inside the
+    transaction of any series write (create, cancel or move an occurrence).
+    """
+    _store_dates(cursor, client_appointment_dates(cursor, [client_id], display_day_start()))
+
+
+def refresh_appointment_dates(conn, batch_size=500):
+    """
+    Recomputes next/last dates for clients whose next appointment is now in
+    the past, and for clients with a series still running but no next date
+    (series created before the dates followed them), in batches of
+    batch_size clients, committing after each batch. Returns the number of
+    clients refreshed.
+    """
+    cursor = conn.cursor()
+    refreshed = 0
+    last_id = 0
+    try:
+        today = display_day_start()
+        while True:
+            cursor.execute(
+                """
+                SELECT cp.client_user_id FROM client_profiles cp
+                WHERE cp.client_user_id > %s
+                  AND (cp.next_appointment_at < %s
+                       OR (cp.next_appointment_at IS NULL AND EXISTS (
+                           SELECT 1 FROM appointment_series s
+                           WHERE s.client_user_id = cp.client_user_id AND (s.ends_at IS NULL OR s.ends_at >= %s))))
+                ORDER BY cp.client_user_id
+                LIMIT %s
+                """,
+                (last_id, today, today, batch_size)
+            )
+            client_ids = [row[0] for row in cursor.fetchall()]
+            if client_ids:
+                _store_dates(cursor, client_appointment_dates(cursor, client_ids, today))
+                conn.commit()
+                refreshed += len(client_ids)
+                last_id = client_ids[-1]
+            if len(client_ids) < batch_size:
+                return refreshed
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
@@ -0,0 +1,133 @@
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+class FileCacheBackend:
+    """
+    Stores cache values as files in a directory so several worker processes
+    on the same host can share them. Keys are tuples; writing a key removes
+    the files of its siblings (same key except the last part), which is how
+    old versions of an entry get cleaned up.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, "-".join(str(part) for part in key))
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def set(self, key, value):
+        prefix = "-".join(str(part) for part in key[:-1]) + "-"
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        with os.fdopen(fd, 'wb') as f:
+            f.write(value)
+        target = self._path(key)
+        os.replace(tmp_path, target)
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.startswith(prefix) and path != target:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache with optional second-level backend
+    (e.g. FileCacheBackend) that is consulted on a local miss.
+    """
+    def __init__(self, maxsize, backend=None):
+        self.maxsize = maxsize
+        self.backend = backend
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+
+        value = self.backend.get(key) if self.backend else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._store(key, value)
+        return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._store(key, value)
+        if self.backend:
+            self.backend.set(key, value)
+
+    def _store(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache whose entries expire `ttl` seconds after
+    they are stored. Entries can also be dropped early with invalidate().
+    """
+    def __init__(self, ttl, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data), "maxsize": self.maxsize, "ttl": self.ttl,
+                "hits": self.hits, "misses": self.misses, "invalidations": self.invalidations
+            }
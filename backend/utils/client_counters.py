@@ -0,0 +1,107 @@
+"""
+Maintains advisor_client_counters: how many of an advisor's clients have each
+tier and onboarding status. Every write that changes a client's tier,
+onboarding status or advisor locks the client's current values with
+lock_client_dimensions(), makes its change, then calls apply_counter_change()
+in the same transaction.
+"""
+from collections import Counter
+
+COUNTER_DIMENSIONS = ('tier', 'onboarding_status')
+
+_UPSERT_SQL = (
+    "INSERT INTO advisor_client_counters (advisor_user_id, dimension, value, count) VALUES (%s, %s, %s, %s) "
+    "ON DUPLICATE KEY UPDATE count = count + VALUES(count)"
+)
+
+_EXPECTED_SQL = """
+    SELECT acm.advisor_user_id, '{dimension}', COALESCE(cp.{dimension}, ''), COUNT(*)
+    FROM advisor_client_map acm
+    JOIN client_profiles cp ON cp.client_user_id = acm.client_user_id
+    GROUP BY acm.advisor_user_id, COALESCE(cp.{dimension}, '')
+    LOCK IN SHARE MODE
+"""
+
+
+def lock_client_dimensions(conn, client_id):
+    """
+    Locks and returns a client's counted values as a dict with
+    advisor_user_id, tier and onboarding_status, or None if the client has no
+    profile (and so is not counted).
+    """
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            """
+            SELECT acm.advisor_user_id, cp.tier, cp.onboarding_status
+            FROM client_profiles cp
+            LEFT JOIN advisor_client_map acm ON acm.client_user_id = cp.client_user_id
+            WHERE cp.client_user_id = %s
+            FOR UPDATE
+            """,
+            (client_id,)
+        )
+        return cursor.fetchone()
+    finally:
+        cursor.close()
+
+
+def apply_counter_change(cursor, before, after):
+    """
+    Moves one client's contribution from `before` to `after` (dicts as
+    returned by lock_client_dimensions, or None when the client was not or is
+    no longer counted).
+    """
+    deltas = Counter()
+    for values, sign in ((before, -1), (after, 1)):
+        if not values or values.get('advisor_user_id') is None:
+            continue
+        for dimension in COUNTER_DIMENSIONS:
+            deltas[(values['advisor_user_id'], dimension, values.get(dimension) or '')] += sign
+
+    rows = [key + (delta,) for key, delta in sorted(deltas.items()) if delta]
+    if rows:
+        cursor.executemany(_UPSERT_SQL, rows)
+
+
+def reconcile_client_counters(conn, fix=False):
+    """
+    Recomputes every counter from client_profiles and compares it with the
+    stored value. Counter rows are locked while this runs so concurrent
+    writes cannot show up as drift. Returns a list of drift dicts; with
+    fix=True the stored counters are corrected as well.
+    """
+    cursor = conn.cursor()
+    try:
+        conn.start_transaction()
+        cursor.execute("SELECT advisor_user_id, dimension, value, count FROM advisor_client_counters FOR UPDATE")
+        actual = {tuple(row[:3]): row[3] for row in cursor.fetchall()}
+        expected = {}
+        for dimension in COUNTER_DIMENSIONS:
+            cursor.execute(_EXPECTED_SQL.format(dimension=dimension))
+            expected.update((tuple(row[:3]), row[3]) for row in cursor.fetchall())
+
+        drift = []
+        for key in sorted(set(actual) | set(expected)):
+            if actual.get(key, 0) != expected.get(key, 0):
+                advisor_id, dimension, value = key
+                drift.append({
+                    "advisor_user_id": advisor_id, "dimension": dimension, "value": value or None,
+                    "expected": expected.get(key, 0), "actual": actual.get(key, 0)
+                })
+
+        if fix and drift:
+            cursor.executemany(
+                "INSERT INTO advisor_client_counters (advisor_user_id, dimension, value, count) VALUES (%s, %s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE count = VALUES(count)",
+                [(d['advisor_user_id'], d['dimension'], d['value'] or '', d['expected']) for d in drift]
+            )
+            conn.commit()
+        else:
+            conn.rollback()
+        return drift
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
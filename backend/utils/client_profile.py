@@ -0,0 +1,162 @@
+"""
+Loads the full Fact Finder graph for one client in a single round trip and
+caches the rendered payloads per (view, client, profile version).
+Shared by the advisor client detail page and the client's own summary page.
+"""
+from datetime import datetime, time, timedelta
+from flask import current_app, request
+from config import Config
+from utils.cache import FileCacheBackend, LRUCache
+from utils.recurrence import load_occurrences, utc_now
+
+profile_cache = LRUCache(
+    Config.PROFILE_CACHE_SIZE,
+    backend=FileCacheBackend(Config.PROFILE_CACHE_DIR) if Config.PROFILE_CACHE_DIR else None
+)
+
+# client_profiles columns shown on profile pages. Listed explicitly so
+# internal bookkeeping columns (next/last appointment dates and their sort
+# key, refreshed without a profile version bump) stay out of cached payloads.
+PROFILE_COLUMNS = (
+    "cp.id, cp.client_user_id, cp.date_of_birth, cp.marital_status, cp.preferred_contact_method, "
+    "cp.address_line_1, cp.address_line_2, cp.city, cp.state, cp.country, cp.zip_code, "
+    "cp.occupation, cp.employer_name, cp.onboarding_status, cp.tier"
+)
+
+# (section key, statement, single row?)
+_PROFILE_STATEMENTS = [
+    ("personal_info", f"""
+        SELECT u.first_name, u.last_name, u.email,
+               u.mobile_country, u.mobile_code, u.mobile_number,
+               {PROFILE_COLUMNS} FROM users u
+        LEFT JOIN client_profiles cp ON u.id = cp.client_user_id
+        WHERE u.id = %s
+    """, True),
+    ("spouse_info", "SELECT * FROM spouses WHERE client_user_id = %s", True),
+    ("family_info", "SELECT * FROM family_members WHERE client_user_id = %s", False),
+    ("income", "SELECT * FROM financials_income WHERE client_user_id = %s", False),
+    ("assets", "SELECT * FROM financials_assets WHERE client_user_id = %s", False),
+    ("liabilities", "SELECT * FROM financials_liabilities WHERE client_user_id = %s", False),
+    ("documents", "SELECT id, document_name, file_path, uploaded_at FROM documents WHERE client_user_id = %s", False),
+    ("investor_profile", """
+        SELECT ff.field_label as question, cqa.answer
+        FROM client_questionnaire_answers cqa
+        JOIN form_fields ff ON cqa.form_field_id = ff.id
+        WHERE cqa.client_user_id = %s
+    """, False),
+]
+
+_APPOINTMENTS_STATEMENT = (
+    "appointments",
+    "SELECT id, title, start_time, end_time, status FROM appointments WHERE client_user_id = %s ORDER BY start_time DESC",
+    False,
+)
+
+# Recurring occurrences listed with the appointments: the past year and the
+# next 90 days around a given day. The list changes with the day, so callers
+# caching it put the day in the cache key (see profile_view_key).
+PROFILE_SERIES_HISTORY = timedelta(days=366)
+PROFILE_SERIES_HORIZON = timedelta(days=90)
+
+
+def fetch_result_sets(cursor, sql, params):
+    """
+    Executes several ';'-separated statements in one round trip and returns
+    one list of rows per statement. Works with both the current connector
+    (fetchsets) and the older multi=True API.
+    """
+    if hasattr(cursor, 'fetchsets'):
+        cursor.execute(sql, params)
+        return [rows for _, rows in cursor.fetchsets()]
+    return [
+        result.fetchall() if result.with_rows else []
+        for result in cursor.execute(sql, params, multi=True)
+    ]
+
+
+def profile_view_key(view, include_appointments=False, today=None):
+    """
+    The `view` to pass to cached_profile_response(): views listing recurring
+    occurrences are keyed by day as well, so they don't freeze in the cache.
+    """
+    if not include_appointments:
+        return view
+    return f"{view}-{(today or utc_now().date()).isoformat()}"
+
+
+def load_client_profile(cursor, client_id, include_appointments=False, today=None):
+    """
+    Fetches every profile section for a client with one multi-statement
+    query. `cursor` must be a dictionary cursor. Returns a dict keyed by
+    section name; single-row sections are a dict or None, the rest are lists.
+    With include_appointments, recurring occurrences around `today` (a UTC
+    date, default the current one) are merged into the appointments list
+    with series_id and occurrence_start set.
+    """
+    statements = list(_PROFILE_STATEMENTS)
+    if include_appointments:
+        statements.append(_APPOINTMENTS_STATEMENT)
+
+    sql = ";\n".join(statement.strip() for _, statement, _ in statements)
+    result_sets = fetch_result_sets(cursor, sql, (client_id,) * len(statements))
+
+    profile = {}
+    for (key, _, single), rows in zip(statements, result_sets):
+        profile[key] = (rows[0] if rows else None) if single else rows
+
+    if include_appointments:
+        day = datetime.combine(today or utc_now().date(), time.min)
+        for occurrence in load_occurrences(cursor, day - PROFILE_SERIES_HISTORY, day + PROFILE_SERIES_HORIZON,
+                                           client_id=client_id):
+            profile["appointments"].append({
+                "id": None, "series_id": occurrence['series_id'], "occurrence_start": occurrence['occurrence_start'],
+                "title": occurrence['title'], "start_time": occurrence['start_time'],
+                "end_time": occurrence['end_time'], "status": None,
+            })
+        profile["appointments"].sort(key=lambda appt: appt['start_time'], reverse=True)
+    return profile
+
+
+def bump_profile_version(cursor, client_id):
+    """
+    Invalidates every cached view of a client's profile. Call it inside the
+    transaction of any write that changes what the profile pages show.
+    """
+    cursor.execute(
+        "INSERT INTO client_profile_versions (client_user_id, version) VALUES (%s, 1) "
+        "ON DUPLICATE KEY UPDATE version = version + 1",
+        (client_id,)
+    )
+
+
+def get_profile_version(conn, client_id):
+    row = conn.prepared_fetchone(
+        "SELECT version FROM client_profile_versions WHERE client_user_id = %s",
+        (client_id,)
+    )
+    return row['version'] if row else 0
+
+
+def cached_profile_response(conn, client_id, view, build_payload):
+    """
+    Answers a profile GET from the version counter alone when possible:
+    304 if the caller's If-None-Match matches the current version, the cached
+    JSON body if this version was rendered before, otherwise build_payload()
+    is called and its result cached.
+    """
+    version = get_profile_version(conn, client_id)
+    etag = f"{view}-{client_id}-{version}"
+
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        key = (view, client_id, version)
+        body = profile_cache.get(key)
+        if body is None:
+            body = current_app.json.dumps(build_payload()).encode('utf-8')
+            profile_cache.set(key, body)
+        response = current_app.response_class(body, status=200, mimetype='application/json')
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,68 @@
+"""
+Advisor dashboard statistics: client counts by tier and onboarding status
+(read from advisor_client_counters) plus the appointment histogram for the
+current week, including recurring occurrences, cached per advisor for
+DASHBOARD_CACHE_TTL seconds. Days are display-timezone days.
+"""
+from collections import Counter
+from datetime import timedelta
+from config import Config
+from utils.cache import TTLCache
+from utils.recurrence import load_occurrences
+from utils.timezones import display_day_start, display_today, to_display_time
+
+dashboard_cache = TTLCache(Config.DASHBOARD_CACHE_TTL)
+
+# The advisor's counter rows, plus one pass over this week's appointments
+# grouped by local day. Stored times are UTC, so they are shifted by the
+# week's UTC offset (constant for the display timezone, which has no DST).
+_DASHBOARD_SQL = """
+    SELECT dimension AS kind, value AS label, count
+    FROM advisor_client_counters
+    WHERE advisor_user_id = %s AND count <> 0
+    UNION ALL
+    SELECT 'appointments', CAST(DATE(start_time + INTERVAL %s MINUTE) AS CHAR), COUNT(*)
+    FROM appointments
+    WHERE advisor_user_id = %s AND start_time >= %s AND start_time < %s
+    GROUP BY 2
+"""
+
+
+def load_dashboard_stats(cursor, advisor_id, today=None):
+    """Builds the dashboard payload for one advisor. `cursor` must be a dictionary cursor."""
+    today = today or display_today()
+    week_start = today - timedelta(days=today.weekday())
+    days = [week_start + timedelta(days=i) for i in range(7)]
+    week_start_at, week_end_at = display_day_start(week_start), display_day_start(week_start + timedelta(days=7))
+    offset_minutes = int(to_display_time(week_start_at).utcoffset().total_seconds() // 60)
+
+    cursor.execute(_DASHBOARD_SQL, (advisor_id, offset_minutes, advisor_id, week_start_at, week_end_at))
+
+    tiers, statuses, appointments = Counter(), Counter(), Counter()
+    for row in cursor.fetchall():
+        if row['kind'] == 'tier':
+            tiers[row['label'] or None] += row['count']
+        elif row['kind'] == 'onboarding_status':
+            statuses[row['label'] or None] += row['count']
+        else:
+            appointments[row['label']] = row['count']
+
+    for occurrence in load_occurrences(cursor, week_start_at, week_end_at, advisor_ids=[advisor_id]):
+        if occurrence['start_time'] >= week_start_at:
+            appointments[to_display_time(occurrence['start_time']).date().isoformat()] += 1
+
+    return {
+        "clients_by_tier": [{"tier": tier, "count": count} for tier, count in tiers.items()],
+        "clients_by_onboarding_status": [
+            {"onboarding_status": status, "count": count} for status, count in statuses.items()
+        ],
+        "appointments_weekly": [
+            {"day": d.strftime('%a'), "count": appointments.get(d.isoformat(), 0)} for d in days
+        ],
+        "meetings_today": appointments.get(today.isoformat(), 0)
+    }
+
+
+def invalidate_dashboard(advisor_id):
+    dashboard_cache.invalidate(advisor_id)
+
@@ -1,21 +1,634 @@
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from functools import wraps
+
 import mysql.connector
-from mysql.connector import pooling
+from flask import g, has_request_context, jsonify, request
 from config import Config
 
-try:
-    # Create a connection pool
-    db_pool = pooling.MySQLConnectionPool(
-        pool_name="regal_pool",
-        pool_size=32,
-        **Config.DB_CONFIG
+
+class DatabaseUnavailableError(Exception):
+    """
+    Raised when no database connection can be handed out, either because the
+    database refused a new connection or because every connection stayed
+    checked out for longer than DB_POOL_TIMEOUT. Turned into a 503 by init_db().
+    """
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after if retry_after is not None else Config.DB_RETRY_AFTER
+
+
+class ReplicaWriteError(Exception):
+    """Raised when a statement that modifies data is sent over a replica connection."""
+
+
+_WRITE_PREFIXES = ('insert', 'update', 'delete', 'replace', 'create', 'alter', 'drop', 'truncate', 'lock')
+
+def is_write_statement(operation):
+    """True for statements that must run on the primary (DML, DDL and locking reads)."""
+    text = operation.lstrip().lower()
+    return text.startswith(_WRITE_PREFIXES) or 'for update' in text
+
+
+def _mark_request_wrote():
+    if has_request_context():
+        g.db_wrote = True
+
+def _check_statement(conn, operation):
+    """Enforces replica routing rules for a statement; returns True if it writes."""
+    if is_write_statement(operation):
+        if conn.role == 'replica':
+            raise ReplicaWriteError("Write statement sent to a read replica connection")
+        _mark_request_wrote()
+        return True
+    return False
+
+
+_LITERALS = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|\b\d+(?:\.\d+)?\b|%s|%\(\w+\)s")
+_PLACEHOLDER_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+def normalize_sql(operation):
+    """Collapses whitespace and replaces literals and placeholders with '?' for logging."""
+    text = " ".join(operation.split())
+    text = _LITERALS.sub("?", text)
+    return _PLACEHOLDER_LISTS.sub("(?+)", text)
+
+
+_budgets = threading.local()
+
+def _record_query(operation, elapsed, rows):
+    if has_request_context():
+        stats = g.get('db_stats')
+        if stats is None:
+            stats = g.db_stats = {"queries": 0, "rows": 0, "time_ms": 0.0}
+        stats["queries"] += 1
+        stats["rows"] += rows
+        stats["time_ms"] += elapsed * 1000
+
+    for budget in getattr(_budgets, 'active', ()):
+        budget.statements.append(normalize_sql(operation))
+
+    if elapsed * 1000 >= Config.DB_SLOW_QUERY_MS:
+        route = request.endpoint if has_request_context() else '<no-request>'
+        print(f"Slow query ({elapsed * 1000:.1f} ms) in {route}: {normalize_sql(operation)}")
+
+def _record_fetch(elapsed, rows):
+    if has_request_context() and g.get('db_stats') is not None:
+        g.db_stats["rows"] += rows
+        g.db_stats["time_ms"] += elapsed * 1000
+
+
+class InstrumentedCursor:
+    """
+    Cursor proxy that counts statements, rows and time for the current request
+    and logs slow statements. It also notices writes: a write pins the rest of
+    the request to the primary, and a write on a replica connection is refused.
+    """
+    def __init__(self, conn, cursor):
+        self._conn = conn
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        # Through fetchone() so iterated rows are counted like fetched ones
+        return iter(self.fetchone, None)
+
+    def execute(self, operation, params=None, **kwargs):
+        is_write = _check_statement(self._conn, operation)
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, params, **kwargs)
+        finally:
+            rows = max(self._cursor.rowcount, 0) if is_write else 0
+            _record_query(operation, time.perf_counter() - started, rows)
+
+    def executemany(self, operation, seq_params, **kwargs):
+        is_write = _check_statement(self._conn, operation)
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params, **kwargs)
+        finally:
+            rows = max(self._cursor.rowcount, 0) if is_write else 0
+            _record_query(operation, time.perf_counter() - started, rows)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self._cursor.fetchone()
+        _record_fetch(time.perf_counter() - started, 1 if row is not None else 0)
+        return row
+
+    def fetchmany(self, size=1):
+        started = time.perf_counter()
+        rows = self._cursor.fetchmany(size)
+        _record_fetch(time.perf_counter() - started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = self._cursor.fetchall()
+        _record_fetch(time.perf_counter() - started, len(rows))
+        return rows
+
+
+class StatementCache:
+    """
+    Server-side prepared statements for one physical connection, keyed by SQL
+    text and evicted least-recently-used. The cache is dropped when the
+    connection reconnects, since the server forgets statements with the session.
+    """
+    def __init__(self, cnx, size):
+        self._cnx = cnx
+        self._size = size
+        self._connection_id = cnx.connection_id
+        self._cursors = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, operation):
+        """Returns (prepared cursor, sql) for the statement, preparing it on first use."""
+        if self._cnx.connection_id != self._connection_id:
+            # Reconnected: the old statement ids are meaningless on the new session.
+            self._cursors.clear()
+            self._connection_id = self._cnx.connection_id
+
+        entry = self._cursors.get(operation)
+        if entry is not None:
+            self._cursors.move_to_end(operation)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        # The connector re-prepares unless it sees the very same string object,
+        # so keep the one we cached alongside its cursor.
+        entry = (self._cnx.cursor(prepared=True), operation)
+        self._cursors[operation] = entry
+        if len(self._cursors) > self._size:
+            _, (old_cursor, _) = self._cursors.popitem(last=False)
+            self.evictions += 1
+            try:
+                old_cursor.close()
+            except mysql.connector.Error:
+                pass
+        return entry
+
+
+class PooledConnection:
+    """
+    Thin proxy around a pooled mysql connection. Everything is delegated to the
+    real connection; close() hands it back to the pool and records how long the
+    current route held it.
+    """
+    def __init__(self, pool, cnx, route):
+        self._pool = pool
+        self._cnx = cnx
+        self._route = route
+        self.role = pool.role
+        self._checked_out_at = time.perf_counter()
+        self._closed = False
+
+    def __getattr__(self, name):
+        return getattr(self._cnx, name)
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self, self._cnx.cursor(*args, **kwargs))
+
+    def _execute_prepared(self, operation, params):
+        is_write = _check_statement(self, operation)
+        cursor, operation = self._pool.statement_cache(self._cnx).get(operation)
+        started = time.perf_counter()
+        try:
+            cursor.execute(operation, params)
+            rows = cursor.fetchall() if cursor.with_rows else []
+        finally:
+            affected = max(cursor.rowcount, 0) if is_write else 0
+            _record_query(operation, time.perf_counter() - started, affected)
+        _record_fetch(0.0, len(rows))
+        columns = cursor.column_names
+        return [dict(zip(columns, row)) for row in rows]
+
+    def prepared_fetchall(self, operation, params=()):
+        """Runs a hot query as a cached server-side prepared statement; returns dict rows."""
+        return self._execute_prepared(operation, params)
+
+    def prepared_fetchone(self, operation, params=()):
+        """Like prepared_fetchall() but returns the first row or None."""
+        rows = self._execute_prepared(operation, params)
+        return rows[0] if rows else None
+
+    def start_transaction(self, *args, **kwargs):
+        if self.role == 'primary':
+            _mark_request_wrote()
+        return self._cnx.start_transaction(*args, **kwargs)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._pool.release(self._cnx, self._route, time.perf_counter() - self._checked_out_at)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class InstrumentedPool:
+    """
+    A connection pool that opens connections on demand (up to pool_size),
+    waits a bounded time on checkout, pings connections that sat idle for too
+    long and keeps counters for wait time, hold time per route, in-use/idle
+    connections and exhaustion events.
+    """
+    def __init__(self, role, pool_size, timeout, validate_after, **db_config):
+        self.role = role
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.validate_after = validate_after
+        self._db_config = db_config
+        self._idle = deque()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+        self._open = 0
+        self._in_use = 0
+        self._checkouts = 0
+        self._exhausted = 0
+        self._connect_errors = 0
+        self._revalidated = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._hold_by_route = {}
+        self._statements = {}
+        self.startup = {
+            "created_at": time.time(),
+            "warmup_requested": 0,
+            "warmed": 0,
+            "warmup_ms": None,
+            "last_connect_error": None,
+        }
+
+    def _connect(self):
+        try:
+            cnx = mysql.connector.connect(**self._db_config)
+        except mysql.connector.Error as err:
+            with self._lock:
+                self._open -= 1
+                self._connect_errors += 1
+                self.startup["last_connect_error"] = str(err)
+            raise
+        return cnx
+
+    def statement_cache(self, cnx):
+        cache = self._statements.get(id(cnx))
+        if cache is None:
+            cache = StatementCache(cnx, Config.DB_STATEMENT_CACHE_SIZE)
+            with self._lock:
+                self._statements[id(cnx)] = cache
+        return cache
+
+    def _discard(self, cnx):
+        with self._lock:
+            self._open -= 1
+            self._statements.pop(id(cnx), None)
+        try:
+            cnx.close()
+        except Exception:
+            pass
+
+    def _take_idle(self):
+        """Pops an idle connection, pinging it first if it has been idle for a while."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    self._open += 1
+                    return None
+                cnx, last_used = self._idle.pop()
+
+            if time.monotonic() - last_used < self.validate_after:
+                return cnx
+            try:
+                cnx.ping(reconnect=True, attempts=1, delay=0)
+                with self._lock:
+                    self._revalidated += 1
+                return cnx
+            except mysql.connector.Error:
+                self._discard(cnx)
+
+    def get_connection(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        route = request.endpoint if has_request_context() else None
+        route = route or '<no-request>'
+
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=timeout):
+            with self._lock:
+                self._exhausted += 1
+            raise DatabaseUnavailableError(
+                f"No database connection became available within {timeout}s"
+            )
+
+        try:
+            cnx = self._take_idle() or self._connect()
+        except mysql.connector.Error as err:
+            self._slots.release()
+            raise DatabaseUnavailableError(f"Could not connect to the database: {err}")
+        except Exception:
+            self._slots.release()
+            raise
+
+        waited = time.perf_counter() - started
+        with self._lock:
+            self._in_use += 1
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return PooledConnection(self, cnx, route)
+
+    def release(self, cnx, route, held):
+        try:
+            # Leave nothing behind for the next borrower.
+            if cnx.unread_result:
+                cnx.consume_results()
+            if cnx.in_transaction:
+                cnx.rollback()
+            reusable = True
+        except Exception:
+            reusable = False
+
+        with self._lock:
+            self._in_use -= 1
+            stats = self._hold_by_route.setdefault(route, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            stats["count"] += 1
+            stats["total_ms"] += held * 1000
+            stats["max_ms"] = max(stats["max_ms"], held * 1000)
+            if reusable:
+                self._idle.append((cnx, time.monotonic()))
+        if not reusable:
+            self._discard(cnx)
+        self._slots.release()
+
+    def warm_up(self, count):
+        """Opens up to `count` idle connections so the first requests skip the handshake."""
+        count = min(count, self.pool_size)
+        started = time.perf_counter()
+        warmed = 0
+        for _ in range(count):
+            with self._lock:
+                if self._open >= count:
+                    break
+                self._open += 1
+            try:
+                cnx = self._connect()
+            except mysql.connector.Error:
+                break
+            with self._lock:
+                self._idle.append((cnx, time.monotonic()))
+            warmed += 1
+
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        with self._lock:
+            self.startup["warmed"] += warmed
+            self.startup["warmup_ms"] = elapsed_ms
+        print(f"Database pool warm-up ({self.role}): {warmed}/{count} connections opened in {elapsed_ms} ms.")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pool_size": self.pool_size,
+                "open": self._open,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "checkouts": self._checkouts,
+                "exhausted": self._exhausted,
+                "connect_errors": self._connect_errors,
+                "revalidated": self._revalidated,
+                "prepared_statements": {
+                    "cached": sum(len(c._cursors) for c in self._statements.values()),
+                    "hits": sum(c.hits for c in self._statements.values()),
+                    "misses": sum(c.misses for c in self._statements.values()),
+                    "evictions": sum(c.evictions for c in self._statements.values()),
+                },
+                "wait_avg_ms": round(self._wait_total * 1000 / self._checkouts, 3) if self._checkouts else 0.0,
+                "wait_max_ms": round(self._wait_max * 1000, 3),
+                "hold_by_route": {
+                    route: {
+                        "count": s["count"],
+                        "avg_ms": round(s["total_ms"] / s["count"], 3),
+                        "max_ms": round(s["max_ms"], 3),
+                    }
+                    for route, s in self._hold_by_route.items()
+                },
+                "startup": dict(self.startup),
+            }
+
+
+_pools = {}
+_pool_lock = threading.Lock()
+
+def _get_pool(role='primary'):
+    """Creates the pool on first use. No connection is opened until one is needed."""
+    pool = _pools.get(role)
+    if pool is None:
+        with _pool_lock:
+            pool = _pools.get(role)
+            if pool is None:
+                pool = InstrumentedPool(
+                    role=role,
+                    pool_size=Config.DB_POOL_SIZE,
+                    timeout=Config.DB_POOL_TIMEOUT,
+                    validate_after=Config.DB_VALIDATE_AFTER,
+                    **(Config.DB_CONFIG if role == 'primary' else Config.DB_REPLICA_CONFIG)
+                )
+                _pools[role] = pool
+    return pool
+
+
+_replica_lock = threading.Lock()
+# Routing counters and the last lag verdict. Checking lag is serialised by
+# _replica_lock; every write here, and the stats snapshot, holds _pool_lock.
+_replica_state = {
+    "checked_at": 0.0,
+    "lag_seconds": None,
+    "healthy": True,
+    "routed_replica": 0,
+    "routed_primary": 0,
+    "fallbacks": 0,
+}
+
+def _replica_lag(conn):
+    """Reads the replication delay in seconds, or None if replication is not running."""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        try:
+            cursor.execute("SHOW REPLICA STATUS")
+        except mysql.connector.Error:
+            # MariaDB and MySQL < 8.0.22 only know the old spelling.
+            cursor.execute("SHOW SLAVE STATUS")
+        status = cursor.fetchone()
+    finally:
+        cursor.close()
+    if not status:
+        return None
+    return status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+
+def _replica_is_fresh(conn):
+    """
+    Checks replication lag at most once per DB_REPLICA_LAG_CHECK_INTERVAL and
+    caches the verdict so the common path costs nothing.
+    """
+    now = time.monotonic()
+    if now - _replica_state["checked_at"] < Config.DB_REPLICA_LAG_CHECK_INTERVAL:
+        return _replica_state["healthy"]
+    if not _replica_lock.acquire(blocking=False):
+        # Someone else is checking right now; go with the last verdict.
+        return _replica_state["healthy"]
+    try:
+        try:
+            lag = _replica_lag(conn)
+        except mysql.connector.Error:
+            lag = None
+        healthy = lag is not None and lag <= Config.DB_REPLICA_MAX_LAG
+        with _pool_lock:
+            _replica_state.update(lag_seconds=lag, healthy=healthy, checked_at=time.monotonic())
+        if not healthy:
+            print(f"Read replica lag is {lag}s (limit {Config.DB_REPLICA_MAX_LAG}s); reads fall back to primary.")
+    finally:
+        _replica_lock.release()
+    return _replica_state["healthy"]
+
+def _request_is_read_only():
+    return has_request_context() and g.get('db_read_only', False) and not g.get('db_wrote', False)
+
+def _replica_connection(timeout):
+    """A fresh-enough replica connection, or None when reads should go to the primary."""
+    stale = time.monotonic() - _replica_state["checked_at"] >= Config.DB_REPLICA_LAG_CHECK_INTERVAL
+    if not stale and not _replica_state["healthy"]:
+        return None
+    try:
+        conn = _get_pool('replica').get_connection(timeout)
+    except DatabaseUnavailableError:
+        return None
+    if _replica_is_fresh(conn):
+        return conn
+    conn.close()
+    return None
+
+def replica_reads(f):
+    """
+    Marks a route as read-only so get_db_connection() may serve it from the
+    read replica. A write later in the same request switches back to the primary.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        g.db_read_only = True
+        return f(*args, **kwargs)
+    return decorated
+
+def _count_route(counter):
+    with _pool_lock:
+        _replica_state[counter] += 1
+
+def get_db_connection(timeout=None, read_only=None):
+    """
+    Get a connection from the pool. Waits up to DB_POOL_TIMEOUT seconds for a
+    free connection and raises DatabaseUnavailableError instead of returning None.
+
+    Reads from routes marked with @replica_reads (or read_only=True) go to the
+    replica when one is configured and not lagging; everything else, and
+    everything after a write in the same request, goes to the primary.
+    """
+    if read_only is None:
+        read_only = _request_is_read_only()
+
+    if read_only and Config.DB_REPLICA_CONFIG:
+        conn = _replica_connection(timeout)
+        if conn is not None:
+            _count_route("routed_replica")
+            return conn
+        _count_route("fallbacks")
+
+    _count_route("routed_primary")
+    return _get_pool('primary').get_connection(timeout)
+
+
+class QueryBudget:
+    """Statements seen inside a query_budget() block."""
+    def __init__(self, max_queries):
+        self.max_queries = max_queries
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@contextmanager
+def query_budget(max_queries):
+    """
+    Test helper: fails with AssertionError if more than max_queries statements
+    run inside the block, listing them so N+1 patterns are easy to spot.
+    benchmarks/check_query_budgets.py holds the budgets of the hot endpoints.
+
+        with query_budget(3):
+            client.get('/api/advisor/dashboard/stats', headers=auth)
+    """
+    budget = QueryBudget(max_queries)
+    active = getattr(_budgets, 'active', None)
+    if active is None:
+        active = _budgets.active = []
+    active.append(budget)
+    try:
+        yield budget
+    finally:
+        active.remove(budget)
+    if budget.count > max_queries:
+        listing = "\n".join(f"  {i + 1}. {sql}" for i, sql in enumerate(budget.statements))
+        raise AssertionError(f"Expected at most {max_queries} queries, {budget.count} were executed:\n{listing}")
+
+
+def get_pool_stats():
+    """Returns the pool gauges and counters and the replica routing state for monitoring."""
+    stats = {role: pool.stats() for role, pool in _pools.items()}
+    with _pool_lock:
+        routing = {key: value for key, value in _replica_state.items() if key != "checked_at"}
+    stats["routing"] = {"replica_configured": bool(Config.DB_REPLICA_CONFIG), **routing}
+    return stats
+
+
+def init_db(app):
+    """
+    Registers the 503 + Retry-After response for DatabaseUnavailableError and
+    the X-DB-Queries/X-DB-Time debug headers, prints the pool settings and, if DB_POOL_WARMUP is set, opens that many
+    connections in a background thread so worker boot never waits on MySQL.
+    """
+    pool = _get_pool()
+    warmup = min(Config.DB_POOL_WARMUP, pool.pool_size)
+    pool.startup["warmup_requested"] = warmup
+    print(
+        f"Database pool configured: size={pool.pool_size}, checkout timeout={pool.timeout}s, "
+        f"validate after {pool.validate_after}s idle, warm-up={warmup} connection(s)."
     )
-    print("Database connection pool created successfully.")
-except mysql.connector.Error as err:
-    print(f"Error creating connection pool: {err}")
-    db_pool = None
-
-def get_db_connection():
-    """Get a connection from the pool."""
-    if db_pool:
-        return db_pool.get_connection()
-    return None
\ No newline at end of file
+    if warmup:
+        threading.Thread(target=pool.warm_up, args=(warmup,), name="db-pool-warmup", daemon=True).start()
+
+    @app.after_request
+    def add_query_headers(response):
+        stats = g.get('db_stats')
+        if app.debug and stats:
+            response.headers['X-DB-Queries'] = str(stats["queries"])
+            response.headers['X-DB-Rows'] = str(stats["rows"])
+            response.headers['X-DB-Time'] = f"{stats['time_ms']:.2f}ms"
+        return response
+
+    @app.errorhandler(DatabaseUnavailableError)
+    def handle_database_unavailable(err):
+        response = jsonify({"message": "The service is busy, please retry shortly."})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(err.retry_after)
+        return response
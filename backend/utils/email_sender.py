@@ -1,6 +1,6 @@
 from flask_mail import Message
 from flask import current_app
-import pytz
+from utils.timezones import DISPLAY_TIMEZONE_LABEL, format_display_date, format_display_time
 
 def send_2fa_code_email(user_email, code):
     """
@@ -71,21 +71,13 @@ def send_appointment_email(client_email, client_name, advisor_name, appointment_
         )
 
      
-        start_time_utc = appointment_details['start_time']
-        end_time_utc = appointment_details['end_time']
+        start_time = appointment_details['start_time']
+        end_time = appointment_details['end_time']
 
-  
-        ist_tz = pytz.timezone('Asia/Kolkata')
-
-        start_time_ist = start_time_utc.astimezone(ist_tz)
-        end_time_ist = end_time_utc.astimezone(ist_tz)
-
-
-        formatted_start = start_time_ist.strftime('%I:%M %p')
-        formatted_end = end_time_ist.strftime('%I:%M %p')
-        formatted_date = start_time_ist.strftime('%A, %B %d, %Y')
+        formatted_start = format_display_time(start_time)
+        formatted_end = format_display_time(end_time)
+        formatted_date = format_display_date(start_time)
 
-        
         msg.html = f"""
         <p>Dear {client_name},</p>
         <p>This is a confirmation that a new appointment has been scheduled for you by your advisor, {advisor_name}.</p>
@@ -93,7 +85,7 @@ def send_appointment_email(client_email, client_name, advisor_name, appointment_
         <ul>
             <li><strong>Title:</strong> {appointment_details['title']}</li>
             <li><strong>When:</strong> {formatted_date}</li>
-            <li><strong>Time:</strong> {formatted_start} to {formatted_end} (IST)</li>
+            <li><strong>Time:</strong> {formatted_start} to {formatted_end} ({DISPLAY_TIMEZONE_LABEL})</li>
         </ul>
         """
 
@@ -114,3 +106,49 @@ def send_appointment_email(client_email, client_name, advisor_name, appointment_
 
   
 
+
+
+def build_appointment_reminder(client_email, client_name, advisor_name, appointment):
+    """
+    Builds (but does not send) the reminder email for an upcoming appointment,
+    so a batch of them can go out over one SMTP connection.
+    """
+    formatted_date = format_display_date(appointment['start_time'])
+    formatted_start = format_display_time(appointment['start_time'])
+    formatted_end = format_display_time(appointment['end_time'])
+
+    msg = Message(
+        subject=f"Reminder: {appointment['title']} on {formatted_date}",
+        sender=("Regal Wealth Advisors", current_app.config['MAIL_USERNAME']),
+        recipients=[client_email]
+    )
+    msg.html = f"""
+    <p>Dear {client_name},</p>
+    <p>This is a reminder of your upcoming appointment with your advisor, {advisor_name}.</p>
+    <ul>
+        <li><strong>Title:</strong> {appointment['title']}</li>
+        <li><strong>When:</strong> {formatted_date}</li>
+        <li><strong>Time:</strong> {formatted_start} to {formatted_end} ({DISPLAY_TIMEZONE_LABEL})</li>
+    </ul>
+    <p>Sincerely,<br>The Regal Wealth Advisors Team</p>
+    """
+    return msg
+
+
+def send_batch(messages):
+    """
+    Sends several messages over a single SMTP connection. A failure on one
+    message is logged and does not stop the rest. Returns the number sent.
+    """
+    if not messages:
+        return 0
+    mail = current_app.extensions.get('mail')
+    sent = 0
+    with mail.connect() as connection:
+        for msg in messages:
+            try:
+                connection.send(msg)
+                sent += 1
+            except Exception as e:
+                print(f"Failed to send email to {', '.join(msg.recipients)}: {e}")
+    return sent
@@ -0,0 +1,209 @@
+"""
+iCalendar (.ics) feeds of an advisor's or a client's appointments, for
+calendar apps that poll a URL. feed_version() answers "has anything changed"
+from one aggregate query; generate_feed() streams the calendar line by line
+from unbuffered cursors, so no feed is ever held in memory. Recurring series
+are emitted once with an RRULE, cancelled occurrences as EXDATE and moved
+ones as RECURRENCE-ID overrides.
+"""
+import hashlib
+import secrets
+from datetime import timedelta
+from utils.recurrence import utc_now
+from utils.timezones import DISPLAY_TIMEZONE, DISPLAY_TIMEZONE_LABEL, as_utc, format_display_date, format_display_time
+
+FEED_PAST_WINDOW = timedelta(days=90)
+FETCH_SIZE = 500
+
+# Role of the feed owner -> (their column, the other party's column)
+_FEED_COLUMNS = {
+    'advisor': ('advisor_user_id', 'client_user_id'),
+    'client': ('client_user_id', 'advisor_user_id'),
+}
+_RRULE_FREQ = {'daily': 'DAILY', 'weekly': 'WEEKLY', 'monthly': 'MONTHLY'}
+
+
+def new_feed_token():
+    """A random feed token and the hash stored for it; the token itself is never stored."""
+    token = secrets.token_urlsafe(32)
+    return token, hash_feed_token(token)
+
+
+def hash_feed_token(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def feed_version(cursor, role, user_id):
+    """
+    Returns (last_modified_epoch, etag) for a user's feed. Row counts are
+    part of the ETag so deleted rows change it too.
+    """
+    owner = _FEED_COLUMNS[role][0]
+    cursor.execute(
+        f"""
+        SELECT UNIX_TIMESTAMP(MAX(updated_at)), COUNT(*) FROM appointments WHERE {owner} = %s
+        UNION ALL
+        SELECT UNIX_TIMESTAMP(MAX(updated_at)), COUNT(*) FROM appointment_series WHERE {owner} = %s
+        UNION ALL
+        SELECT UNIX_TIMESTAMP(MAX(e.updated_at)), COUNT(*)
+        FROM appointment_series_exceptions e JOIN appointment_series s ON s.id = e.series_id
+        WHERE s.{owner} = %s
+        """,
+        (user_id, user_id, user_id)
+    )
+    rows = cursor.fetchall()
+    last_modified = max((int(row[0]) for row in rows if row[0] is not None), default=0)
+    etag = f"ics-{role}-{user_id}-{last_modified}-" + "-".join(str(row[1]) for row in rows)
+    return last_modified, etag
+
+
+def _escape(text):
+    return (text or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def _line(name, value):
+    """One content line, folded at 75 octets as RFC 5545 requires."""
+    raw = f"{name}:{value}".encode('utf-8')
+    chunks = []
+    while len(raw) > 75:
+        cut = 75 if not chunks else 74
+        # Don't split a multi-byte character
+        while raw[cut] & 0xC0 == 0x80:
+            cut -= 1
+        chunks.append(raw[:cut])
+        raw = raw[cut:]
+    chunks.append(raw)
+    return b"\r\n ".join(chunks).decode('utf-8') + "\r\n"
+
+
+def _utc_stamp(value):
+    return as_utc(value).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _description(start, end, notes):
+    when = f"{format_display_date(start)}, {format_display_time(start)} to {format_display_time(end)} ({DISPLAY_TIMEZONE_LABEL})"
+    return f"{when}\n{notes}" if notes else when
+
+
+def _event(uid, stamp, start, end, title, other_name, notes, extra=()):
+    summary = f"{title} with {other_name}" if other_name else title
+    lines = [
+        "BEGIN:VEVENT\r\n",
+        _line("UID", uid),
+        _line("DTSTAMP", stamp),
+        _line("DTSTART", _utc_stamp(start)),
+        _line("DTEND", _utc_stamp(end)),
+        _line("SUMMARY", _escape(summary)),
+        _line("DESCRIPTION", _escape(_description(start, end, notes))),
+    ]
+    lines.extend(extra)
+    lines.append("END:VEVENT\r\n")
+    return "".join(lines)
+
+
+def _rrule(series):
+    parts = [f"FREQ={_RRULE_FREQ[series['frequency']]}", f"INTERVAL={series['interval_count']}"]
+    day = series['start_time'].day
+    if series['frequency'] == 'monthly' and day > 28:
+        # Occurrences on the 29th-31st fall back to the month's last day
+        parts.append("BYMONTHDAY=" + ",".join(str(d) for d in range(28, day + 1)) + ";BYSETPOS=-1")
+    if series['occurrence_count'] is not None:
+        parts.append(f"COUNT={series['occurrence_count']}")
+    elif series['until_date'] is not None:
+        parts.append(f"UNTIL={series['until_date'].strftime('%Y%m%d')}T235959Z")
+    return ";".join(parts)
+
+
+def generate_feed(get_connection, role, user_id):
+    """
+    Yields the calendar as text chunks. The connection is taken from
+    get_connection() only once the body is read, so a response that is
+    never iterated (HEAD, early close) holds none, and it is returned to the
+    pool however the generator ends.
+    """
+    conn = get_connection()
+    try:
+        yield from _feed_chunks(conn, role, user_id)
+    finally:
+        conn.close()
+
+
+def _feed_chunks(conn, role, user_id):
+    owner, other = _FEED_COLUMNS[role]
+    now = utc_now()
+    stamp = _utc_stamp(now)
+    cursor = conn.cursor()
+    try:
+        yield (
+            "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Regal Wealth Advisors//Appointments//EN\r\n"
+            "CALSCALE:GREGORIAN\r\nMETHOD:PUBLISH\r\n"
+            + _line("X-WR-CALNAME", "Regal Wealth Appointments")
+            + _line("X-WR-TIMEZONE", DISPLAY_TIMEZONE.zone)
+        )
+
+        cursor.execute(
+            f"""
+            SELECT s.id, s.title, s.notes, s.start_time, s.duration_minutes, s.frequency,
+                   s.interval_count, s.until_date, s.occurrence_count,
+                   CONCAT(u.first_name, ' ', u.last_name)
+            FROM appointment_series s JOIN users u ON u.id = s.{other}
+            WHERE s.{owner} = %s AND (s.ends_at IS NULL OR s.ends_at >= %s)
+            ORDER BY s.id
+            """,
+            (user_id, now - FEED_PAST_WINDOW)
+        )
+        columns = ('id', 'title', 'notes', 'start_time', 'duration_minutes', 'frequency',
+                   'interval_count', 'until_date', 'occurrence_count', 'other_name')
+        series_rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+        exceptions = {series['id']: [] for series in series_rows}
+        if series_rows:
+            cursor.execute(
+                f"SELECT series_id, original_start, status, new_start, new_end FROM appointment_series_exceptions "
+                f"WHERE series_id IN ({', '.join(['%s'] * len(series_rows))})",
+                tuple(exceptions)
+            )
+            for row in cursor.fetchall():
+                exceptions[row[0]].append(row[1:])
+
+        for series in series_rows:
+            uid = f"series-{series['id']}@regalwealth"
+            end = series['start_time'] + timedelta(minutes=series['duration_minutes'])
+            extra = [_line("RRULE", _rrule(series))]
+            extra.extend(
+                _line("EXDATE", _utc_stamp(original))
+                for original, status, _, _ in exceptions[series['id']] if status == 'cancelled'
+            )
+            yield _event(uid, stamp, series['start_time'], end, series['title'], series['other_name'],
+                         series['notes'], extra)
+            for original, status, new_start, new_end in exceptions[series['id']]:
+                if status == 'moved':
+                    yield _event(uid, stamp, new_start, new_end, series['title'], series['other_name'],
+                                 series['notes'], [_line("RECURRENCE-ID", _utc_stamp(original))])
+
+        cursor.execute(
+            f"""
+            SELECT a.id, a.title, a.notes, a.start_time, a.end_time, CONCAT(u.first_name, ' ', u.last_name)
+            FROM appointments a JOIN users u ON u.id = a.{other}
+            WHERE a.{owner} = %s AND a.start_time >= %s
+            ORDER BY a.start_time
+            """,
+            (user_id, now - FEED_PAST_WINDOW)
+        )
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            yield "".join(
+                _event(f"appointment-{appointment_id}@regalwealth", stamp, start, end, title, other_name, notes)
+                for appointment_id, title, notes, start, end, other_name in rows
+            )
+
+        yield "END:VCALENDAR\r\n"
+    finally:
+        # Closing an unbuffered cursor with rows left (client went away
+        # mid-stream) raises; the pool discards unread results on release.
+        try:
+            cursor.close()
+        except Exception:
+            pass
@@ -0,0 +1,273 @@
+"""
+Recurring appointments. A series is stored once in appointment_series
+(first occurrence, duration and a daily/weekly/monthly rule ending after a
+count, on an `until` date, or never) and its occurrences are expanded on
+demand for the window being looked at. Cancelled or moved occurrences are
+rows in appointment_series_exceptions keyed by the occurrence's original
+start. Stored times are naive UTC, like appointments.start_time.
+"""
+import calendar
+from datetime import datetime, time, timedelta, timezone
+
+FREQUENCIES = ('daily', 'weekly', 'monthly')
+
+_SERIES_COLUMNS = (
+    "s.id, s.advisor_user_id, s.client_user_id, s.title, s.notes, s.start_time, "
+    "s.duration_minutes, s.frequency, s.interval_count, s.until_date, s.occurrence_count"
+)
+
+
+def _series_from_row(row):
+    if isinstance(row, dict):
+        return row
+    return dict(zip((c.strip().split('.')[-1] for c in _SERIES_COLUMNS.split(',')), row))
+
+
+def get_series(cursor, series_id, advisor_id):
+    """One of the advisor's series, or None if it does not exist or belongs to someone else."""
+    cursor.execute(
+        f"SELECT {_SERIES_COLUMNS} FROM appointment_series s WHERE s.id = %s AND s.advisor_user_id = %s",
+        (series_id, advisor_id)
+    )
+    row = cursor.fetchone()
+    return _series_from_row(row) if row else None
+
+
+def is_occurrence(series, start):
+    """True if `start` is the original start of one of the series' occurrences."""
+    return any(o['start_time'] == start for o in expand_series(series, start, start + timedelta(microseconds=1)))
+
+
+def as_db_datetime(value):
+    """Converts an aware datetime to the naive UTC form stored in the database."""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def utc_now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def occurrence_start(series, k):
+    """Start of the k-th occurrence (0-based), ignoring exceptions and end rules."""
+    start = series['start_time']
+    interval = series['interval_count']
+    if series['frequency'] == 'daily':
+        return start + timedelta(days=k * interval)
+    if series['frequency'] == 'weekly':
+        return start + timedelta(weeks=k * interval)
+    month_index = start.month - 1 + k * interval
+    year, month = start.year + month_index // 12, month_index % 12 + 1
+    # Clamp e.g. the 31st to the last day of shorter months
+    day = min(start.day, calendar.monthrange(year, month)[1])
+    return start.replace(year=year, month=month, day=day)
+
+
+def _within_rule(series, k, start):
+    if series['occurrence_count'] is not None and k >= series['occurrence_count']:
+        return False
+    if series['until_date'] is not None and start.date() > series['until_date']:
+        return False
+    return True
+
+
+def series_end(series):
+    """End of the last occurrence, or None for open-ended series."""
+    duration = timedelta(minutes=series['duration_minutes'])
+    if series['occurrence_count'] is not None:
+        return occurrence_start(series, series['occurrence_count'] - 1) + duration
+    if series['until_date'] is not None:
+        return datetime.combine(series['until_date'], time.max) + duration
+    return None
+
+
+def _first_index(series, window_start):
+    """A lower bound on the index of the first occurrence ending after window_start."""
+    earliest = window_start - timedelta(minutes=series['duration_minutes']) - series['start_time']
+    if earliest <= timedelta(0):
+        return 0
+    if series['frequency'] == 'monthly':
+        months = (window_start.year - series['start_time'].year) * 12 + window_start.month - series['start_time'].month
+        return max(0, (months - 1) // series['interval_count'])
+    step = timedelta(days=series['interval_count'] * (1 if series['frequency'] == 'daily' else 7))
+    return earliest // step
+
+
+def expand_series(series, window_start, window_end, exceptions=None):
+    """
+    Yields the occurrences of one series overlapping [window_start,
+    window_end) as appointment-like dicts. `exceptions` maps an occurrence's
+    original start to its exception row; cancelled occurrences are skipped
+    and moved ones are returned at their new time if that overlaps the
+    window. Work is proportional to the occurrences in the window.
+    """
+    exceptions = exceptions or {}
+    duration = timedelta(minutes=series['duration_minutes'])
+    k = _first_index(series, window_start)
+    while True:
+        start = occurrence_start(series, k)
+        if start >= window_end or not _within_rule(series, k, start):
+            break
+        if start + duration > window_start and start not in exceptions:
+            yield _occurrence(series, start, start, start + duration)
+        k += 1
+
+    for original, exception in exceptions.items():
+        if exception['status'] == 'moved' and exception['new_start'] < window_end and exception['new_end'] > window_start:
+            yield _occurrence(series, original, exception['new_start'], exception['new_end'])
+
+
+def _occurrence(series, original_start, start, end):
+    return {
+        "series_id": series['id'],
+        "occurrence_start": original_start,
+        "advisor_user_id": series['advisor_user_id'],
+        "client_user_id": series['client_user_id'],
+        "title": series['title'],
+        "notes": series['notes'],
+        "start_time": start,
+        "end_time": end,
+    }
+
+
+def load_occurrences(cursor, window_start, window_end, advisor_ids=None, client_id=None):
+    """
+    Expands every series of the given advisors (or of one client, or every
+    series when neither is given) that can have an occurrence in
+    [window_start, window_end), applying exceptions.
+    Returns occurrence dicts sorted by start_time. Two queries regardless of
+    series length.
+    """
+    if advisor_ids is not None:
+        if not advisor_ids:
+            return []
+        owner_sql = f"s.advisor_user_id IN ({', '.join(['%s'] * len(advisor_ids))})"
+        owner_params = tuple(advisor_ids)
+    elif client_id is not None:
+        owner_sql, owner_params = "s.client_user_id = %s", (client_id,)
+    else:
+        owner_sql, owner_params = "1 = 1", ()
+
+    cursor.execute(
+        f"""
+        SELECT {_SERIES_COLUMNS} FROM appointment_series s
+        WHERE {owner_sql}
+          AND s.start_time < %s AND (s.ends_at IS NULL OR s.ends_at > %s
+              OR EXISTS (SELECT 1 FROM appointment_series_exceptions e
+                         WHERE e.series_id = s.id AND e.status = 'moved' AND e.new_end > %s))
+        """,
+        owner_params + (window_end, window_start, window_start)
+    )
+    series_rows = [_series_from_row(row) for row in cursor.fetchall()]
+    if not series_rows:
+        return []
+
+    # Only exceptions for occurrences that could fall in the window
+    exceptions = {row['id']: {} for row in series_rows}
+    longest = timedelta(minutes=max(row['duration_minutes'] for row in series_rows))
+    cursor.execute(
+        f"""
+        SELECT series_id, original_start, status, new_start, new_end
+        FROM appointment_series_exceptions
+        WHERE series_id IN ({', '.join(['%s'] * len(series_rows))})
+          AND ((original_start < %s AND original_start > %s)
+               OR (status = 'moved' AND new_start < %s AND new_end > %s))
+        """,
+        tuple(exceptions) + (window_end, window_start - longest, window_end, window_start)
+    )
+    for row in cursor.fetchall():
+        if not isinstance(row, dict):
+            row = dict(zip(('series_id', 'original_start', 'status', 'new_start', 'new_end'), row))
+        exceptions[row['series_id']][row['original_start']] = row
+
+    occurrences = []
+    for series in series_rows:
+        occurrences.extend(expand_series(series, window_start, window_end, exceptions[series['id']]))
+    occurrences.sort(key=lambda o: o['start_time'])
+    return occurrences
+
+
+def series_appointment_dates(series, today, exceptions=None):
+    """
+    (next, last) start of the series' occurrences: the earliest starting at
+    or after `today` and the latest starting before it, either None. Moved
+    occurrences count at their new time. Work is proportional to the
+    exceptions, not to the length of the series.
+    """
+    exceptions = exceptions or {}
+    next_start = last_start = None
+
+    k = _first_index(series, today)
+    while True:
+        start = occurrence_start(series, k)
+        if not _within_rule(series, k, start):
+            break
+        if start >= today and start not in exceptions:
+            next_start = start
+            break
+        k += 1
+
+    # The last occurrence before today, or before the end of the rule if that came first
+    bound = today
+    if series['until_date'] is not None:
+        bound = min(bound, datetime.combine(series['until_date'] + timedelta(days=1), time.min))
+    count = series['occurrence_count']
+    k = _first_index(series, bound)
+    if count is not None:
+        k = min(k, count - 1)
+    while (count is None or k + 1 < count) and occurrence_start(series, k + 1) < bound:
+        k += 1
+    while k >= 0 and (occurrence_start(series, k) >= bound or occurrence_start(series, k) in exceptions):
+        k -= 1
+    if k >= 0:
+        last_start = occurrence_start(series, k)
+
+    for exception in exceptions.values():
+        if exception['status'] != 'moved':
+            continue
+        if exception['new_start'] >= today:
+            next_start = min(next_start or exception['new_start'], exception['new_start'])
+        else:
+            last_start = max(last_start or exception['new_start'], exception['new_start'])
+    return next_start, last_start
+
+
+def load_client_series(cursor, client_ids):
+    """Every series of the given clients with all its exceptions, as [(series, exceptions), ...]."""
+    if not client_ids:
+        return []
+    cursor.execute(
+        f"SELECT {_SERIES_COLUMNS} FROM appointment_series s "
+        f"WHERE s.client_user_id IN ({', '.join(['%s'] * len(client_ids))})",
+        tuple(client_ids)
+    )
+    series_rows = [_series_from_row(row) for row in cursor.fetchall()]
+    if not series_rows:
+        return []
+    exceptions = {row['id']: {} for row in series_rows}
+    cursor.execute(
+        f"""
+        SELECT series_id, original_start, status, new_start, new_end
+        FROM appointment_series_exceptions
+        WHERE series_id IN ({', '.join(['%s'] * len(series_rows))})
+        """,
+        tuple(exceptions)
+    )
+    for row in cursor.fetchall():
+        if not isinstance(row, dict):
+            row = dict(zip(('series_id', 'original_start', 'status', 'new_start', 'new_end'), row))
+        exceptions[row['series_id']][row['original_start']] = row
+    return [(series, exceptions[series['id']]) for series in series_rows]
+
+
+def next_occurrence(cursor, advisor_id, after):
+    """
+    The advisor's earliest series occurrence starting at or after `after`,
+    or None. Looks a week ahead first and widens up to a year only if needed.
+    """
+    for days in (7, 31, 366):
+        for occurrence in load_occurrences(cursor, after, after + timedelta(days=days), advisor_ids=[advisor_id]):
+            if occurrence['start_time'] >= after:
+                return occurrence
+    return None
@@ -0,0 +1,157 @@
+"""
+Appointment reminder scheduler, run by `flask send-reminders`. Every
+appointment and recurring occurrence that hasn't started yet and starts
+within REMINDER_WINDOW_MINUTES + REMINDER_LEAD_MINUTES is loaded into a
+min-heap keyed by send time (start minus the lead), unless its reminder is
+already recorded in appointment_reminders_sent. Appointments booked or
+moved inside the lead time are therefore due at once. Due reminders are
+popped in batches: each batch's in-app notifications and sent-reminder
+rows are inserted with one executemany each and committed, and only then
+are its emails sent over one SMTP connection. Delivery is therefore at
+most once: a crash or SMTP outage right after the commit loses that
+batch's emails but never sends a reminder twice.
+"""
+import heapq
+import time
+from datetime import timedelta
+from config import Config
+from utils.email_sender import build_appointment_reminder, send_batch
+from utils.recurrence import load_occurrences, utc_now
+
+# Sent-reminder rows are kept this long after their send time, then pruned
+SENT_RETENTION = timedelta(days=7)
+
+
+def reminder_key(kind, source_id, start, original_start=None):
+    """Identifies one reminder; a new start time means a new reminder."""
+    if original_start is not None:
+        return f"{kind}-{source_id}-{original_start.isoformat()}-{start.isoformat()}"
+    return f"{kind}-{source_id}-{start.isoformat()}"
+
+
+class ReminderScheduler:
+    def __init__(self, get_connection, lead=None, window=None, refresh=None, batch_size=None):
+        self.get_connection = get_connection
+        self.lead = lead or timedelta(minutes=Config.REMINDER_LEAD_MINUTES)
+        self.window = window or timedelta(minutes=Config.REMINDER_WINDOW_MINUTES)
+        self.refresh = refresh if refresh is not None else Config.REMINDER_REFRESH_SECONDS
+        self.batch_size = batch_size or Config.REMINDER_BATCH_SIZE
+        self._heap = []            # (remind_at, key, reminder dict)
+        self._loaded_until = None  # reminders due up to here are in the heap
+        self._loaded_at = None     # time.monotonic() of the last load
+
+    def _load(self, cursor, now, until):
+        """Rebuilds the heap with every unsent reminder due by `until` for appointments not yet started."""
+        last_start = until + self.lead
+        cursor.execute("DELETE FROM appointment_reminders_sent WHERE remind_at < %s", (now - SENT_RETENTION,))
+        # Any reminder for an appointment starting after now is due after now - lead
+        cursor.execute("SELECT reminder_key FROM appointment_reminders_sent WHERE remind_at > %s", (now - self.lead,))
+        sent = {row[0] for row in cursor.fetchall()}
+
+        heap = []
+        cursor.execute(
+            """
+            SELECT id, advisor_user_id, client_user_id, title, start_time, end_time
+            FROM appointments
+            WHERE start_time > %s AND start_time <= %s
+            """,
+            (now, last_start)
+        )
+        for appointment_id, advisor_id, client_id, title, start, end in cursor.fetchall():
+            key = reminder_key('appointment', appointment_id, start)
+            if key not in sent:
+                heap.append((start - self.lead, key, {
+                    "advisor_user_id": advisor_id, "client_user_id": client_id,
+                    "title": title, "start_time": start, "end_time": end
+                }))
+        for occurrence in load_occurrences(cursor, now, last_start + timedelta(microseconds=1)):
+            if now < occurrence['start_time'] <= last_start:
+                key = reminder_key('series', occurrence['series_id'], occurrence['start_time'],
+                                   occurrence['occurrence_start'])
+                if key not in sent:
+                    heap.append((occurrence['start_time'] - self.lead, key, occurrence))
+        heapq.heapify(heap)
+        return heap
+
+    def _pop_batch(self, now):
+        """Pops up to batch_size due reminders, never splitting reminders due at the same instant."""
+        batch = []
+        while self._heap and self._heap[0][0] <= now:
+            if len(batch) >= self.batch_size and self._heap[0][0] != batch[-1][0]:
+                break
+            batch.append(heapq.heappop(self._heap))
+        return batch
+
+    def _fire(self, conn, cursor, batch, now):
+        # Appointments that already started (e.g. after downtime) are skipped
+        reminders = [reminder for _, _, reminder in batch if reminder['start_time'] > now]
+        sent_rows = [(key, remind_at) for remind_at, key, reminder in batch if reminder['start_time'] > now]
+        user_ids = {r['client_user_id'] for r in reminders} | {r['advisor_user_id'] for r in reminders}
+        users = {}
+        if user_ids:
+            cursor.execute(
+                f"SELECT id, email, first_name, last_name FROM users WHERE id IN ({', '.join(['%s'] * len(user_ids))})",
+                tuple(user_ids)
+            )
+            users = {row[0]: row[1:] for row in cursor.fetchall()}
+
+        messages, notifications = [], []
+        for reminder in reminders:
+            client, advisor = users.get(reminder['client_user_id']), users.get(reminder['advisor_user_id'])
+            if not client or not advisor:
+                continue
+            advisor_name = f"{advisor[1]} {advisor[2]}"
+            messages.append(build_appointment_reminder(client[0], f"{client[1]} {client[2]}", advisor_name, reminder))
+            notifications.append((
+                reminder['client_user_id'], f"Reminder: '{reminder['title']}' with {advisor_name} is coming up.", "/my-plan"
+            ))
+            notifications.append((
+                reminder['advisor_user_id'], f"Reminder: '{reminder['title']}' with {client[1]} {client[2]} is coming up.",
+                f"/clients/{reminder['client_user_id']}"
+            ))
+
+        if notifications:
+            cursor.executemany(
+                "INSERT INTO notifications (recipient_user_id, message, link_url) VALUES (%s, %s, %s)", notifications
+            )
+        if sent_rows:
+            cursor.executemany(
+                "INSERT IGNORE INTO appointment_reminders_sent (reminder_key, remind_at) VALUES (%s, %s)", sent_rows
+            )
+        # Recorded as sent before sending, so a crash can't repeat the batch
+        conn.commit()
+        return send_batch(messages)
+
+    def run_once(self, now=None):
+        """Sends every reminder due by `now`. Returns the number of emails sent."""
+        now = now or utc_now()
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            if (self._loaded_until is None or self._loaded_until < now
+                    or time.monotonic() - self._loaded_at >= self.refresh):
+                self._heap = self._load(cursor, now, now + self.window)
+                self._loaded_until, self._loaded_at = now + self.window, time.monotonic()
+                conn.commit()
+
+            sent = 0
+            while True:
+                batch = self._pop_batch(now)
+                if not batch:
+                    return sent
+                sent += self._fire(conn, cursor, batch, now)
+        except Exception:
+            conn.rollback()
+            # Reload from the database (including what was sent) next time
+            self._loaded_until = None
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    def seconds_until_next(self, max_wait):
+        """How long a polling loop can sleep before the next reminder is due."""
+        if not self._heap:
+            return max_wait
+        wait = (self._heap[0][0] - utc_now()).total_seconds()
+        return min(max(wait, 0), max_wait)
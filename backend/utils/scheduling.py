@@ -0,0 +1,206 @@
+"""
+Appointment scheduling helpers shared by the advisor and admin calendar
+endpoints: request parsing, the overlap query used for conflict checks, and
+the busy-interval sweep behind the free-slot finder.
+"""
+from datetime import date, datetime, time, timedelta
+from utils.recurrence import as_db_datetime, load_occurrences
+from utils.timezones import DISPLAY_TIMEZONE, get_timezone, local_to_db
+
+MAX_SLOT_RANGE = timedelta(days=62)
+MAX_SLOT_ADVISORS = 50
+
+# Upper bound on an appointment's length. It lets the overlap query bound
+# its index range scan on start_time from below as well as above.
+MAX_APPOINTMENT_DURATION = timedelta(hours=24)
+
+
+def parse_iso_datetime(value):
+    """
+    Parses an ISO 8601 timestamp from the frontend. Python's fromisoformat()
+    before 3.11 doesn't accept the 'Z' suffix, so it is rewritten to +00:00.
+    Raises ValueError for missing or malformed values.
+    """
+    if not value:
+        raise ValueError("missing datetime")
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    return datetime.fromisoformat(value)
+
+
+def lock_advisor_calendar(cursor, advisor_id):
+    """
+    Serialises bookings for one advisor: locks the advisor's users row until
+    the surrounding transaction ends, so a conflict check followed by an
+    insert cannot interleave with another booking for the same advisor.
+    """
+    cursor.execute("SELECT id FROM users WHERE id = %s FOR UPDATE", (advisor_id,))
+    cursor.fetchall()
+
+
+def find_conflicts(cursor, advisor_id, start_time, end_time):
+    """
+    Returns the advisor's appointments that overlap [start_time, end_time),
+    as dicts with id, client_user_id, title, start_time and end_time, followed
+    by overlapping recurring occurrences (which carry series_id and
+    occurrence_start instead of id). Touching intervals do not conflict.
+    """
+    start_time, end_time = as_db_datetime(start_time), as_db_datetime(end_time)
+    cursor.execute(
+        """
+        SELECT id, client_user_id, title, start_time, end_time
+        FROM appointments
+        WHERE advisor_user_id = %s
+          AND start_time < %s AND start_time > %s
+          AND end_time > %s
+        ORDER BY start_time
+        """,
+        (advisor_id, end_time, start_time - MAX_APPOINTMENT_DURATION, start_time)
+    )
+    columns = ('id', 'client_user_id', 'title', 'start_time', 'end_time')
+    conflicts = [row if isinstance(row, dict) else dict(zip(columns, row)) for row in cursor.fetchall()]
+    for occurrence in load_occurrences(cursor, start_time, end_time, advisor_ids=[advisor_id]):
+        conflicts.append({
+            key: occurrence[key]
+            for key in ('series_id', 'occurrence_start', 'client_user_id', 'title', 'start_time', 'end_time')
+        })
+    return conflicts
+
+
+def load_busy_intervals(cursor, advisor_ids, range_start, range_end):
+    """
+    Returns {advisor_id: [(start, end), ...]} sorted by start, for the given
+    advisors' appointments and recurring occurrences overlapping
+    [range_start, range_end).
+    """
+    busy = {advisor_id: [] for advisor_id in advisor_ids}
+    if not advisor_ids:
+        return busy
+    cursor.execute(
+        f"""
+        SELECT advisor_user_id, start_time, end_time
+        FROM appointments
+        WHERE advisor_user_id IN ({', '.join(['%s'] * len(advisor_ids))})
+          AND start_time < %s AND start_time > %s
+          AND end_time > %s
+        ORDER BY advisor_user_id, start_time
+        """,
+        (*advisor_ids, range_end, range_start - MAX_APPOINTMENT_DURATION, range_start)
+    )
+    for row in cursor.fetchall():
+        if isinstance(row, dict):
+            row = (row['advisor_user_id'], row['start_time'], row['end_time'])
+        busy[row[0]].append((row[1], row[2]))
+    for occurrence in load_occurrences(cursor, range_start, range_end, advisor_ids=list(advisor_ids)):
+        busy[occurrence['advisor_user_id']].append((occurrence['start_time'], occurrence['end_time']))
+    for intervals in busy.values():
+        intervals.sort()
+    return busy
+
+
+def find_overlaps(candidates, busy):
+    """
+    Returns the (start, end) candidates that overlap any busy interval. Both
+    lists are swept once after sorting.
+    """
+    busy = merge_intervals(busy)
+    overlaps = []
+    i = 0
+    for start, end in sorted(candidates):
+        while i < len(busy) and busy[i][1] <= start:
+            i += 1
+        if i < len(busy) and busy[i][0] < end:
+            overlaps.append((start, end))
+    return overlaps
+
+
+def merge_intervals(intervals):
+    """Merges overlapping or touching (start, end) intervals; returns them sorted."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def working_windows(start_date, end_date, work_start, work_end, weekdays, tz=DISPLAY_TIMEZONE):
+    """
+    Yields each working day's hours from start_date to end_date (inclusive)
+    as (start, end) in naive UTC. Days, hours and weekdays are read in `tz`,
+    so a DST change moves the UTC window with it.
+    """
+    day = start_date
+    while day <= end_date:
+        if day.weekday() in weekdays:
+            yield (
+                local_to_db(datetime.combine(day, work_start), tz),
+                local_to_db(datetime.combine(day, work_end), tz),
+            )
+        day += timedelta(days=1)
+
+
+def free_slots(busy, windows, duration):
+    """
+    Sweeps merged busy intervals against working windows (both sorted) and
+    returns the free (start, end) gaps at least `duration` long. Each busy
+    interval is visited at most once per window it overlaps.
+    """
+    busy = merge_intervals(busy)
+    slots = []
+    i = 0
+    for window_start, window_end in windows:
+        # Skip busy intervals that end before this window
+        while i < len(busy) and busy[i][1] <= window_start:
+            i += 1
+        cursor = window_start
+        j = i
+        while j < len(busy) and busy[j][0] < window_end:
+            if busy[j][0] - cursor >= duration:
+                slots.append((cursor, busy[j][0]))
+            cursor = max(cursor, busy[j][1])
+            j += 1
+        if window_end - cursor >= duration:
+            slots.append((cursor, window_end))
+    return slots
+
+
+def parse_slot_query(args):
+    """
+    Reads the free-slot query parameters: start_date, end_date (YYYY-MM-DD,
+    inclusive), duration (minutes), work_start / work_end (HH:MM, default
+    09:00-17:00), weekdays (comma-separated 0=Mon..6=Sun, default 0-4) and tz
+    (IANA name, default the display timezone) which the dates and hours are
+    read in. The returned range and windows are naive UTC, like the stored
+    appointments. Raises ValueError with a user-facing message.
+    """
+    try:
+        start_date = date.fromisoformat(args['start_date'])
+        end_date = date.fromisoformat(args['end_date'])
+    except (KeyError, ValueError):
+        raise ValueError("start_date and end_date are required in YYYY-MM-DD format")
+    try:
+        duration = timedelta(minutes=int(args.get('duration', 30)))
+        work_start = time.fromisoformat(args.get('work_start', '09:00'))
+        work_end = time.fromisoformat(args.get('work_end', '17:00'))
+        weekdays = {int(d) for d in args.get('weekdays', '0,1,2,3,4').split(',') if d.strip()}
+    except ValueError:
+        raise ValueError("duration, work_start, work_end or weekdays is malformed")
+    tz = get_timezone(args['tz']) if args.get('tz') else DISPLAY_TIMEZONE
+
+    if end_date < start_date or end_date - start_date >= MAX_SLOT_RANGE:
+        raise ValueError("The date range must be between 1 and 62 days")
+    if duration <= timedelta(0) or work_end <= work_start or not weekdays <= set(range(7)):
+        raise ValueError("duration must be positive, work_end after work_start and weekdays within 0-6")
+    return {
+        "range_start": local_to_db(datetime.combine(start_date, time.min), tz),
+        "range_end": local_to_db(datetime.combine(end_date + timedelta(days=1), time.min), tz),
+        "duration": duration,
+        "windows": list(working_windows(start_date, end_date, work_start, work_end, weekdays, tz))
+    }
+
+
+def serialize_slots(slots):
+    return [{"start_time": start.isoformat(), "end_time": end.isoformat()} for start, end in slots]
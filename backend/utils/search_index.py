@@ -0,0 +1,262 @@
+"""
+In-process search index over clients (name, email, city, occupation).
+
+Query tokens are matched as prefixes of indexed tokens through a sorted
+token list; if that finds nothing (typos, partial infixes) the query falls
+back to trigram overlap. The index is built from the database on first use,
+kept current by the endpoints that create or change clients, and rebuilt
+after SEARCH_INDEX_TTL seconds so other workers' writes are picked up.
+Rebuilds after the first load run in one background thread at a time while
+searches keep using the old index; the new one is swapped in when ready.
+"""
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+
+from config import Config
+from utils.db import get_db_connection
+
+SEARCH_FIELDS = ('first_name', 'last_name', 'email', 'city', 'occupation')
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+
+def trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# A failed background rebuild is retried after this many seconds (or the TTL, if shorter)
+REBUILD_RETRY_SECONDS = 30
+
+
+class ClientSearchIndex:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()  # held by whoever is building
+        self._loaded_at = None
+        self._pending = None                 # updates made while a build is running, replayed onto it
+        self._reset()
+
+    def _reset(self):
+        self._docs = {}            # client id -> document dict
+        self._doc_tokens = {}      # client id -> set of tokens
+        self._postings = {}        # token -> set of client ids
+        self._sorted_tokens = []   # every token in _postings, sorted for prefix scans
+        self._trigrams = {}        # trigram -> set of client ids
+        self._by_advisor = {}      # advisor id -> set of client ids
+
+    # --- building ---
+
+    def _ensure_loaded(self):
+        """
+        Loads the index on first use, blocking until it is ready. Once
+        loaded, a stale index starts a background rebuild (unless one is
+        already running) and keeps being served meanwhile.
+        """
+        if self._loaded_at is not None:
+            if time.monotonic() - self._loaded_at >= self.ttl and self._build_lock.acquire(blocking=False):
+                threading.Thread(target=self._rebuild, name='client-search-rebuild', daemon=True).start()
+            return
+        with self._build_lock:
+            if self._loaded_at is None:
+                self._build()
+
+    def _rebuild(self):
+        """Background rebuild; runs holding _build_lock, acquired by _ensure_loaded."""
+        try:
+            self._build()
+        except Exception as e:
+            print(f"Client search index rebuild failed: {e}")
+            with self._lock:
+                self._pending = None
+                # Keep serving the old index and try again shortly
+                self._loaded_at = time.monotonic() - self.ttl + min(REBUILD_RETRY_SECONDS, self.ttl)
+        finally:
+            self._build_lock.release()
+
+    def _build(self):
+        """Reads every client into a fresh index and swaps it in. Caller holds _build_lock."""
+        with self._lock:
+            self._pending = []
+        conn = get_db_connection(read_only=True)
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute("""
+                SELECT u.id, u.first_name, u.last_name, u.email,
+                       cp.city, cp.occupation, acm.advisor_user_id
+                FROM users u
+                LEFT JOIN client_profiles cp ON u.id = cp.client_user_id
+                LEFT JOIN advisor_client_map acm ON u.id = acm.client_user_id
+                WHERE u.role = 'client'
+            """)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+
+        fresh = ClientSearchIndex(self.ttl)
+        for row in rows:
+            fresh._index(row.pop('id'), row, bulk=True)
+        fresh._sorted_tokens = sorted(fresh._postings)
+
+        with self._lock:
+            # Writes made since the scan started may be missing from it
+            for client_id, fields in self._pending:
+                fresh._apply(client_id, fields)
+            self._pending = None
+            self._docs, self._doc_tokens, self._postings = fresh._docs, fresh._doc_tokens, fresh._postings
+            self._sorted_tokens, self._trigrams, self._by_advisor = fresh._sorted_tokens, fresh._trigrams, fresh._by_advisor
+            self._loaded_at = time.monotonic()
+
+    def _index(self, client_id, doc, bulk=False):
+        self._docs[client_id] = doc
+        tokens = set()
+        for field in SEARCH_FIELDS:
+            tokens.update(tokenize(doc.get(field)))
+        self._doc_tokens[client_id] = tokens
+        for token in tokens:
+            ids = self._postings.get(token)
+            if ids is None:
+                ids = self._postings[token] = set()
+                if not bulk:
+                    insort(self._sorted_tokens, token)
+            ids.add(client_id)
+            for gram in trigrams(token):
+                self._trigrams.setdefault(gram, set()).add(client_id)
+        if doc.get('advisor_user_id') is not None:
+            self._by_advisor.setdefault(doc['advisor_user_id'], set()).add(client_id)
+
+    def _unindex(self, client_id):
+        doc = self._docs.pop(client_id, None)
+        if doc is None:
+            return None
+        for token in self._doc_tokens.pop(client_id):
+            ids = self._postings[token]
+            ids.discard(client_id)
+            if not ids:
+                del self._postings[token]
+                del self._sorted_tokens[bisect_left(self._sorted_tokens, token)]
+            for gram in trigrams(token):
+                grams = self._trigrams.get(gram)
+                if grams is not None:
+                    grams.discard(client_id)
+                    if not grams:
+                        del self._trigrams[gram]
+        advisor_clients = self._by_advisor.get(doc.get('advisor_user_id'))
+        if advisor_clients is not None:
+            advisor_clients.discard(client_id)
+        return doc
+
+    # --- incremental updates ---
+
+    def upsert_client(self, client_id, **fields):
+        """
+        Merges the given fields (any of SEARCH_FIELDS plus advisor_user_id)
+        into a client's entry. Before the first load only a running build
+        needs to hear about it, since a later load reads the database anyway.
+        """
+        self._update(client_id, fields)
+
+    def remove_client(self, client_id):
+        self._update(client_id, None)
+
+    def _update(self, client_id, fields):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((client_id, fields))
+            if self._loaded_at is not None:
+                self._apply(client_id, fields)
+
+    def _apply(self, client_id, fields):
+        """Upserts `fields` into a client's entry, or removes the client when fields is None."""
+        doc = self._unindex(client_id)
+        if fields is not None:
+            doc = doc or {}
+            doc.update(fields)
+            self._index(client_id, doc)
+
+    # --- querying ---
+
+    def _prefix_range(self, query_token):
+        """Bounds of the tokens starting with query_token in _sorted_tokens."""
+        # '{' sorts right after 'z', and tokens only contain [a-z0-9].
+        return (
+            bisect_left(self._sorted_tokens, query_token),
+            bisect_left(self._sorted_tokens, query_token + '{'),
+        )
+
+    def _prefix_candidates(self, query_token, scope):
+        start, end = self._prefix_range(query_token)
+        candidates = set()
+        for token in self._sorted_tokens[start:end]:
+            ids = self._postings[token]
+            candidates.update(ids if scope is None else ids & scope)
+        return candidates
+
+    def _trigram_matches(self, query_tokens, scope):
+        grams = set()
+        for token in query_tokens:
+            grams |= trigrams(token)
+        counts = {}
+        for gram in grams:
+            ids = self._trigrams.get(gram, ())
+            for client_id in (ids if scope is None else ids & scope):
+                counts[client_id] = counts.get(client_id, 0) + 1
+        threshold = len(grams) / 3
+        return {cid: count / len(grams) for cid, count in counts.items() if count >= threshold}
+
+    def search(self, query, advisor_id=None, limit=20):
+        """
+        Ranked matches for `query`, restricted to one advisor's clients when
+        advisor_id is given. Every query token must be a prefix of some token
+        of the client; exact token matches rank higher. Returns a list of
+        document dicts with id and score.
+        """
+        query_tokens = sorted(set(tokenize(query)))
+        if not query_tokens:
+            return []
+        self._ensure_loaded()
+
+        with self._lock:
+            scope = self._by_advisor.get(advisor_id, set()) if advisor_id is not None else None
+
+            # Drive the search from the query token with the fewest matching
+            # index tokens, then check the remaining tokens per candidate.
+            driver = min(query_tokens, key=lambda t: len(range(*self._prefix_range(t))))
+            scores = {}
+            for client_id in self._prefix_candidates(driver, scope):
+                doc_tokens = self._doc_tokens[client_id]
+                score = 0
+                for token in query_tokens:
+                    if token in doc_tokens:
+                        score += 2
+                    elif token is driver or any(t.startswith(token) for t in doc_tokens):
+                        score += 1
+                    else:
+                        break
+                else:
+                    scores[client_id] = score
+
+            if not scores:
+                scores = self._trigram_matches(query_tokens, scope)
+
+            ranked = heapq.nsmallest(
+                limit,
+                scores.items(),
+                key=lambda item: (-item[1], (self._docs[item[0]].get('last_name') or '').lower(), item[0])
+            )
+            return [
+                {"id": client_id, **{field: self._docs[client_id].get(field) for field in SEARCH_FIELDS}, "score": round(score, 3)}
+                for client_id, score in ranked
+            ]
+
+
+client_search_index = ClientSearchIndex(ttl=Config.SEARCH_INDEX_TTL)
@@ -0,0 +1,51 @@
+"""
+Timezone handling shared by appointment emails, calendar feeds and the
+date-based views. Appointment times are stored as naive UTC and shown to
+clients in IST; "today" and working hours are IST days and hours.
+"""
+from datetime import datetime, time
+import pytz
+
+DISPLAY_TIMEZONE = pytz.timezone('Asia/Kolkata')
+DISPLAY_TIMEZONE_LABEL = 'IST'
+
+
+def as_utc(value):
+    """Returns an aware UTC datetime; naive values are taken to be UTC, as stored in the database."""
+    if value.tzinfo is None:
+        return pytz.utc.localize(value)
+    return value.astimezone(pytz.utc)
+
+
+def get_timezone(name):
+    """Looks up an IANA timezone name such as 'Asia/Kolkata'. Raises ValueError for unknown names."""
+    try:
+        return pytz.timezone(name)
+    except pytz.UnknownTimeZoneError:
+        raise ValueError(f"Unknown timezone {name!r}")
+
+
+def local_to_db(value, tz=DISPLAY_TIMEZONE):
+    """Converts a naive wall-clock time in `tz` to the naive UTC form stored in the database."""
+    return tz.localize(value).astimezone(pytz.utc).replace(tzinfo=None)
+
+
+def display_today():
+    return datetime.now(DISPLAY_TIMEZONE).date()
+
+
+def display_day_start(day=None):
+    """Naive UTC time of midnight at the start of `day` (default today) in the display timezone."""
+    return local_to_db(datetime.combine(day or display_today(), time.min))
+
+
+def to_display_time(value):
+    return as_utc(value).astimezone(DISPLAY_TIMEZONE)
+
+
+def format_display_date(value):
+    return to_display_time(value).strftime('%A, %B %d, %Y')
+
+
+def format_display_time(value):
+    return to_display_time(value).strftime('%I:%M %p')